@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Use at your own risk.  No compatibility or maintenance or other assurance of suitability is expressed or implied.
+Update or modify as needed
+"""
+
+#
+# Benchmark getApp.py (export) and putApp.py (import) end to end against mockFusion.py.  For each synthetic app size
+# the app is exported from a mock holding it into a temp directory and that directory is then imported into an empty
+# mock.  Wall time, request count, request/response body bytes and the peak RSS of the script are reported.
+#
+# e.g.
+#   python3 benchApps.py --sizes small medium --latency 0.002 --getArgs="--parallel 4" --putArgs="--workers 4"
+#
+#  Requires a python 3.x+ interpreter (tested on 3.8.18) on a unix like OS (peak RSS comes from os.wait4)
+import argparse
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import mockFusion
+import synthApp
+
+BIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bin")
+COLUMNS = ["size", "phase", "run", "wall(s)", "requests", "5xx", "bytesIn", "bytesOut", "peakRSS(MB)"]
+
+
+def runScript(script, scriptArgs, logFile):
+    """
+    run one of the bin scripts to completion.
+    :return: (exit status, wall seconds, peak RSS in MB)
+    """
+    cmd = [sys.executable, os.path.join(BIN_DIR, script)] + scriptArgs
+    with open(logFile, "w") as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - start
+    # the child is already reaped by wait4 so Popen can not work out its exit code
+    proc.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+    # ru_maxrss is KB on linux and bytes on macOS
+    rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return proc.returncode, wall, rss
+
+
+def runPhase(size, phase, run, mock, script, scriptArgs, workDir):
+    mock.resetStats()
+    logFile = os.path.join(workDir, f"{size}_{phase}_{run}.log")
+    status, wall, rss = runScript(script, scriptArgs, logFile)
+    stats = mock.getStats()
+    if status != 0:
+        with open(logFile) as log:
+            print(f"{script} exited with {status}, last output:\n{log.read()[-2000:]}", file=sys.stderr)
+    # 404s are expected from existence probes so only server errors are counted
+    errors = sum(v for k, v in stats["statuses"].items() if int(k) >= 500)
+    return {"size": size, "phase": phase, "run": run, "wall(s)": round(wall, 3), "requests": stats["requests"],
+            "5xx": errors, "bytesIn": stats["bytesIn"], "bytesOut": stats["bytesOut"],
+            "peakRSS(MB)": round(rss, 1), "maxInFlight": stats["maxInFlight"], "exitStatus": status, "routes": stats["routes"]}
+
+
+def benchSize(args, size, workDir):
+    results = []
+    app = synthApp.makeApp(args.app, seed=args.seed, **synthApp.APP_SIZES[size])
+    mockArgs = {"latency": args.latency, "jitter": args.jitter, "errorRate": args.errorRate, "seed": args.seed,
+                "loadLatency": args.loadLatency}
+    for run in range(1, args.repeat + 1):
+        exportDir = os.path.join(workDir, f"{size}_{run}")
+
+        source = mockFusion.MockFusion(**mockArgs)
+        source.loadApp(app)
+        url = source.start()
+        try:
+            getArgs = ["-s", url, "-a", args.app, "-d", exportDir] + shlex.split(args.getArgs)
+            results.append(runPhase(size, "export", run, source, "getApp.py", getArgs, workDir))
+        finally:
+            source.stop()
+
+        target = mockFusion.MockFusion(**mockArgs)
+        url = target.start()
+        try:
+            putArgs = ["-s", url, "-d", exportDir] + shlex.split(args.putArgs)
+            results.append(runPhase(size, "import", run, target, "putApp.py", putArgs, workDir))
+        finally:
+            target.stop()
+        shutil.rmtree(exportDir, ignore_errors=True)
+    return results
+
+
+def printTable(results):
+    rows = [[str(r[c]) for c in COLUMNS] for r in results]
+    widths = [max(len(c), *(len(row[i]) for row in rows)) for i, c in enumerate(COLUMNS)]
+    print("  ".join(c.rjust(w) for c, w in zip(COLUMNS, widths)))
+    for row in rows:
+        print("  ".join(v.rjust(w) for v, w in zip(row, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark getApp.py and putApp.py against an in-memory mock Fusion.")
+    parser.add_argument("--sizes", help="Synthetic app sizes to run, any of " + ", ".join(synthApp.APP_SIZES) + ", default: small medium.", nargs="+", default=["small", "medium"])
+    parser.add_argument("--app", help="Name of the synthetic app, default: bench.", default="bench")
+    parser.add_argument("--repeat", help="Number of export/import runs per size, default: 1.", type=int, default=1)
+    parser.add_argument("--latency", help="Seconds the mock adds to every response, default: 0.", type=float, default=0.0)
+    parser.add_argument("--jitter", help="Up to this many random seconds the mock adds to every response, default: 0.", type=float, default=0.0)
+    parser.add_argument("--loadLatency", help="Seconds the mock adds to a response for every other request in flight, default: 0.", type=float, default=0.0)
+    parser.add_argument("--errorRate", help="Fraction of requests the mock answers with a 503, default: 0.", type=float, default=0.0)
+    parser.add_argument("--getArgs", help="Extra arguments passed to getApp.py e.g. --getArgs=\"--parallel 4\", default: none.", default="")
+    parser.add_argument("--putArgs", help="Extra arguments passed to putApp.py e.g. --putArgs=\"--workers 4\", default: none.", default="")
+    parser.add_argument("--seed", help="Random seed for the synthetic apps and the mock, default: 0.", type=int, default=0)
+    parser.add_argument("--workDir", help="Directory for exported apps and script logs, default: a new temp directory.", default=None)
+    parser.add_argument("--json", help="Also write the results, including per route request counts, to this file, default: none.", default=None)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        if size not in synthApp.APP_SIZES:
+            sys.exit(f"Unknown size {size}.  Use one of " + ", ".join(synthApp.APP_SIZES))
+
+    workDir = args.workDir or tempfile.mkdtemp(prefix="benchApps_")
+    os.makedirs(workDir, exist_ok=True)
+    results = []
+    for size in args.sizes:
+        results += benchSize(args, size, workDir)
+    printTable(results)
+    print(f"Logs in {workDir}")
+
+    if args.json:
+        with open(args.json, "w") as out:
+            json.dump({"args": vars(args), "results": results}, out, indent=2)
+    if any(r["exitStatus"] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
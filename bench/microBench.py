@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Use at your own risk.  No compatibility or maintenance or other assurance of suitability is expressed or implied.
+Update or modify as needed
+"""
+
+#
+# Offline micro-benchmarks of the CPU and IO bound functions of getApp.py and putApp.py, run against a synthetic app
+# from synthApp.py.  No server is needed.  The scripts are imported as modules and their functions are called directly.
+#
+# Each benchmark is run --repeat times and the min/median are reported.  --saveBaseline writes the results to the
+# baseline file and later runs print the change against it.  --profile prints the top cProfile entries of each
+# benchmark to show where the time goes.
+#
+# e.g.
+#   python3 microBench.py --size huge --saveBaseline
+#   python3 microBench.py --size huge --only extractAppFromZip --profile
+#
+#  Requires a python 3.x+ interpreter (tested on 3.8.18)
+import argparse
+import copy
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from zipfile import ZipFile
+
+import synthApp
+from scriptLoader import loadScript
+
+BIN_DIR = synthApp.BIN_DIR
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+class Benchmark:
+    """
+    setup() runs untimed before every repeat and returns the argument handed to run()
+    """
+    def __init__(self, name, setup, run, items):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.items = items
+
+
+def makeBenchmarks(app, zipName, workDir):
+    objects = app["objects"]
+    appName = objects["fusionApps"][0]["id"]
+    getApp = loadScript("getApp", app=appName, server="offline", noStageIdMunge=False, verbose=False, debug=False)
+    outDir = os.path.join(workDir, "out")
+    getApp.args.dir = outDir
+
+    def freshOutDir():
+        shutil.rmtree(outDir, ignore_errors=True)
+        os.makedirs(outDir)
+        getApp.collections.clear()
+
+    def extractSetup():
+        # opened the way getApp.py --zip opens it
+        freshOutDir()
+        with open(zipName, 'rb') as zipIn:
+            return getApp.openMappedZip(zipIn)
+
+    def extractWithWriters(zipfile):
+        getApp.args.writers = 4
+        try:
+            getApp.extractAppFromZip(zipfile)
+        finally:
+            getApp.args.writers = None
+
+    pipelines = objects["indexPipelines"] + objects["queryPipelines"]
+
+    def pipelineCopies():
+        freshOutDir()
+        return copy.deepcopy(objects["indexPipelines"])
+
+    def jsonToFileRun(elements):
+        for i, e in enumerate(elements):
+            getApp.jsonToFile(e, "indexPipelines", f"{i}_IPL.json")
+
+    def diffFriendlyRun(elements):
+        for e in elements:
+            getApp.makeDiffFriendly(e, "indexPipelines")
+
+    # exploded app read by the putApp benchmarks
+    appDir = os.path.join(workDir, "app")
+    freshOutDir()
+    getApp.args.dir = appDir
+    getApp.extractAppFromZip(ZipFile(zipName))
+    getApp.args.dir = outDir
+
+    putApp = loadScript("putApp", dir=appDir, verbose=False, debug=False)
+    replacements = dict((f"ds{i}_{k}", f"value{i}") for i in range(len(objects["dataSources"])) for k in ["password", "token"])
+
+    def findFilesSetup():
+        for type in putApp.OBJ_TYPES.values():
+            type["filelist"].clear()
+
+    def loadTypeFiles(type):
+        payloads = []
+        for f in sorted(os.listdir(os.path.join(appDir, type))):
+            with open(os.path.join(appDir, type, f)) as jfile:
+                payloads.append(json.load(jfile))
+        return payloads
+
+    datasources = loadTypeFiles("dataSources")
+    readablePipelines = loadTypeFiles("indexPipelines")
+    configsetDir = os.path.join(appDir, "configsets")
+    configFiles = sum(len(files) for files in app["configsets"].values())
+
+    return [
+        Benchmark("extractAppFromZip", extractSetup, getApp.extractAppFromZip, sum(len(v) for v in objects.values()))
+        ,Benchmark("extractAppFromZip4Writers", extractSetup, extractWithWriters, sum(len(v) for v in objects.values()))
+        ,Benchmark("jsonToFile", pipelineCopies, jsonToFileRun, len(objects["indexPipelines"]))
+        ,Benchmark("makeDiffFriendly", lambda: copy.deepcopy(pipelines), diffFriendlyRun, len(pipelines))
+        ,Benchmark("collectById", pipelineCopies, lambda e: getApp.collectById(e, "indexPipelines"), len(objects["indexPipelines"]))
+        ,Benchmark("findFiles", findFilesSetup, lambda _: putApp.findFiles(), sum(len(os.listdir(os.path.join(appDir, d))) for d in os.listdir(appDir) if os.path.isdir(os.path.join(appDir, d))))
+        ,Benchmark("getFileListing", lambda: None, lambda _: putApp.getFileListing(configsetDir), configFiles)
+        ,Benchmark("traverseAndReplace", lambda: datasources, lambda d: [putApp.traverseAndReplace(e, e["id"], replacements) for e in d], len(datasources))
+        ,Benchmark("migrateReadableScript", lambda: copy.deepcopy(readablePipelines), lambda p: [putApp.migrateReadableScript(e, "indexPipelines") for e in p], len(readablePipelines))
+    ]
+
+
+def runBenchmark(bench, repeat, profile):
+    times = []
+    profiler = cProfile.Profile() if profile else None
+    for _ in range(repeat):
+        arg = bench.setup()
+        if profiler:
+            profiler.enable()
+        start = time.perf_counter()
+        bench.run(arg)
+        times.append(time.perf_counter() - start)
+        if profiler:
+            profiler.disable()
+    result = {"min": min(times), "median": statistics.median(times), "repeat": repeat, "items": bench.items}
+    if profiler:
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(profile)
+        result["profile"] = out.getvalue()
+    return result
+
+
+def printResults(results, baseline):
+    print(f"{'benchmark':<24}{'items':>8}{'min(s)':>10}{'median(s)':>11}{'items/s':>12}{'vs baseline':>13}")
+    for name, r in results.items():
+        rate = r["items"] / r["min"] if r["min"] else 0
+        change = ""
+        if baseline and name in baseline["results"]:
+            base = baseline["results"][name]["min"]
+            change = f"{(r['min'] - base) / base * 100:+.1f}%" if base else ""
+        print(f"{name:<24}{r['items']:>8}{r['min']:>10.4f}{r['median']:>11.4f}{rate:>12.0f}{change:>13}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline micro-benchmarks of getApp.py and putApp.py functions using a synthetic app.")
+    parser.add_argument("--size", help="Synthetic app size, one of " + ", ".join(synthApp.APP_SIZES) + ", default: large.", default="large")
+    parser.add_argument("--repeat", help="Runs of each benchmark, default: 3.", type=int, default=3)
+    parser.add_argument("--only", help="Names of the benchmarks to run, default: all.", nargs="+", default=None)
+    parser.add_argument("--seed", help="Random seed for the synthetic app, default: 0.", type=int, default=0)
+    parser.add_argument("--baseline", help="Baseline file compared against (and written by --saveBaseline), default: bench/baseline.json.", default=DEFAULT_BASELINE)
+    parser.add_argument("--saveBaseline", help="Write these results to the --baseline file, default: False.", action="store_true", default=False)
+    parser.add_argument("--profile", help="Print the top N cumulative cProfile entries of each benchmark, default: 0 (off).", type=int, default=0, metavar="N")
+    parser.add_argument("--workDir", help="Directory for the synthetic zip and output, default: a new temp directory removed at exit.", default=None)
+    args = parser.parse_args()
+
+    if args.size not in synthApp.APP_SIZES:
+        sys.exit(f"Unknown --size {args.size}")
+    workDir = args.workDir or tempfile.mkdtemp(prefix="microBench_")
+    os.makedirs(workDir, exist_ok=True)
+    try:
+        app = synthApp.makeApp(seed=args.seed, **synthApp.APP_SIZES[args.size])
+        zipName = os.path.join(workDir, "app.zip")
+        synthApp.writeAppZip(app, zipName)
+        print(f"Synthetic '{args.size}' app: {os.path.getsize(zipName)} byte zip in {workDir}")
+
+        results = {}
+        for bench in makeBenchmarks(app, zipName, workDir):
+            if args.only and bench.name not in args.only:
+                continue
+            results[bench.name] = runBenchmark(bench, args.repeat, args.profile)
+    finally:
+        if not args.workDir:
+            shutil.rmtree(workDir, ignore_errors=True)
+
+    baseline = None
+    if os.path.isfile(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("size") != args.size:
+            print(f"Baseline in {args.baseline} is for size '{baseline.get('size')}', not compared.")
+            baseline = None
+    printResults(results, baseline)
+    for name, r in results.items():
+        if "profile" in r:
+            print(f"\n==== {name} ====\n{r.pop('profile')}")
+
+    if args.saveBaseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"size": args.size, "seed": args.seed, "python": platform.python_version(),
+                       "platform": platform.platform(), "results": results}, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,554 @@
+#!/usr/bin/env python3
+"""
+Use at your own risk.  No compatibility or maintenance or other assurance of suitability is expressed or implied.
+Update or modify as needed
+"""
+
+#
+# In-memory stand-in for the parts of the Fusion 5 REST api that getApp.py and putApp.py call: /objects/export,
+# /objects/import, /apps, /collections (features and solr-config), /blobs, /links, /configurations, /session, the
+# per-type object apis and /templating.  Intended for benchmarking only; nothing is validated the way Fusion would.
+#
+# Latency, jitter, error injection and cut off export downloads are configurable and request/byte counters are kept
+# for every call.  Export zips are served with byte ranges so interrupted downloads can resume.  The
+# counters can be read while the server runs with GET /__stats and zeroed with POST /__reset
+#
+# Run standalone with a synthetic app loaded:
+#   python3 mockFusion.py --size medium --port 8764 --latency 0.005
+# then point getApp.py or putApp.py at -s http://localhost:8764
+#
+#  Requires a python 3.x+ interpreter (tested on 3.8.18)
+import argparse
+import hashlib
+import io
+import json
+import random
+import re
+import sys
+import threading
+import time
+import urllib.parse
+import zipfile
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import synthApp
+
+# objects.json key -> (api path, linkType).  Same mapping as the OBJ_TYPES of putApp.py
+OBJ_TYPES = {
+    "zones": ("templating/zones", "zone")
+    ,"templates": ("templating/templates", "template")
+    ,"dataModels": ("data-models", "data-model")
+    ,"indexPipelines": ("index-pipelines", "index-pipeline")
+    ,"queryPipelines": ("query-pipelines", "query-pipeline")
+    ,"indexProfiles": ("index-profiles", "index-profile")
+    ,"queryProfiles": ("query-profiles", "query-profile")
+    ,"parsers": ("parsers", "parser")
+    ,"dataSources": ("connectors/datasources", "datasource")
+    ,"collections": ("collections", "collection")
+    ,"tasks": ("tasks", "task")
+    ,"sparkJobs": ("spark/configurations", "spark")
+    ,"blobs": ("blobs", "blob")
+}
+API_TYPES = dict((v[0], k) for k, v in OBJ_TYPES.items())
+LINK_TYPES = dict((v[1], k) for k, v in OBJ_TYPES.items())
+JOB_LINK_TYPES = ["datasource", "task", "spark"]
+
+
+class MockFusion:
+    def __init__(self, latency=0.0, jitter=0.0, errorRate=0.0, errorStatus=503, errorMatch=None,
+                 zippedConfigsets=False, version="5.9.0", seed=0, loadLatency=0.0, retryAfter=None, dropRate=0.0,
+                 ranges=True):
+        """
+        :param latency: seconds added to every response
+        :param jitter: up to this many extra seconds, uniformly random, added to every response
+        :param errorRate: fraction of requests answered with errorStatus instead of being served
+        :param errorMatch: if set, only request paths matching this regex are eligible for error injection
+        :param zippedConfigsets: export configsets as configsets/<collection>.zip members, the Fusion 4.0.1 layout
+        :param loadLatency: seconds added to a response for every other request in flight, to mimic an overloaded server
+        :param retryAfter: if set, the Retry-After header value sent with injected errors
+        :param dropRate: fraction of export zip responses cut off half way by closing the connection
+        :param ranges: serve byte ranges of export zips (Accept-Ranges, Range, If-Range) so downloads can resume
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.errorRate = errorRate
+        self.errorStatus = errorStatus
+        self.errorMatch = re.compile(errorMatch) if errorMatch else None
+        self.zippedConfigsets = zippedConfigsets
+        self.loadLatency = loadLatency
+        self.retryAfter = retryAfter
+        self.dropRate = dropRate
+        self.ranges = ranges
+        self.inFlight = 0
+        self.version = version
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.server = None
+        self.clear()
+        self.resetStats()
+
+    def clear(self):
+        self.apps = {}
+        # objects.json key -> id -> object
+        self.objects = dict((t, {}) for t in OBJ_TYPES)
+        self.jobs = {}
+        self.features = {}
+        self.blobs = {}
+        self.configsets = {}
+        self.links = []
+
+    def resetStats(self):
+        with self.lock:
+            self.stats = {"requests": 0, "bytesIn": 0, "bytesOut": 0, "injectedErrors": 0, "reloads": 0,
+                          "droppedResponses": 0, "rangeRequests": 0, "maxInFlight": 0, "statuses": Counter(), "routes": Counter()}
+
+    def getStats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats["statuses"] = dict((str(k), v) for k, v in self.stats["statuses"].items())
+            stats["routes"] = dict(self.stats["routes"])
+        return stats
+
+    def loadApp(self, app):
+        """
+        load an app made by synthApp.makeApp().  Every object is linked to the app the way Fusion does.
+        """
+        objects = app["objects"]
+        appId = objects["fusionApps"][0]["id"]
+        with self.lock:
+            self.apps[appId] = objects["fusionApps"][0]
+            for type in OBJ_TYPES:
+                for obj in objects.get(type, []):
+                    self.objects[type][obj["id"]] = obj
+                    self.links.append({"subject": f"{OBJ_TYPES[type][1]}:{obj['id']}", "object": f"app:{appId}",
+                                       "linkType": "inContextOf"})
+            for job in objects.get("jobs", []):
+                self.jobs[job["resource"]] = job
+            for col, features in objects.get("features", {}).items():
+                self.features[col] = dict((f["name"], f) for f in features)
+            self.blobs.update(app["blobs"])
+            for col, files in app["configsets"].items():
+                self.configsets[col] = dict(files)
+
+    def start(self, port=0):
+        """
+        serve on a background thread.  Use port 0 to pick a free port.
+        :return: the base url e.g. http://127.0.0.1:8764
+        """
+        handler = type("Handler", (MockHandler,), {"mock": self})
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def count(self, route, status, bytesIn, bytesOut):
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["bytesIn"] += bytesIn
+            self.stats["bytesOut"] += bytesOut
+            self.stats["statuses"][status] += 1
+            self.stats["routes"][route] += 1
+
+    def injectError(self, path):
+        if self.errorRate <= 0 or (self.errorMatch and not self.errorMatch.search(path)):
+            return False
+        with self.lock:
+            if self.random.random() < self.errorRate:
+                self.stats["injectedErrors"] += 1
+                return True
+        return False
+
+    def dropResponse(self):
+        if self.dropRate <= 0:
+            return False
+        with self.lock:
+            if self.random.random() < self.dropRate:
+                self.stats["droppedResponses"] += 1
+                return True
+        return False
+
+    def delay(self):
+        with self.lock:
+            extra = self.random.uniform(0, self.jitter) + self.loadLatency * (self.inFlight - 1)
+        if self.latency or extra:
+            time.sleep(self.latency + extra)
+
+    def enter(self):
+        with self.lock:
+            self.inFlight += 1
+            self.stats["maxInFlight"] = max(self.stats["maxInFlight"], self.inFlight)
+
+    def leave(self):
+        with self.lock:
+            self.inFlight -= 1
+
+    #
+    # routing.  Each handler returns (status, body) where body is bytes, a str or something json serializable
+    #
+    def handle(self, method, path, query, body, accept=""):
+        parts = [urllib.parse.unquote(p) for p in path.strip('/').split('/') if p]
+        if parts and parts[0] == "api":
+            parts = parts[1:]
+        if len(parts) > 2 and parts[0] == "apps":
+            app = parts[1]
+            if app not in self.apps:
+                return "apps", 404, {"message": f"App {app} not found"}
+            parts = parts[2:]
+        if not parts:
+            return "other", 404, {}
+
+        if parts[-1] == "configurations" and len(parts) == 1:
+            return "configurations", 200, {"app.version": self.version}
+        if parts[0] == "session":
+            return "session", 201, b""
+        if parts[0] == "links":
+            return "links", *self.handleLinks(method, query, body)
+        if parts[:2] == ["objects", "export"]:
+            return "export", *self.handleExport(query, accept)
+        if parts[:2] == ["objects", "import"]:
+            return "import", *self.handleImport(query, body)
+        if parts[0] == "apps":
+            return "apps", *self.handleApps(method, parts[1:], body)
+        if parts[0] == "jobs" and len(parts) > 2 and parts[-1] == "schedule":
+            return "jobs", *self.handleSchedule(method, "/".join(parts[1:-1]), body)
+        if parts[0] == "blobs" and len(parts) > 1:
+            return "blobs", *self.handleBlob(method, "/" + "/".join(parts[1:]), query, body)
+        if parts[0] == "collections" and len(parts) > 2 and parts[2] == "features":
+            return "features", *self.handleFeature(method, parts[1], parts[3:], body)
+        if parts[0] == "collections" and len(parts) > 2 and parts[2] == "solr-config":
+            return "solr-config", *self.handleSolrConfig(method, parts[1], "/".join(parts[3:]), query, body)
+
+        for size in (2, 1):
+            api = "/".join(parts[:size])
+            if api in API_TYPES:
+                return api, *self.handleObject(method, API_TYPES[api], parts[size:], body)
+        return "other", 404, {"message": "no mock for " + path}
+
+    def handleLinks(self, method, query, body):
+        if method == "PUT":
+            link = json.loads(body)
+            with self.lock:
+                if link not in self.links:
+                    self.links.append(link)
+            return 200, link
+        obj = query.get("object", [None])[0]
+        linkType = query.get("linkType", [None])[0]
+        return 200, [l for l in self.links if (not obj or l["object"] == obj) and (not linkType or l["linkType"] == linkType)]
+
+    def handleApps(self, method, parts, body):
+        if method == "POST" and not parts:
+            app = json.loads(body)
+            with self.lock:
+                self.apps[app["id"]] = app
+            return 200, app
+        if not parts:
+            return 200, list(self.apps.values())
+        if method == "PUT":
+            app = json.loads(body)
+            with self.lock:
+                self.apps[parts[0]] = app
+            return 200, app
+        if parts[0] in self.apps:
+            return 200, self.apps[parts[0]]
+        return 404, {"message": f"App {parts[0]} not found"}
+
+    def handleObject(self, method, type, parts, body):
+        store = self.objects[type]
+        id = "/".join(parts)
+        if method == "GET":
+            if not id:
+                return 200, list(store.values())
+            if id in store:
+                return 200, store[id]
+            return 404, {"message": f"{type} {id} not found"}
+        obj = json.loads(body)
+        with self.lock:
+            if method == "POST":
+                if obj["id"] in store:
+                    return 409, {"message": f"{type} {obj['id']} already exists"}
+                store[obj["id"]] = obj
+                return 200, obj
+            if method == "PUT":
+                store[id] = obj
+                return 200, obj
+        return 405, {}
+
+    def handleSchedule(self, method, resource, body):
+        if method == "PUT":
+            with self.lock:
+                self.jobs[resource] = json.loads(body)
+        if resource in self.jobs:
+            return 200, self.jobs[resource]
+        return 404, {}
+
+    def handleBlob(self, method, path, query, body):
+        if method == "PUT":
+            name = path.split('/')[-1]
+            dir = path[:-len(name) - 1] or "/"
+            meta = {"id": path[1:], "path": path, "dir": dir, "filename": name, "size": len(body),
+                    "contentType": "application/octet-stream",
+                    "metadata": {"resourceType": query.get("resourceType", ["other"])[0]}}
+            with self.lock:
+                self.blobs[path] = body
+                self.objects["blobs"][meta["id"]] = meta
+            return 200, meta
+        if path in self.blobs:
+            return 200, self.blobs[path]
+        return 404, {}
+
+    def handleFeature(self, method, col, parts, body):
+        features = self.features.setdefault(col, {})
+        if not parts:
+            return 200, list(features.values())
+        if method == "PUT":
+            with self.lock:
+                features[parts[0]] = json.loads(body)
+        if parts[0] in features:
+            return 200, features[parts[0]]
+        return 404, {}
+
+    def handleSolrConfig(self, method, col, file, query, body):
+        if col not in self.objects["collections"]:
+            return 404, {"message": f"Collection {col} not found"}
+        files = self.configsets.setdefault(col, {})
+        if method == "GET":
+            if not file:
+                return 200, [{"name": f, "isDir": False, "version": 0} for f in sorted(files)]
+            if file in files:
+                return 200, files[file]
+            return 404, {}
+        with self.lock:
+            files[file] = body
+            if query.get("reload", ["false"])[0] == "true":
+                self.stats["reloads"] += 1
+        return 200, b""
+
+    def handleExport(self, query, accept):
+        """
+        app.ids without deep=false exports everything linked to the app.  Otherwise only the listed <linkType>.ids
+        are exported.  Accept: application/json gets objects.json only, everything else gets a zip.
+        """
+        selected = dict((t, []) for t in OBJ_TYPES)
+        selected["fusionApps"] = [self.apps[a] for a in query.get("app.ids", []) if a in self.apps]
+        selected["jobs"] = []
+        deep = query.get("deep", ["true"])[0] != "false"
+        if deep and selected["fusionApps"]:
+            subjects = set(l["subject"] for l in self.links if l["object"] in ["app:" + a["id"] for a in selected["fusionApps"]])
+        else:
+            subjects = set()
+            for key, ids in query.items():
+                if key.endswith(".ids") and key[:-4] in LINK_TYPES:
+                    subjects.update(f"{key[:-4]}:{id}" for id in ids)
+        for subject in subjects:
+            linkType, id = subject.split(':', 1)
+            type = LINK_TYPES.get(linkType)
+            if type and id in self.objects[type]:
+                selected[type].append(self.objects[type][id])
+            if linkType in JOB_LINK_TYPES and subject in self.jobs and deep:
+                selected["jobs"].append(self.jobs[subject])
+        selected["jobs"] += [self.jobs[r] for r in query.get("job.ids", []) if r in self.jobs]
+        selected["features"] = dict((c["id"], list(self.features.get(c["id"], {}).values())) for c in selected["collections"])
+        objects = {"objects": dict((k, v) for k, v in selected.items() if v)}
+        if "json" in accept:
+            return 200, objects
+
+        buffer = io.BytesIO()
+        blobs = dict((b["path"], self.blobs[b["path"]]) for b in selected["blobs"] if b["path"] in self.blobs)
+        configsets = dict((c["id"], self.configsets.get(c["id"], {})) for c in selected["collections"])
+        synthApp.writeExportZip(buffer, objects, blobs, configsets, self.zippedConfigsets)
+        return 200, buffer.getvalue()
+
+    def handleImport(self, query, body):
+        """
+        accept the multipart body sent by putApp.py --bulk and load the zip it carries.  Objects which already exist
+        fail the import with importPolicy=abort, are skipped with merge and replaced with overwrite.  The report lists
+        the ids of each type under created, updated, skipped or conflicts.
+        """
+        match = re.search(rb'\r\n\r\n(PK.*)\r\n--[^\r\n]*--', body, re.DOTALL)
+        if not match:
+            return 400, {"message": "no importFile part found"}
+        with zipfile.ZipFile(io.BytesIO(match.group(1))) as zip:
+            objects = json.loads(zip.read("objects.json"))["objects"]
+            app = {"objects": objects, "blobs": {}, "configsets": {}}
+            for name in zip.namelist():
+                path = name.split('/')
+                if path[0] == "blobs":
+                    app["blobs"]["/" + "/".join(path[1:])] = zip.read(name)
+                elif path[0] == "configsets" and len(path) > 2:
+                    app["configsets"].setdefault(path[1], {})["/".join(path[2:])] = zip.read(name)
+        objects.setdefault("fusionApps", [{"id": "imported"}])
+        policy = query.get("importPolicy", ["abort"])[0]
+        existing = {}
+        with self.lock:
+            for type, objs in objects.items():
+                if type == "features":
+                    continue
+                known = self.apps if type == "fusionApps" else self.jobs if type == "jobs" else self.objects.get(type, {})
+                idField = "resource" if type == "jobs" else "id"
+                existing[type] = set(o[idField] for o in objs if o[idField] in known)
+        report = {}
+        for type, objs in objects.items():
+            idField = "resource" if type == "jobs" else "id"
+            ids = list(objs) if type == "features" else [o[idField] for o in objs]
+            for id in ids:
+                if id not in existing.get(type, ()):
+                    outcome = "created"
+                else:
+                    outcome = {"abort": "conflicts", "merge": "skipped"}.get(policy, "updated")
+                report.setdefault(outcome, {}).setdefault(type, []).append(id)
+        if "conflicts" in report:
+            return 409, {"message": "Import aborted, objects already exist", "validationErrors": {"conflicts": report["conflicts"]}}
+        if policy == "merge":
+            for type, ids in existing.items():
+                if type != "fusionApps":
+                    idField = "resource" if type == "jobs" else "id"
+                    objects[type] = [o for o in objects[type] if o[idField] not in ids]
+        self.loadApp(app)
+        return 200, dict(report, status="success")
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately so without TCP_NODELAY every response waits on a delayed ACK
+    disable_nagle_algorithm = True
+    mock = None
+
+    def log_message(self, *params):
+        pass
+
+    def readBody(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b"".join(chunks)
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def serve(self, method):
+        mock = self.mock
+        url = urllib.parse.urlparse(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        body = self.readBody()
+        route = "admin"
+        if url.path == "/__stats":
+            status, result = 200, mock.getStats()
+        elif url.path == "/__reset":
+            mock.resetStats()
+            status, result = 200, {}
+        else:
+            mock.enter()
+            try:
+                mock.delay()
+                if mock.injectError(url.path):
+                    route, status, result = "injected", mock.errorStatus, {"message": "injected error"}
+                else:
+                    try:
+                        route, status, result = mock.handle(method, url.path, query, body, self.headers.get("Accept", ""))
+                    except Exception as ex:
+                        route, status, result = "error", 500, {"message": repr(ex)}
+            finally:
+                mock.leave()
+
+        if isinstance(result, bytes):
+            payload, contentType = result, "application/zip" if result[:2] == b"PK" else "application/octet-stream"
+        elif isinstance(result, str):
+            payload, contentType = result.encode(), "text/plain"
+        else:
+            payload, contentType = json.dumps(result).encode(), "application/json"
+        headers = {}
+        if contentType == "application/zip" and mock.ranges:
+            # export zips are rebuilt for every request so the ETag lets If-Range detect a changed export
+            etag = '"' + hashlib.sha1(payload).hexdigest() + '"'
+            headers = {"Accept-Ranges": "bytes", "ETag": etag}
+            match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+            if status == 200 and match and int(match.group(1)) < len(payload) \
+                    and self.headers.get("If-Range", etag) == etag:
+                start = int(match.group(1))
+                status = 206
+                headers["Content-Range"] = f"bytes {start}-{len(payload) - 1}/{len(payload)}"
+                payload = payload[start:]
+                with mock.lock:
+                    mock.stats["rangeRequests"] += 1
+        drop = contentType == "application/zip" and method == "GET" and mock.dropResponse()
+        self.send_response(status)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if route == "injected" and mock.retryAfter is not None:
+            self.send_header("Retry-After", str(mock.retryAfter))
+        if route == "session":
+            self.send_header("Set-Cookie", "id=mock-session; Path=/")
+        self.end_headers()
+        if drop:
+            self.wfile.write(payload[:len(payload) // 2])
+            self.close_connection = True
+        elif method != "HEAD":
+            self.wfile.write(payload)
+        if route != "admin":
+            mock.count(f"{method} {route}", status, len(body), len(payload))
+
+    def do_GET(self):
+        self.serve("GET")
+
+    def do_HEAD(self):
+        self.serve("HEAD")
+
+    def do_POST(self):
+        self.serve("POST")
+
+    def do_PUT(self):
+        self.serve("PUT")
+
+    def do_DELETE(self):
+        self.serve("DELETE")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve an in-memory mock of the Fusion REST api for benchmarking getApp.py and putApp.py.")
+    parser.add_argument("--port", help="Port to listen on, default: 8764.", type=int, default=8764)
+    parser.add_argument("--app", help="Name of the synthetic app to load, default: bench.", default="bench")
+    parser.add_argument("--size", help="Size of the synthetic app to load, one of " + ", ".join(synthApp.APP_SIZES) + " or none for an empty server, default: small.", default="small")
+    parser.add_argument("--latency", help="Seconds added to every response, default: 0.", type=float, default=0.0)
+    parser.add_argument("--jitter", help="Up to this many random seconds added to every response, default: 0.", type=float, default=0.0)
+    parser.add_argument("--errorRate", help="Fraction of requests answered with --errorStatus, default: 0.", type=float, default=0.0)
+    parser.add_argument("--loadLatency", help="Seconds added to a response for every other request in flight, default: 0.", type=float, default=0.0)
+    parser.add_argument("--retryAfter", help="Retry-After header value sent with injected errors, default: none.", default=None)
+    parser.add_argument("--errorStatus", help="HTTP status used for injected errors, default: 503.", type=int, default=503)
+    parser.add_argument("--errorMatch", help="Only inject errors on request paths matching this regex, default: all paths.", default=None)
+    parser.add_argument("--dropRate", help="Fraction of export zip responses cut off half way, default: 0.", type=float, default=0.0)
+    parser.add_argument("--noRanges", help="Do not serve byte ranges of export zips, default: False.", action="store_true", default=False)
+    parser.add_argument("--zippedConfigsets", help="Export configsets as nested zips (Fusion 4.0.1 layout), default: False.", action="store_true", default=False)
+    parser.add_argument("--seed", help="Random seed for the synthetic app, jitter and errors, default: 0.", type=int, default=0)
+    args = parser.parse_args()
+
+    mock = MockFusion(latency=args.latency, jitter=args.jitter, errorRate=args.errorRate, errorStatus=args.errorStatus,
+                      errorMatch=args.errorMatch, zippedConfigsets=args.zippedConfigsets, seed=args.seed,
+                      loadLatency=args.loadLatency, retryAfter=args.retryAfter, dropRate=args.dropRate,
+                      ranges=not args.noRanges)
+    if args.size != "none":
+        if args.size not in synthApp.APP_SIZES:
+            sys.exit(f"Unknown --size {args.size}")
+        mock.loadApp(synthApp.makeApp(args.app, seed=args.seed, **synthApp.APP_SIZES[args.size]))
+    url = mock.start(args.port)
+    print(f"Mock Fusion serving app '{args.app}' ({args.size}) at {url}, stats at {url}/__stats", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        mock.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Use at your own risk.  No compatibility or maintenance or other assurance of suitability is expressed or implied.
+Update or modify as needed
+"""
+
+#
+# Import getApp.py or putApp.py as a module so their functions can be called without a server.  Used by
+# microBench.py and the unit tests under tests/.
+#
+#  Requires a python 3.x+ interpreter (tested on 3.8.18)
+import argparse
+import importlib.util
+import os
+import re
+
+BIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bin")
+
+
+def loadScript(name, **argValues):
+    """
+    import one of the bin scripts as a module.  The scripts only parse their arguments when run as __main__ so the
+    module level args is set here: every args.<name> the script reads is None unless given in argValues
+    """
+    path = os.path.join(BIN_DIR, name + ".py")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    with open(path) as f:
+        names = set(re.findall(r"\bargs\.(\w+)", f.read()))
+    values = dict.fromkeys(names)
+    values.update(argValues)
+    module.args = argparse.Namespace(**values)
+    return module
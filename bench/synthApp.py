@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Use at your own risk.  No compatibility or maintenance or other assurance of suitability is expressed or implied.
+Update or modify as needed
+"""
+
+#
+# Build synthetic Fusion Apps in the same shape as an /objects/export so that getApp.py and putApp.py can be
+# measured without a live Fusion.  Used by mockFusion.py, benchApps.py and microBench.py.
+#
+# Run standalone to write an export zip and/or the exploded directory getApp.py would make from it:
+#   python3 synthApp.py --size huge --zip huge.zip --dir huge_app
+#
+#  Requires a python 3.x+ interpreter (tested on 3.8.18)
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import zipfile
+
+# preset sizes used by the benchmarks.  Keys are makeApp() parameters
+APP_SIZES = {
+    "small": {"collections": 1, "pipelines": 10, "scriptLines": 10, "blobs": 2, "blobSize": 10 * 1024, "configFiles": 10}
+    ,"medium": {"collections": 3, "pipelines": 100, "scriptLines": 40, "blobs": 20, "blobSize": 100 * 1024, "configFiles": 40}
+    ,"large": {"collections": 5, "pipelines": 500, "scriptLines": 100, "blobs": 50, "blobSize": 1024 * 1024, "configFiles": 120}
+    ,"huge": {"collections": 10, "pipelines": 3000, "scriptLines": 200, "blobs": 200, "blobSize": 256 * 1024, "configFiles": 400, "datasourceDepth": 12}
+}
+BIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bin")
+
+
+def makeScript(lines, rnd):
+    return "\n".join(f"var v{i} = doc.getFirstFieldValue('f{rnd.randint(0, 999)}'); // line {i}" for i in range(lines))
+
+
+def makeStages(count, scriptLines, rnd):
+    stages = []
+    for i in range(count):
+        if i % 2 == 0:
+            stages.append({"type": "javascript-index", "label": f"script {i}", "id": f"stage{i}",
+                           "script": makeScript(scriptLines, rnd), "skip": False})
+        else:
+            stages.append({"type": "field-mapping", "label": f"mapping {i}", "id": f"stage{i}",
+                           "mappings": [{"source": f"f{j}", "target": f"t{j}", "operation": "move"} for j in range(10)]})
+    return stages
+
+
+def makeNestedConfig(depth, index):
+    """
+    a datasource properties block nested depth levels deep.  Leaves include ${var} placeholders like the ones
+    putApp.py --varFile replaces
+    """
+    config = {"password": f"${{ds{index}_password}}", "url": f"https://example.com/{index}", "retries": 3,
+              "headers": [{"name": "X-Token", "value": f"${{ds{index}_token}}"}, {"name": "Accept", "value": "*/*"}]}
+    for level in range(depth):
+        config = {f"level{level}": config, "enabled": True, "includes": [f".*\\.{level}$", f"^/docs/{level}/"]}
+    return config
+
+
+def makeApp(appName="bench", collections=2, pipelines=20, scriptLines=20, blobs=5, blobSize=1024, configFiles=10,
+            datasources=None, sparkJobs=None, datasourceDepth=2, seed=0):
+    """
+    Make a synthetic app.
+
+    :return: dict with "objects" (the objects.json content), "blobs" (blob path to bytes) and
+             "configsets" (collection id to {relative file name: bytes})
+    """
+    rnd = random.Random(seed)
+    if datasources is None:
+        datasources = max(1, pipelines // 10)
+    if sparkJobs is None:
+        sparkJobs = max(1, pipelines // 20)
+
+    colIds = [f"{appName}_col{i}" if i else appName for i in range(collections)]
+    objects = {
+        "fusionApps": [{"id": appName, "name": appName, "description": "synthetic app"}]
+        ,"collections": [{"id": c, "searchClusterId": "default", "type": "DATA",
+                          "solrParams": {"name": c, "numShards": 1, "replicationFactor": 1}} for c in colIds]
+        ,"features": dict((c, [{"name": "signals", "collectionId": c, "params": {}, "enabled": True}]) for c in colIds)
+        ,"indexPipelines": [{"id": f"{appName}_ipl{i}", "stages": makeStages(6, scriptLines, rnd)}
+                            for i in range(pipelines // 2)]
+        ,"queryPipelines": [{"id": f"{appName}_qpl{i}", "stages": makeStages(6, scriptLines, rnd)}
+                            for i in range(pipelines - pipelines // 2)]
+        ,"indexProfiles": [{"id": f"{appName}_ipf{i}", "indexPipeline": f"{appName}_ipl{i}", "collection": colIds[0]}
+                           for i in range(pipelines // 2)]
+        ,"queryProfiles": [{"id": f"{appName}_qpf{i}", "queryPipeline": f"{appName}_qpl{i}", "collection": colIds[0]}
+                           for i in range(pipelines - pipelines // 2)]
+        ,"parsers": [{"id": f"{appName}_parser", "parserStages": [{"type": "json"}, {"type": "text"}]}]
+        ,"dataSources": [{"id": f"{appName}_ds{i}", "connector": "lucidworks.web", "type": "web",
+                          "pipeline": f"{appName}_ipl0", "parserId": f"{appName}_parser",
+                          "properties": {"collection": colIds[0], "startLinks": [f"https://example.com/{i}"],
+                                         "config": makeNestedConfig(datasourceDepth, i)}}
+                         for i in range(datasources)]
+        ,"sparkJobs": [{"id": f"{appName}_spark{i}", "type": "sql_template", "sql": makeScript(scriptLines, rnd)}
+                       for i in range(sparkJobs)]
+        ,"tasks": [{"id": f"{appName}_task", "type": "rest-call", "callParams": {"uri": "solr://x/update"}}]
+        ,"jobs": [{"resource": f"datasource:{appName}_ds0", "enabled": False, "triggers": []}]
+        ,"blobs": []
+    }
+
+    blobData = {}
+    for i in range(blobs):
+        path = f"/lib/{appName}_blob{i}.bin"
+        # what Random.randbytes (python 3.9+) returns for the same state
+        blobData[path] = rnd.getrandbits(8 * blobSize).to_bytes(blobSize, "little") if blobSize else b""
+        objects["blobs"].append({"id": path[1:], "path": path, "dir": "/lib", "filename": f"{appName}_blob{i}.bin",
+                                 "contentType": "application/octet-stream", "size": blobSize,
+                                 "metadata": {"resourceType": "file"}})
+
+    configsets = {}
+    for c in colIds:
+        files = {"managed-schema": b"<schema name='synthetic'>" + b"<field name='f'/>" * 200 + b"</schema>",
+                 "solrconfig.xml": b"<config>" + b"<!-- setting -->" * 200 + b"</config>"}
+        for i in range(max(0, configFiles - 2)):
+            files[f"lang/stopwords_{i}.txt"] = "\n".join(f"word{j}" for j in range(200)).encode()
+        configsets[c] = files
+
+    return {"objects": objects, "blobs": blobData, "configsets": configsets}
+
+
+def writeExportZip(out, objects, blobs, configsets, zippedConfigsets=False):
+    """
+    write an export zip the way /objects/export lays it out.
+
+    :param out: file name or writable file object
+    :param objects: the objects.json content, i.e. {"objects": {...}}
+    :param blobs: blob path to bytes for the blobs to include
+    :param configsets: collection id to {relative file name: bytes} for the configsets to include
+    :param zippedConfigsets: write each configset as a nested configsets/<collection>.zip, the Fusion 4.0.1 layout
+    """
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as zip:
+        zip.writestr("objects.json", json.dumps(objects))
+        for path, data in blobs.items():
+            zip.writestr("blobs" + path, data)
+        for col, files in configsets.items():
+            if zippedConfigsets:
+                inner = io.BytesIO()
+                with zipfile.ZipFile(inner, 'w', zipfile.ZIP_DEFLATED) as configZip:
+                    for name, data in files.items():
+                        configZip.writestr(name, data)
+                zip.writestr(f"configsets/{col}.zip", inner.getvalue())
+            else:
+                for name, data in files.items():
+                    zip.writestr(f"configsets/{col}/{name}", data)
+
+
+def writeAppZip(app, out, zippedConfigsets=False):
+    writeExportZip(out, {"objects": app["objects"]}, app["blobs"], app["configsets"], zippedConfigsets)
+
+
+def explodeAppZip(zipName, dir):
+    """
+    explode an export zip into dir by running getApp.py --zip, no server needed
+    """
+    subprocess.run([sys.executable, os.path.join(BIN_DIR, "getApp.py"), "--zip", zipName, "-d", dir],
+                   check=True, stdout=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic Fusion App as an export zip and/or an exploded directory.")
+    parser.add_argument("--size", help="Preset size, one of " + ", ".join(APP_SIZES) + ", default: large.", default="large")
+    parser.add_argument("--app", help="Name of the synthetic app, default: bench.", default="bench")
+    parser.add_argument("--zip", help="Export zip to write, default: <app>.zip.", default=None)
+    parser.add_argument("--dir", help="Also explode the zip into this directory with getApp.py --zip, default: none.", default=None)
+    parser.add_argument("--zippedConfigsets", help="Write configsets as nested zips (Fusion 4.0.1 layout), default: False.", action="store_true", default=False)
+    parser.add_argument("--seed", help="Random seed, default: 0.", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.size not in APP_SIZES:
+        sys.exit(f"Unknown --size {args.size}")
+    zipName = args.zip or args.app + ".zip"
+    writeAppZip(makeApp(args.app, seed=args.seed, **APP_SIZES[args.size]), zipName, args.zippedConfigsets)
+    print(f"Wrote {zipName} ({os.path.getsize(zipName)} bytes)")
+    if args.dir:
+        explodeAppZip(zipName, args.dir)
+        print(f"Exploded {zipName} into {args.dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -36,40 +36,55 @@ Update or modify as needed
 
 #  Requires a python 3.x+ interpreter (tested on 3.8.9)
 try:
-    import json, sys, argparse, os, subprocess, sys, requests, datetime, re, shutil, types,base64
+    import json, sys, argparse, os, io, subprocess, sys, requests, datetime, re, shutil, types,base64, tempfile, urllib.parse, threading, time, math, atexit, functools, random, email.utils, contextlib, hashlib, queue, mmap, struct, zlib, codecs
     from io import BytesIO, StringIO
     # StringIO moved into io package for Python 3
     # from StringIO import StringIO
-    from zipfile import ZipFile
+    from zipfile import ZipFile, BadZipFile, ZIP_STORED, ZIP_DEFLATED
+    from concurrent.futures import ThreadPoolExecutor, as_completed
     from argparse import RawTextHelpFormatter
 
     # get current dir of this script
     cwd = os.path.dirname(os.path.realpath(sys.argv[0]))
 
+    # linkType is the subject prefix used by the /links api and the <linkType>.ids export param of the type
     OBJ_TYPES = {
         "fusionApps": { "ext": "APP"}
-        ,"zones":{"ext":"ZN"}
-        ,"templates":{"ext":"TPL"}
-        ,"dataModels":{"ext":"DM"}
-        ,"indexPipelines": { "ext": "IPL" }
-        ,"queryPipelines": { "ext": "QPL" }
-        ,"indexProfiles": { "ext": "IPF"  }
-        ,"queryProfiles": { "ext": "QPF" }
-        ,"parsers": { "ext": "PS" }
-        ,"dataSources": { "ext": "DS" }
-        ,"collections": { "ext": "COL", "urlType":"collection"}
+        ,"zones":{"ext":"ZN", "linkType":"zone"}
+        ,"templates":{"ext":"TPL", "linkType":"template"}
+        ,"dataModels":{"ext":"DM", "linkType":"data-model"}
+        ,"indexPipelines": { "ext": "IPL", "linkType":"index-pipeline" }
+        ,"queryPipelines": { "ext": "QPL", "linkType":"query-pipeline" }
+        ,"indexProfiles": { "ext": "IPF", "linkType":"index-profile" }
+        ,"queryProfiles": { "ext": "QPF", "linkType":"query-profile" }
+        ,"parsers": { "ext": "PS", "linkType":"parser" }
+        ,"dataSources": { "ext": "DS", "linkType":"datasource" }
+        ,"collections": { "ext": "COL", "urlType":"collection", "linkType":"collection"}
         ,"jobs": { "ext": "JOB" }
-        ,"tasks": { "ext": 'TSK' }
-        ,"sparkJobs": { "ext": 'SPRK' , "filelist": [] }
-        ,"blobs": { "ext": "BLOB" ,"urlType":"blob"}
+        ,"tasks": { "ext": 'TSK', "linkType":"task" }
+        ,"sparkJobs": { "ext": 'SPRK' , "filelist": [], "linkType":"spark" }
+        ,"blobs": { "ext": "BLOB" ,"urlType":"blob", "linkType":"blob"}
         # features can't be fetched by id in the export API but come along with the collections.
         ,"features": { "ext": "CF"}
     }
+    # job schedules are not linked to the app.  Their ids are the resource they schedule e.g. datasource:myDS
+    JOB_LINK_TYPES = ["datasource", "task", "spark"]
 
     searchClusters = {}
     collections = []
+    # maximum length of the url encoded export query string.  Lowered at runtime if the server answers 414 or 431
     PARAM_SIZE_LIMIT = 6400
+    URI_TOO_LONG_STATUS = (414, 431)
+    # export zips are streamed to disk in chunks of this size. Zips smaller than the spool size stay in memory.
+    # A dropped connection loses at most the chunk being read before the download resumes with a Range request
+    ZIP_CHUNK_SIZE = 64 * 1024
+    ZIP_SPOOL_SIZE = 16 * 1024 * 1024
+    # objects.json is decoded from reads of this many bytes.  The buffer holds the object being decoded plus one read
+    JSON_READ_SIZE = 1024 * 1024
+    # files waiting on each --writers thread.  A full queue holds extraction back so memory stays bounded
+    WRITER_QUEUE_SIZE = 64
     TAG_SUFFIX: str = "_mergeForm"
+    SESSION_REALM = "native"
 
     def eprint(*args, **kwargs):
         print(*args, file=sys.stderr, **kwargs)
@@ -88,6 +103,66 @@ try:
         if args.verbose:
             sprint(msg)
 
+    # --traceFile support.  Spans are written as they end in the Chrome trace event format, a JSON array which
+    # chrome://tracing and ui.perfetto.dev load even when the closing ] is missing after a crash
+    traceOut = None
+    traceLock = threading.Lock()
+    traceStart = time.perf_counter()
+    traceThreads = set()
+
+    def startTrace(fileName):
+        global traceOut
+        traceOut = open(fileName, 'w')
+        traceOut.write("[\n")
+
+    def stopTrace():
+        global traceOut
+        with traceLock:
+            if traceOut is None:
+                return
+            traceOut.write(json.dumps({"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": "getApp"}}) + "\n]\n")
+            traceOut.close()
+            traceOut = None
+
+    def addTraceEvent(name, cat, start, end, spanArgs=None):
+        """
+        write one complete ("X") event.  start and end are time.perf_counter() values
+        """
+        if traceOut is None:
+            return
+        tid = threading.get_ident()
+        event = {"name": name, "cat": cat, "ph": "X", "pid": os.getpid(), "tid": tid,
+                 "ts": round((start - traceStart) * 1e6, 3), "dur": round((end - start) * 1e6, 3)}
+        if spanArgs:
+            event["args"] = spanArgs
+        with traceLock:
+            if traceOut is None:
+                return
+            if tid not in traceThreads:
+                traceThreads.add(tid)
+                traceOut.write(json.dumps({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+                                           "args": {"name": threading.current_thread().name}}) + ",\n")
+            traceOut.write(json.dumps(event, default=str) + ",\n")
+
+    def traced(cat="phase"):
+        """
+        decorator recording a trace span for each call.  The span is named after the function and its short string
+        and int arguments, e.g. putSchema(myCollection)
+        """
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*params, **kwargs):
+                if traceOut is None:
+                    return func(*params, **kwargs)
+                labels = [str(p) for p in params if (isinstance(p, str) and "://" not in p) or (isinstance(p, int) and not isinstance(p, bool))]
+                start = time.perf_counter()
+                try:
+                    return func(*params, **kwargs)
+                finally:
+                    addTraceEvent(f"{func.__name__}({', '.join(labels)})", cat, start, time.perf_counter())
+            return wrapper
+        return decorate
+
     def getSuffix(type):
         return '_' + OBJ_TYPES[type]['ext'] + '.json'
 
@@ -149,155 +224,999 @@ try:
         return uri
 
 
-    def doHttp(url, usr=None, pswd=None, headers={},params={}):
-        response = None
-        auth = None
-        if usr is None:
-            usr = args.user
-        if pswd is None:
-            pswd = args.password
+    httpSession = None
 
-        if args.apiKey is not None:
-            headers['x-api-key'] = args.apiKey
-        else:
-            if args.jwt is not None:
-                headers["Authorization"] = f'Bearer {args.jwt}'
+    def getSession():
+        """
+        One pooled, keep-alive requests.Session is shared by every call so connections and TLS handshakes are reused.
+        Auth headers and certificate verification are applied to the session once here.
+        """
+        global httpSession
+        if httpSession is None:
+            session = requests.Session()
+            # leave room for every --parallel download to hold its own connection
+            poolSize = max(args.poolSize, args.parallel)
+            adapter = requests.adapters.HTTPAdapter(pool_connections=poolSize, pool_maxsize=poolSize)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.verify = not args.noVerify
+            if args.apiKey is not None:
+                session.headers['x-api-key'] = args.apiKey
+            elif args.jwt is not None:
+                session.headers["Authorization"] = f'Bearer {args.jwt}'
+            elif args.sessionAuth:
+                startFusionSession(session)
             else:
-                auth=requests.auth.HTTPBasicAuth(usr, pswd)
+                session.auth = requests.auth.HTTPBasicAuth(args.user, args.password)
+            httpSession = session
+        return httpSession
+
+
+    sessionLock = threading.Lock()
+
+    def isCookieAuth():
+        # the api key and JWT take precedence over a session login
+        return args.sessionAuth and args.apiKey is None and args.jwt is None
+
+
+    def startFusionSession(session):
+        """
+        log in once through Fusion's session api.  The returned cookie authenticates every following request so
+        Fusion does not have to verify the password hash on each call.
+        """
+        url = args.server + "/api/session?realmName=" + SESSION_REALM
+        payload = {"username": args.user, "password": args.password}
+        with sessionLock:
+            response = timedRequest(session, "POST", url, headers={"Content-Type": "application/json"}, data=json.dumps(payload), timeout=requestTimeout())
+        if response.status_code < 200 or response.status_code > 250:
+            sys.exit(f"Non OK response of {response.status_code} when starting a session for user {args.user} at {url}.  Can not proceed.")
+        debug("Started Fusion session for user " + args.user)
+
+
+    # per (method, endpoint) http metrics, kept for the --metricsFile and --prometheusFile summaries
+    httpMetrics = {}
+    metricsLock = threading.Lock()
+    metricsStart = time.time()
+    objectCount = 0
+    # apis whose endpoint is named by two path segments e.g. connectors/datasources
+    METRIC_API_PREFIXES = ["templating", "connectors", "spark", "objects"]
+    METRIC_PREFIX = "fusion_getput_"
+
+    def endpointOf(url):
+        """
+        :return: the Fusion api called by url, used to group metrics e.g. index-pipelines, solr-config, export
+        """
+        parts = [p for p in urllib.parse.urlsplit(url).path.split('/') if p]
+        if parts and parts[0] == "api":
+            parts = parts[1:]
+        if len(parts) > 2 and parts[0] == "apps":
+            parts = parts[2:]
+        if not parts:
+            return "other"
+        if parts[0] == "collections" and len(parts) > 2:
+            return parts[2]
+        if parts[0] in METRIC_API_PREFIXES and len(parts) > 1:
+            return "/".join(parts[:2])
+        return parts[0]
+
+    def recordHttpMetric(method, url, response, seconds, retry=False, stream=False):
+        """
+        :param response: the response or None if the request raised
+        :param seconds: wall time of the call.  For streamed responses this ends when the headers arrive
+        :param retry: True if this call repeats an earlier one
+        """
+        if response is None:
+            status, sent, received, toHeaders = "error", 0, 0, seconds
+        else:
+            status = response.status_code
+            sent = int(response.request.headers.get("Content-Length") or 0)
+            received = 0 if stream else len(response.content)
+            toHeaders = response.elapsed.total_seconds()
+        with metricsLock:
+            m = httpMetrics.setdefault((method, endpointOf(url)), {"latencies": [], "toHeaders": [], "statuses": {},
+                                                                   "retries": 0, "bytesSent": 0, "bytesReceived": 0})
+            m["latencies"].append(seconds)
+            m["toHeaders"].append(toHeaders)
+            m["statuses"][str(status)] = m["statuses"].get(str(status), 0) + 1
+            m["retries"] += 1 if retry else 0
+            m["bytesSent"] += sent
+            m["bytesReceived"] += received
+
+    def addReceivedBytes(method, url, count):
+        # body bytes of a streamed response, counted as they are read
+        with metricsLock:
+            httpMetrics[(method, endpointOf(url))]["bytesReceived"] += count
+
+    def timedRequest(session, method, url, retry=False, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+        except requests.RequestException as ex:
+            end = time.perf_counter()
+            recordHttpMetric(method, url, None, end - start, retry)
+            addTraceEvent(f"{method} {endpointOf(url)}", "http", start, end, {"url": url, "error": repr(ex)})
+            raise
+        end = time.perf_counter()
+        recordHttpMetric(method, url, response, end - start, retry, kwargs.get("stream", False))
+        addTraceEvent(f"{method} {endpointOf(url)}", "http", start, end,
+                      {"url": response.url, "status": response.status_code, "retry": retry})
+        return response
+
+    def countObject():
+        global objectCount
+        with metricsLock:
+            objectCount += 1
+
+    def percentile(values, p):
+        ordered = sorted(values)
+        return ordered[max(0, math.ceil(p * len(ordered)) - 1)] if ordered else 0
+
+    def metricsSummary():
+        wall = time.time() - metricsStart
+        endpoints = []
+        with metricsLock:
+            for (method, endpoint), m in sorted(httpMetrics.items()):
+                latencies = m["latencies"]
+                endpoints.append({"method": method, "endpoint": endpoint, "count": len(latencies),
+                                  "statuses": dict(m["statuses"]), "retries": m["retries"],
+                                  "bytesSent": m["bytesSent"], "bytesReceived": m["bytesReceived"],
+                                  "totalSeconds": round(sum(latencies), 6),
+                                  "latency": {"p50": percentile(latencies, 0.5), "p95": percentile(latencies, 0.95),
+                                              "max": max(latencies)},
+                                  "timeToHeaders": {"p50": percentile(m["toHeaders"], 0.5),
+                                                    "p95": percentile(m["toHeaders"], 0.95)},
+                                  "callsPerSecond": len(latencies) / wall if wall else 0})
+            objects = objectCount
+        return {"script": "getApp", "server": args.server, "app": args.app,
+                "startTime": datetime.datetime.fromtimestamp(metricsStart).isoformat(),
+                "wallSeconds": wall, "requests": sum(e["count"] for e in endpoints),
+                "objects": objects, "objectsPerSecond": objects / wall if wall else 0, "endpoints": endpoints}
+
+    def writePrometheus(summary, fileName):
+        """
+        write the summary in the Prometheus textfile collector format.  The file is replaced atomically so a
+        collector never reads a partial file
+        """
+        lines = []
+        def family(name, type, help, samples):
+            lines.append(f"# HELP {METRIC_PREFIX}{name} {help}")
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} {type}")
+            for suffix, labels, value in samples:
+                labelText = ",".join(f'{k}="{v}"' for k, v in dict(script=summary["script"], **labels).items())
+                lines.append(f"{METRIC_PREFIX}{name}{suffix}{{{labelText}}} {value}")
+
+        endpoints = summary["endpoints"]
+        key = lambda e: {"method": e["method"], "endpoint": e["endpoint"]}
+        family("http_requests_total", "counter", "HTTP requests by method, endpoint and status.",
+               [("", dict(key(e), status=s), n) for e in endpoints for s, n in sorted(e["statuses"].items())])
+        family("http_request_duration_seconds", "summary", "HTTP request latency by method and endpoint.",
+               [("", dict(key(e), quantile=q), e["latency"][p]) for e in endpoints for q, p in [("0.5", "p50"), ("0.95", "p95"), ("1", "max")]]
+               + [("_sum", key(e), e["totalSeconds"]) for e in endpoints]
+               + [("_count", key(e), e["count"]) for e in endpoints])
+        family("http_retries_total", "counter", "HTTP requests repeated after a failed attempt.",
+               [("", key(e), e["retries"]) for e in endpoints])
+        family("http_sent_bytes_total", "counter", "HTTP request body bytes.",
+               [("", key(e), e["bytesSent"]) for e in endpoints])
+        family("http_received_bytes_total", "counter", "HTTP response body bytes.",
+               [("", key(e), e["bytesReceived"]) for e in endpoints])
+        family("objects_total", "counter", "Objects written to files.", [("", {}, summary["objects"])])
+        family("objects_per_second", "gauge", "Objects per second of run time.", [("", {}, summary["objectsPerSecond"])])
+        family("run_seconds", "gauge", "Wall time of the run.", [("", {}, summary["wallSeconds"])])
+
+        with open(fileName + ".tmp", 'w') as out:
+            out.write("\n".join(lines) + "\n")
+        os.replace(fileName + ".tmp", fileName)
+
+    def writeMetrics():
+        """
+        registered with atexit so the summaries are also written when the run fails part way
+        """
+        summary = metricsSummary()
+        if args.metricsFile:
+            with open(args.metricsFile, 'w') as out:
+                json.dump(summary, out, indent=2)
+            sprint(f"Wrote HTTP metrics for {summary['requests']} requests to {args.metricsFile}")
+        if args.prometheusFile:
+            writePrometheus(summary, args.prometheusFile)
+
+    hostSemaphores = {}
+    hostLock = threading.Lock()
+
+    def hostSlot(url):
+        """
+        :return: a context which holds one of the request slots for the host of url.  That is an AdaptiveLimit capped
+                 at --parallel with --adaptive, otherwise no limit beyond the --parallel download pool
+        """
+        if not args.adaptive:
+            return contextlib.nullcontext()
+        host = urllib.parse.urlsplit(url).netloc
+        with hostLock:
+            return hostSemaphores.setdefault(host, AdaptiveLimit(max(1, args.parallel)))
+
+    # statuses meaning Fusion, or a gateway in front of it, is overloaded or restarting.  Such requests are retried
+    RETRY_STATUSES = (429, 502, 503, 504)
+    # statuses with which Fusion itself turned a request away unprocessed.  Only these are safe to repeat for a POST,
+    # a 502 or 504 from a gateway may come after Fusion already applied it
+    REJECTED_STATUSES = (429, 503)
+    IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE")
+    # with --adaptive a response only signals load when it is this many times slower than the fastest seen for its
+    # endpoint and also slower than ADAPTIVE_LATENCY_FLOOR seconds
+    ADAPTIVE_LATENCY_FACTOR = 3.0
+    ADAPTIVE_LATENCY_FLOOR = 0.25
+
+    class AdaptiveLimit:
+        """
+        AIMD limit on the requests in flight to one host.  Each response that is fast and not an overload status adds
+        1/limit to the limit, so it grows by about one per round trip while the limit is in use.  A retryable status,
+        a failed connection or a latency spike halves it, at most once per round trip.
+        """
+        def __init__(self, ceiling):
+            self.ceiling = ceiling
+            self.limit = float(ceiling)
+            self.inFlight = 0
+            self.lastDecrease = 0.0
+            self.fastest = {}
+            self.condition = threading.Condition()
+
+        def __enter__(self):
+            with self.condition:
+                while self.inFlight >= max(1, int(self.limit)):
+                    self.condition.wait()
+                self.inFlight += 1
+            return self
+
+        def __exit__(self, *exc):
+            with self.condition:
+                self.inFlight -= 1
+                self.condition.notify()
+
+        def observe(self, endpoint, seconds, overloaded):
+            # called while the request still holds its slot
+            with self.condition:
+                fastest = min(self.fastest.get(endpoint, seconds), seconds)
+                self.fastest[endpoint] = fastest
+                slow = seconds > max(fastest * ADAPTIVE_LATENCY_FACTOR, ADAPTIVE_LATENCY_FLOOR)
+                now = time.monotonic()
+                if overloaded or slow:
+                    if now - self.lastDecrease > seconds:
+                        self.limit = max(1.0, min(self.limit, self.inFlight) / 2)
+                        self.lastDecrease = now
+                        debug(f"Lowered the request limit to {int(self.limit)} after a {'slow' if slow else 'failed'} {endpoint} call")
+                elif self.inFlight >= int(self.limit):
+                    self.limit = min(float(self.ceiling), self.limit + 1 / self.limit)
+                self.condition.notify_all()
+
+    def requestTimeout():
+        # --timeout 0 waits forever for a response
+        return (args.connectTimeout, args.timeout or None)
+
+    def isRetryableError(method, ex):
+        # a failed connect never reached Fusion.  Any later failure may have been applied so only idempotent calls repeat
+        return isinstance(ex, requests.ConnectTimeout) or method in IDEMPOTENT_METHODS
+
+    def isRetryableStatus(method, status):
+        return status in REJECTED_STATUSES or (status in RETRY_STATUSES and method in IDEMPOTENT_METHODS)
+
+    def retryDelay(attempt, response):
+        """
+        :return: seconds to wait before retrying.  A Retry-After from the server is honoured (up to --maxBackoff),
+                 otherwise full jitter exponential backoff from --backoff
+        """
+        retryAfter = response.headers.get("Retry-After") if response is not None else None
+        if retryAfter:
+            try:
+                delay = float(retryAfter)
+            except ValueError:
+                try:
+                    delay = (email.utils.parsedate_to_datetime(retryAfter) - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return min(max(0.0, delay), args.maxBackoff)
+        return random.uniform(0, min(args.maxBackoff, args.backoff * 2 ** attempt))
+
+    def rewindPayload(kwargs):
+        data = kwargs.get("data")
+        if hasattr(data, "seek"):
+            data.seek(0)
+
+    def holdSlot(response, slot, endpoint, start):
+        """
+        keep the request slot of a streamed response until the response is closed, i.e. its body has been read, so
+        --adaptive limits the body transfers and sees how long they take
+        """
+        close = response.close
+        held = [slot]
+
+        def closeAndRelease():
+            close()
+            if held:
+                slot = held.pop()
+                if isinstance(slot, AdaptiveLimit):
+                    slot.observe(endpoint, time.perf_counter() - start, False)
+                slot.__exit__(None, None, None)
+        response.close = closeAndRelease
+
+    def requestWithRetry(session, method, url, **kwargs):
+        """
+        send a request through the request slot of its host.  Responses with one of RETRY_STATUSES (only
+        REJECTED_STATUSES for a POST) and failed connections are retried up to --retries times after a backoff.
+        An expired session is renewed once.
+        """
+        kwargs.setdefault("timeout", requestTimeout())
+        attempt = 0
+        renewed = False
+        while True:
+            slot = hostSlot(url)
+            slot.__enter__()
+            start = time.perf_counter()
+            held = False
+            try:
+                try:
+                    response, error = timedRequest(session, method, url, retry=attempt > 0 or renewed, **kwargs), None
+                except (requests.ConnectionError, requests.Timeout) as ex:
+                    response, error = None, ex
+                overloaded = error is not None or response.status_code in RETRY_STATUSES
+                if kwargs.get("stream") and not overloaded:
+                    holdSlot(response, slot, endpointOf(url), start)
+                    held = True
+                elif isinstance(slot, AdaptiveLimit):
+                    slot.observe(endpointOf(url), time.perf_counter() - start, overloaded)
+            finally:
+                # any other exception e.g. InvalidURL or TooManyRedirects must not keep the slot
+                if not held:
+                    slot.__exit__(None, None, None)
+            if error is not None:
+                if attempt >= args.retries or not isRetryableError(method, error):
+                    raise error
+            elif response.status_code == 401 and isCookieAuth() and kwargs.get("auth") is None and not renewed:
+                # session cookies expire.  Log in again and retry once
+                debug("Fusion session expired, logging in again")
+                response.close()
+                startFusionSession(session)
+                renewed = True
+                rewindPayload(kwargs)
+                continue
+            elif not isRetryableStatus(method, response.status_code) or attempt >= args.retries:
+                return response
+            delay = retryDelay(attempt, response)
+            debug(f"Retrying {method} {url} in {delay:.2f}s after {error if error is not None else response.status_code}")
+            if response is not None:
+                response.close()
+            time.sleep(delay)
+            rewindPayload(kwargs)
+            attempt += 1
+
+    def doHttp(url, usr=None, pswd=None, headers={},params={}, stream=False):
+        response = None
+        auth = None
+        # the session carries the auth for args.user.  Only send basic auth per call when asked to act as someone else
+        if (usr is not None or pswd is not None) and args.apiKey is None and args.jwt is None:
+            auth=requests.auth.HTTPBasicAuth(usr or args.user, pswd or args.password)
 
-        verify = not args.noVerify
         try:
-            debug("calling requests.get url:" + url + " usr:" + usr + " pswd:" + pswd + " headers:" + str(headers))
-            response = requests.get(url, auth=auth, headers=headers, verify=verify,params=params)
-            return response
-        except requests.ConnectionError as e:
+            debug("calling requests.get url:" + url + " headers:" + str(headers))
+            return requestWithRetry(getSession(), "GET", url, auth=auth, headers=headers, params=params, stream=stream)
+        except (requests.ConnectionError, requests.Timeout) as e:
             eprint(e)
 
 
-    def makeExportParamsFromJson(j):
+    class RequestTooLarge(Exception):
+        """ raised when the server rejects an export because the URL or headers are too long (HTTP 414/431) """
+        pass
+
+
+    def newExportParams():
+        return {"filterPolicy":"system","deep":"false"}
+
+
+    def encodedParamSize(params):
+        # measure what requests will actually send i.e. list values become repeated key=value pairs
+        return len(urllib.parse.urlencode(params, doseq=True))
+
+
+    def packExportParams(idsByKey, limit):
         """
-        Make n export URL containing all of the needed id えぇめんts existing in the objects.json file
-        :param j:
-        :return　list of sized dictionaries of params such that none exceeds 6.5k:
+        First-fit packing of individual ids into as few export param sets as possible.  Ids of one type may be
+        spread across several sets so that no set exceeds the limit, even when a single type has thousands of ids.
+
+        :param idsByKey: dict of url param name e.g. blob.ids to the list of ids
+        :param limit: maximum url encoded query string length of each param set
+        :return: list of params dictionaries
         """
-        url = makeBaseUri() + "/objects/export"
         allParams = []
-        params = {"filterPolicy":"system","deep":"false"}
-        #allParams.insert(0,params)
+        sizes = []
+        baseSize = encodedParamSize(newExportParams())
+        for key, ids in idsByKey.items():
+            for id in ids:
+                # one '&' plus the encoded key=value pair
+                cost = 1 + encodedParamSize({key: id})
+                for i, params in enumerate(allParams):
+                    if sizes[i] + cost <= limit:
+                        params.setdefault(key, []).append(id)
+                        sizes[i] += cost
+                        break
+                else:
+                    if baseSize + cost > limit:
+                        eprint(f"Export param {key}={id} alone exceeds the param size limit of {limit}.")
+                    params = newExportParams()
+                    params[key] = [id]
+                    allParams.append(params)
+                    sizes.append(baseSize + cost)
+        return allParams
+
+
+    def makeExportParamsFromJson(j, limit=None):
+        """
+        Make n export URL containing all of the needed id elements existing in the objects.json file
+        :param j:
+        :param limit: maximum url encoded query string length, default args.paramSizeLimit
+        :return　list of sized dictionaries of params such that none exceeds the limit:
+        """
+        if limit is None:
+            limit = args.paramSizeLimit
 
         if j is None or not "objects" in j:
-            return allParams
+            return []
 
         objects = j["objects"]
         # save the fusionApps[0] element
         if "fusionApps" in objects and isinstance(objects["fusionApps"],list):
             OBJ_TYPES["fusionApps"]["appDef"] = objects["fusionApps"][0]
 
-        keys = OBJ_TYPES.keys()
-
-        for key in keys:
-            if key in objects:
-                items = objects[key]
-
+        idsByKey = {}
+        for key in OBJ_TYPES.keys():
+            if key in objects and "urlType" in OBJ_TYPES[key]:
                 itms = []
-                for item in items:
+                for item in objects[key]:
                     if isinstance(item,dict) \
                             and "id" in item \
                             and not (key == "blobs" and item["id"].startswith("prefs-")):
                         itms.append(item["id"])
+                if itms:
+                    idsByKey[OBJ_TYPES[key]["urlType"] + ".ids"] = itms
 
-                if isinstance(itms, list) and "urlType" in OBJ_TYPES[key]:
-                    # check and see if adding this set of params would push us over the limit.
-                    # If so, store off the smaller params set in allParams and start a new one
-                    if len(str(params)) + len(str(itms)) > PARAM_SIZE_LIMIT:
-                        allParams.insert(0,params)
-                        params = {"filterPolicy":"system","deep":"false"}
-                        params[OBJ_TYPES[key]["urlType"] + ".ids"] = itms
-                    # otherwise add to the current params list since we are under the size limit
-                    else:
-                        params[OBJ_TYPES[key]["urlType"] + ".ids"] = itms
-
-        ## add any fragment params in to the results.  For small apps, this may be everything
-        if len(params) > 1 and not params in allParams:
-            allParams.insert(0,params)
-        return allParams
+        return packExportParams(idsByKey, limit)
 
 
+    def splitExportParams(params, limit):
+        idsByKey = dict((k, v if isinstance(v, list) else [v]) for k, v in params.items() if k.endswith(".ids"))
+        return packExportParams(idsByKey, limit)
 
+
+
+    @traced()
     def doGetJsonApp():
         """
         fetch a json export of the app.  The purpose is to get a list of everything that belongs to the App.
         Then, after extracting all but the blobs and collections fetch those into Zip(s) and extract including files.
         All this to work around the fact that we can't export an app to a zip without query_rewrite
         """
+        global exportIncomplete
         url = makeBaseUri() + "/objects/export?filterPolicy=system&app.ids=" + args.app
         headers = {'accept': 'application/json'}
         try:
 
             debug("calling requests.get url:" + url + " headers:" + str(headers))
             sprint(f"Getting JSON elements of APP {args.app} from {args.server}")
-            response = doHttp(url,headers=headers)
+            response = doHttp(url,headers=headers, stream=True)
             if response is not None and response.status_code == 200:
                 contentType = response.headers['Content-Type']
                 if "application/json" in contentType:
-                    j = json.loads(response.content)
-                    exportParams = makeExportParamsFromJson(j)
-                    ## in addition to processing all of the zip files from exportParam sets, we need to output
-                    # APP and possibly features but don't grab blobs and collections.  Those need to come from full zips
-                    # Might depend on 5.x release whether the object exists - remove them if present
-                    if 'blobs' in j['objects']:
-                        j['objects'].pop('blobs')
-                    else:
-                        debug("blobs key does not exist")
-                    if 'collections' in j['objects']:
-                        j['objects'].pop('collections')
-                    else:
-                        debug("collections key does not exist")
-
-                    sprint(f"Extracting contents of downloaded APP {args.app}")
-                    extractAppFromZip(objects=j,validateAppName=True)
-                    url = makeBaseUri() + "/objects/export"
-                    index = 0
-                    for params in exportParams:
-                        if args.verbose:
-                            index += 1
-                            sprint(f"\nFetching Zip export from {url} params set {index}")
-                        zipfile = doHttpZipGet( url,params=params)
-                        extractAppFromZip(zipfile,validateAppName=False)
+                    # the export is spooled to disk and parsed one object at a time rather than held in memory whole
+                    exportObjects = {"objects": {}}
+                    with SpooledFile(max_size=ZIP_SPOOL_SIZE) as spool:
+                        if not downloadBody(response, spool, url, headers=headers):
+                            exportIncomplete = True
+                            return
+                        spool.seek(0)
+                        ## in addition to processing all of the zip files from exportParam sets, we need to output
+                        # APP and possibly features but don't grab blobs and collections.  Those need to come from full zips.
+                        # The default cluster collections are registered now so configsets are recognized no matter which
+                        # zip they arrive in or in which order the zips are extracted
+                        sprint(f"Extracting contents of downloaded APP {args.app}")
+                        extractObjectsJson(spool, True, exportObjects)
+                        drainWriters()
+                    fetchAndExtractZips(makeExportParamsFromJson(exportObjects))
+                else:
+                    exportIncomplete = True
+                    response.close()
+
+            else:
+                exportIncomplete = True
+                if response is not None and response.status_code == 401 and 'unauthorized' in response.text:
+                    eprint(
+                        "Non OK response of " + str(response.status_code) + " for URL: " + url + "\nCheck your password\n")
+                elif response is not None and response.status_code:
+                    eprint("Non OK response of " + str(response.status_code) + " for URL: " + url)
+                if response is not None:
+                    response.close()
+        except Exception as e:
+            exportIncomplete = True
+            eprint( f"Exception when fetching App: {str(e)}" )
+
+
+
+    def makeExportParamsFromLinks(links, app, limit=None):
+        """
+        Make export param sets for every object linked to the app so that the zips alone hold the complete app.
+
+        :param links: list of link objects from the /links api i.e. {"subject":"blob:x.zip","object":"app:A",...}
+        :param app: id of the app being exported.  app.ids is packed first so the fusionApps element comes along
+        :return: list of sized dictionaries of params such that none exceeds the limit
+        """
+        if limit is None:
+            limit = args.paramSizeLimit
+        idsByKey = {"app.ids": [app]}
+        exportTypes = [v["linkType"] for v in OBJ_TYPES.values() if "linkType" in v]
+        for link in links:
+            if not isinstance(link, dict) or link.get("object") != f"app:{app}" or ":" not in link.get("subject", ""):
+                continue
+            type, id = link["subject"].split(":", 1)
+            if type not in exportTypes or (type == "blob" and id.startswith("prefs-")):
+                continue
+            ids = idsByKey.setdefault(type + ".ids", [])
+            if id in ids:
+                # /links can list the same subject more than once
+                continue
+            ids.append(id)
+            if type in JOB_LINK_TYPES:
+                idsByKey.setdefault("job.ids", []).append(link["subject"])
+
+        return packExportParams(idsByKey, limit)
 
+
+    @traced()
+    def doGetZipApp():
+        """
+        fetch the app using only zip exports.  The first call asks /links for the ids of everything in the App rather
+        than downloading a full JSON export, so each object body crosses the wire once.
+        """
+        global exportIncomplete
+        url = makeBaseUri() + "/links"
+        headers = {'accept': 'application/json'}
+        try:
+            sprint(f"Getting inventory of APP {args.app} from {args.server}")
+            response = doHttp(url,headers=headers,params={"object": f"app:{args.app}", "linkType": "inContextOf"})
+            if response is not None and response.status_code == 200:
+                links = json.loads(response.content)
+                if not links:
+                    sys.exit("No Fusion App called '" + args.app + "' found on server '" + args.server + "'.  Can not proceed.")
+                exportParams = makeExportParamsFromLinks(links, args.app)
+                fetchAndExtractZips(exportParams)
             else:
+                exportIncomplete = True
                 if response is not None and response.status_code == 401 and 'unauthorized' in response.text:
                     eprint(
                         "Non OK response of " + str(response.status_code) + " for URL: " + url + "\nCheck your password\n")
                 elif response is not None and response.status_code:
                     eprint("Non OK response of " + str(response.status_code) + " for URL: " + url)
         except Exception as e:
+            exportIncomplete = True
             eprint( f"Exception when fetching App: {str(e)}" )
 
 
+    # the journal of export param sets already downloaded and extracted into --dir, see fetchAndExtractZips()
+    JOURNAL_FILE = ".getApp.journal"
+    journalFd = None
+    completedExports = set()
+
+    def openJournal():
+        """
+        with --resume, load the param sets completed by earlier runs exporting the same app from the same server,
+        otherwise start the journal over.  Lines are only ever appended so a crash can at worst leave a torn last
+        line, which is ignored
+        """
+        global journalFd
+        path = os.path.join(args.dir, JOURNAL_FILE)
+        endsClean = True
+        if args.resume and os.path.isfile(path):
+            with open(path, 'r') as journal:
+                for line in journal:
+                    endsClean = line.endswith("\n")
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(entry, dict) and entry.get("server") == args.server and entry.get("app") == args.app:
+                        completedExports.add(entry["key"])
+            sprint(f"Resuming with {len(completedExports)} completed export param sets recorded in {path}")
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND | (0 if args.resume else os.O_TRUNC)
+        try:
+            journalFd = os.open(path, flags, 0o644)
+        except OSError as ex:
+            sprint(f"WARNING: can not write the export journal {path}, --resume will not be possible. {ex}")
+            return
+        if not endsClean:
+            os.write(journalFd, b"\n")
+
+    def closeJournal():
+        """
+        a journal is only needed to resume an export that did not finish.  Remove it once every param set is in --dir
+        so a clean export leaves nothing but the app's files behind
+        """
+        global journalFd
+        if journalFd is None:
+            return
+        os.close(journalFd)
+        journalFd = None
+        if not exportIncomplete:
+            os.remove(os.path.join(args.dir, JOURNAL_FILE))
+
+    def exportParamsKey(params):
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+    def recordExport(params):
+        if journalFd is None:
+            return
+        line = json.dumps({"key": exportParamsKey(params), "server": args.server, "app": args.app,
+                           "time": datetime.datetime.now().isoformat()}) + "\n"
+        os.write(journalFd, line.encode())
+        os.fsync(journalFd)
+
+    def extractExportZips(zips, params):
+        """
+        extract the zips fetched for one param set and journal the set once all of them arrived intact
+        """
+        global exportIncomplete
+        for zipfile in zips:
+            if zipfile is not None:
+                extractAppFromZip(zipfile,validateAppName=False)
+        if zips and None not in zips:
+            recordExport(params)
+        else:
+            exportIncomplete = True
+
+
+    @traced()
+    def fetchAndExtractZips(exportParams):
+        global resumedExports
+        url = makeBaseUri() + "/objects/export"
+        pending = [(index, params) for index, params in enumerate(exportParams, start=1)
+                   if exportParamsKey(params) not in completedExports]
+        resumedExports += len(exportParams) - len(pending)
+        if len(pending) < len(exportParams):
+            sprint(f"Skipping {len(exportParams) - len(pending)} of {len(exportParams)} export param sets completed by an earlier run")
+        if args.parallel > 1 and len(pending) > 1:
+            # downloads run in the pool while this thread extracts each zip as it arrives.  Extraction
+            # stays on a single thread so writes to args.dir never race
+            with ThreadPoolExecutor(max_workers=args.parallel) as pool:
+                futures = dict((pool.submit(fetchExportZips, url, params, str(index)), params)
+                               for index, params in pending)
+                for future in as_completed(futures):
+                    extractExportZips(future.result(), futures[future])
+        else:
+            for index, params in pending:
+                extractExportZips(fetchExportZips(url, params, str(index)), params)
+
+
+    def fetchExportZips(url, params, index):
+        """
+        Fetch the export for one param set.  If the server says the request is too long, lower args.paramSizeLimit
+        for the rest of the run and fetch the ids of this set in smaller pieces.
+
+        :return: list of ZipFile
+        """
+        try:
+            return [fetchExportZip(url, params, index)]
+        except RequestTooLarge as e:
+            size = encodedParamSize(params)
+            args.paramSizeLimit = min(args.paramSizeLimit, size // 2)
+            pieces = splitExportParams(params, args.paramSizeLimit)
+            if len(pieces) < 2:
+                eprint(f"{str(e)}  Param set {index} can not be split any further.")
+                return []
+            sprint(f"Export params set {index} of size {size} was rejected with {str(e)}. "
+                   f"Retrying as {len(pieces)} sets with param size limit {args.paramSizeLimit}.")
+            zips = []
+            for subIndex, piece in enumerate(pieces, start=1):
+                zips.extend(fetchExportZips(url, piece, f"{index}_{subIndex}"))
+            return zips
+
+
+    @traced()
+    def fetchExportZip(url, params, index):
+        if args.verbose:
+            sprint(f"\nFetching Zip export from {url} params set {index}")
+        targetPath = None
+        if args.zipDir is not None:
+            targetPath = os.path.join(args.zipDir, f"{args.app}_export_{index}.zip")
+        return doHttpZipGet( url,params=params,targetPath=targetPath)
+
+
+    class SpooledFile(tempfile.SpooledTemporaryFile):
+        """
+        SpooledTemporaryFile only has the seekable() and readable() ZipFile asks for from Python 3.11 on
+        """
+        def readable(self):
+            return True
+
+        def seekable(self):
+            return True
+
+        def writable(self):
+            return True
+
+
+    def doHttpZipGet(url, usr=None, pswd=None,params={}, targetPath=None):
+        """
+        Stream a zip export to disk rather than holding the whole response in memory.
 
-    def doHttpZipGet(url, usr=None, pswd=None,params={}):
+        :param targetPath: if set, the zip is written to this file and kept.  Otherwise a spooled temp file is used
+        :return: a ZipFile opened over the downloaded content or None
+        """
         response = None
-        response = doHttp(url, usr, pswd,params=params)
+        response = doHttp(url, usr, pswd,params=params, stream=True)
         if response is not None and response.status_code == 200:
             contentType = response.headers['Content-Type']
             debug("contentType of response is " + contentType)
             # use a contains check since the contentType may be 'application/json; utf-8' or multi-valued
             if "application/zip" in contentType:
-                content = response.content
-                zipfile = ZipFile(BytesIO(content))
-                return zipfile
+                if targetPath is not None:
+                    zipDir = os.path.dirname(targetPath)
+                    if zipDir and not os.path.isdir(zipDir):
+                        os.makedirs(zipDir)
+                    out = open(targetPath, 'w+b')
+                else:
+                    out = SpooledFile(max_size=ZIP_SPOOL_SIZE)
+                if not downloadBody(response, out, url, usr, pswd, params):
+                    out.close()
+                    return None
+                out.seek(0)
+                try:
+                    return ZipFile(out)
+                except BadZipFile as ex:
+                    out.close()
+                    eprint(f"Downloaded export from {url} is not a valid zip: {str(ex)}")
             else:
+                response.close()
                 eprint("Non Zip content type of '" + contentType + "' for url:'" + url + "'")
+        elif response is not None and response.status_code in URI_TOO_LONG_STATUS:
+            response.close()
+            raise RequestTooLarge(f"HTTP {response.status_code} {response.reason}")
         elif response is not None and response.status_code != 200:
             eprint("Non OK response of " + str(response.status_code) + " for URL: " + url)
             if response.reason is not None:
                 eprint("\tReported Reason: '" + response.reason + "'")
+            response.close()
         else:
             # Bad url?? bad protocol?
             eprint("Problem requesting URL: '" + url + "'.  Check server, protocol, port, etc.")
 
 
+    def expectedLength(response):
+        """
+        :return: the byte count the body should have or None if unknown.  A body decoded from a Content-Encoding does
+                 not have the length the header reports
+        """
+        length = response.headers.get('Content-Length', '')
+        encoding = response.headers.get('Content-Encoding', 'identity')
+        return int(length) if length.isdigit() and encoding == 'identity' else None
+
+
+    def downloadBody(response, out, url, usr=None, pswd=None, params={}, headers={}):
+        """
+        Copy the body of a streamed 200 response to out.  If the connection drops or the body comes up short, the
+        download continues from the bytes already in out with a Range request when the server advertises byte
+        ranges, otherwise it starts over.  If-Range makes the server send the whole body again if the export changed.
+
+        :param headers: headers of the original request, sent again with any Range request
+        :return: True once the body is complete and, when the server sent one, matches the Content-Length
+        """
+        expected = expectedLength(response)
+        validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+        rangesOk = expected is not None and response.headers.get('Accept-Ranges', '').lower() == 'bytes'
+        attempt = 0
+        while True:
+            error = "no response"
+            if response is not None:
+                try:
+                    with response:
+                        for chunk in response.iter_content(chunk_size=ZIP_CHUNK_SIZE):
+                            out.write(chunk)
+                            addReceivedBytes("GET", url, len(chunk))
+                    if expected is None or out.tell() == expected:
+                        return True
+                    error = f"received {out.tell()} of {expected} bytes"
+                except (requests.exceptions.ChunkedEncodingError, requests.ConnectionError, requests.Timeout) as e:
+                    error = str(e)
+            attempt += 1
+            if attempt > args.retries:
+                eprint(f"Download from {url} failed after {attempt} attempts: {error}")
+                return False
+
+            received = out.tell()
+            rangeHeaders = {}
+            if rangesOk and 0 < received < expected:
+                rangeHeaders['Range'] = f"bytes={received}-"
+                if validator:
+                    rangeHeaders['If-Range'] = validator
+                sprint(f"Download from {url} interrupted ({error}).  Resuming at byte {received} of {expected}.")
+            else:
+                sprint(f"Download from {url} interrupted ({error}).  Starting over.")
+            time.sleep(retryDelay(attempt, None))
+            response = doHttp(url, usr, pswd, headers=dict(headers, **rangeHeaders), params=params, stream=True)
+            if response is None:
+                continue
+            contentRange = response.headers.get('Content-Range', '')
+            if response.status_code == 206 and rangeHeaders and contentRange.startswith(f"bytes {received}-") \
+                    and contentRange.endswith(f"/{expected}"):
+                debug(f"resuming download with Content-Range {contentRange}")
+            elif response.status_code == 200:
+                out.seek(0)
+                out.truncate()
+                expected = expectedLength(response)
+                validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+                rangesOk = expected is not None and response.headers.get('Accept-Ranges', '').lower() == 'bytes'
+            elif response.status_code == 206:
+                # not the range asked for, so fetch the whole body next time
+                debug(f"unexpected Content-Range '{contentRange}' for a download from byte {received}")
+                response.close()
+                response = None
+                rangesOk = False
+            else:
+                response.close()
+                eprint(f"Non OK response of {response.status_code} resuming download from {url}")
+                return False
+
+
+    class JsonStream:
+        """
+        Pull parser over a binary stream of JSON for walking objects.json one object at a time.  Each value is decoded
+        with json.JSONDecoder.raw_decode from a buffer which holds only the value being decoded plus what has been
+        read past it
+        """
+        WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+        def __init__(self, stream):
+            self.stream = stream
+            self.decoder = json.JSONDecoder()
+            self.textDecoder = codecs.getincrementaldecoder('utf-8-sig')()
+            self.buffer = ""
+            self.pos = 0
+            self.eof = False
+
+        def fill(self, size=JSON_READ_SIZE):
+            data = self.stream.read(size)
+            self.eof = not data
+            # drop what has been consumed
+            self.buffer = self.buffer[self.pos:] + self.textDecoder.decode(data, final=self.eof)
+            self.pos = 0
+
+        def peek(self):
+            """
+            :return: the next character which is not whitespace or "" at the end of the stream
+            """
+            while True:
+                self.pos = self.WHITESPACE.match(self.buffer, self.pos).end()
+                if self.pos < len(self.buffer) or self.eof:
+                    return self.buffer[self.pos:self.pos + 1]
+                self.fill()
+
+        def expect(self, chars):
+            c = self.peek()
+            if not c or c not in chars:
+                raise json.JSONDecodeError(f"Expecting one of '{chars}'", self.buffer, self.pos)
+            self.pos += 1
+            return c
+
+        def value(self):
+            self.peek()
+            size = JSON_READ_SIZE
+            while True:
+                try:
+                    value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                    # a number cut off by the end of the buffer e.g. 1.5 of 1.5e3 decodes too, so only trust a value
+                    # followed by something which can not be part of a number
+                    if self.eof or (end < len(self.buffer) and self.buffer[end] not in "0123456789+-.eE"):
+                        self.pos = end
+                        return value
+                except json.JSONDecodeError:
+                    if self.eof:
+                        raise
+                # the value goes past the end of the buffer.  Growing reads keep a big value from being decoded
+                # over and over
+                self.fill(size)
+                size *= 2
+
+        def keys(self):
+            """
+            yield the member names of the object just opened.  The caller reads each member's value before asking
+            for the next name
+            """
+            if self.peek() == "}":
+                self.pos += 1
+                return
+            while True:
+                key = self.value()
+                if not isinstance(key, str):
+                    raise json.JSONDecodeError("Expecting property name", self.buffer, self.pos)
+                self.expect(":")
+                yield key
+                if self.expect(",}") == "}":
+                    return
+
+        def elements(self):
+            """
+            yield the values of the array just opened
+            """
+            if self.peek() == "]":
+                self.pos += 1
+                return
+            while True:
+                yield self.value()
+                if self.expect(",]") == "]":
+                    return
+
+
+    def iterObjectsJson(stream):
+        """
+        yield (type, key, element) for the elements of each objects.<type> value of an objects.json stream, decoding
+        one element at a time.  key is None for the elements of an array and the member name for the members of an
+        object such as features, which is keyed by collection id
+        """
+        reader = JsonStream(stream)
+        reader.expect("{")
+        for name in reader.keys():
+            if name != "objects" or reader.peek() != "{":
+                reader.value()
+                continue
+            reader.expect("{")
+            for type in reader.keys():
+                if reader.peek() == "[":
+                    reader.expect("[")
+                    for element in reader.elements():
+                        yield type, None, element
+                elif reader.peek() == "{":
+                    reader.expect("{")
+                    for key in reader.keys():
+                        yield type, key, reader.value()
+                else:
+                    debug(f"skipping objects.{type} which is neither a list nor an object")
+                    reader.value()
+
+
+    def checkAppName(stream):
+        """
+        exit unless the first fusionApps element of an objects.json stream is args.app.  Reading stops there
+        """
+        appId = None
+        for type, key, element in iterObjectsJson(stream):
+            if type == "fusionApps":
+                appId = element.get('id') if key is None and isinstance(element, dict) else None
+                break
+        if not appId or appId != args.app:
+            sys.exit("No Fusion App called '" + args.app + "' found on server '" + args.server + "'.  Can not proceed.")
+
+
+    def extractObjectsJson(stream, validateAppName=True, exportObjects=None):
+        """
+        Write out the objects of an objects.json stream one at a time so memory is bounded by the largest object rather
+        than the whole app.  With validateAppName the stream is read twice, the first time only as far as the
+        fusionApps element, so nothing is written for the wrong app.
+
+        :param stream: seekable binary stream
+        :param exportObjects: if set, blobs and collections are not written.  Their ids, and the fusionApps element, are
+                              added to it in the objects.json shape makeExportParamsFromJson() takes and the default
+                              cluster collections are registered
+        """
+        if validateAppName and args.app is not None:
+            checkAppName(stream)
+            stream.seek(0)
+        for type, key, element in iterObjectsJson(stream):
+            if exportObjects is not None and key is None:
+                if type == "fusionApps":
+                    exportObjects["objects"].setdefault(type, []).append(element)
+                elif "urlType" in OBJ_TYPES.get(type, {}) and isinstance(element, dict) and "id" in element:
+                    exportObjects["objects"].setdefault(type, []).append({"id": element["id"]})
+                if type == "collections":
+                    collectDefaultCollectionIds([element])
+            if exportObjects is not None and type in ("blobs", "collections"):
+                continue
+            doObjectTypeSwitch([element] if key is None else {key: element}, type)
+
+
+    @traced()
     def extractAppFromZip( zipfile = None, objects=None, validateAppName = True):
         """
         Either zipfile or objects must be valued but not both
@@ -316,22 +1235,23 @@ try:
             filelist = zipfile.namelist()
             if not "objects.json" in filelist:
                 sys.exit("Exported zip does not contain objects.json.  Can not proceed.")
-            jstr = zipfile.open("objects.json").read()
-            objects = json.loads(jstr)
-
-        # check to be sure that the requested application exists and give error if not
-        if validateAppName and args.app is not None and not ( objects and
-                                     (len(objects['objects']) > 0) and
-                                     ( objects['objects']['fusionApps']) and
-                                     ( objects['objects']['fusionApps'][0]['id']) and
-                                     ( objects['objects']['fusionApps'][0]['id'] == args.app)):
-            sys.exit("No Fusion App called '" + args.app + "' found on server '" + args.server + "'.  Can not proceed.")
-
-        # sorting ensures that collections are known when other elements are extracted
-        # python 3 iterkeys() -> keys()
-        for type in sorted(objects['objects'].keys()):
-            # obj will be the name of the object type just under objects i.e. objects.collections, indexPipelines etc.
-            doObjectTypeSwitch(objects['objects'][type], type)
+            # objects are written as they are parsed.  Configsets are only extracted below, once every collection is known
+            with zipfile.open("objects.json") as stream:
+                extractObjectsJson(stream, validateAppName)
+        else:
+            # check to be sure that the requested application exists and give error if not
+            if validateAppName and args.app is not None and not ( objects and
+                                         (len(objects['objects']) > 0) and
+                                         ( objects['objects']['fusionApps']) and
+                                         ( objects['objects']['fusionApps'][0]['id']) and
+                                         ( objects['objects']['fusionApps'][0]['id'] == args.app)):
+                sys.exit("No Fusion App called '" + args.app + "' found on server '" + args.server + "'.  Can not proceed.")
+
+            # sorting ensures that collections are known when other elements are extracted
+            # python 3 iterkeys() -> keys()
+            for type in sorted(objects['objects'].keys()):
+                # obj will be the name of the object type just under objects i.e. objects.collections, indexPipelines etc.
+                doObjectTypeSwitch(objects['objects'][type], type)
 
         # global collections[] will hold exported collection names.  Get the configsets for those and write them out as well
         for filename in filelist:
@@ -339,9 +1259,10 @@ try:
                 extractFromZip(filename, zipfile)
             elif shouldExtractEmbeddedZip(filename):
                 extractZip(filename, zipfile)
+        drainWriters()
 
         if zipfile:
-           zipfile.close()
+            closeZip(zipfile)
 
 
     # check for blob zips which should be extracted intact or non-zipped configsets
@@ -370,22 +1291,345 @@ try:
         return False
 
 
+    # every file this export wrote or, with --incremental, found unchanged.  Used by --deleteStale
+    exportedFiles = set()
+    writeCounts = {"written": 0, "unchanged": 0, "deleted": 0}
+    writeLock = threading.Lock()
+    # set when an export request or param set failed.  --deleteStale then leaves --dir alone and the journal is kept
+    # for --resume.  Warnings such as a skipped zero length file do not set it
+    exportIncomplete = False
+    # param sets skipped by --resume.  Their files are in --dir but not in exportedFiles so --deleteStale is skipped too
+    resumedExports = 0
+
+    class WriterPool:
+        """
+        Writes files on worker threads while the caller goes on parsing and serialising.  A path always goes to the
+        same thread so writes to one file keep their order and the output is the same as writing inline.  The first
+        error raised by a write is raised again by drain()
+        """
+        def __init__(self, count):
+            self.queues = [queue.Queue(maxsize=WRITER_QUEUE_SIZE) for _ in range(count)]
+            self.error = None
+            for i, q in enumerate(self.queues):
+                threading.Thread(target=self.run, args=(q,), name=f"writer-{i}", daemon=True).start()
+
+        def run(self, q):
+            while True:
+                func, params = q.get()
+                try:
+                    if self.error is None:
+                        func(*params)
+                except Exception as ex:
+                    self.error = ex
+                finally:
+                    q.task_done()
+
+        def submit(self, path, func, *params):
+            # blocks while the queue of the path's thread is full
+            self.queues[hash(path) % len(self.queues)].put((func, params))
+
+        def drain(self):
+            for q in self.queues:
+                q.join()
+            if self.error is not None:
+                error, self.error = self.error, None
+                raise error
+
+    writerPool = None
+
+    def writeFile(path, func, *params):
+        """
+        run func(*params), which writes path, on the --writers pool or inline if --writers is 0
+        """
+        global writerPool
+        if not args.writers:
+            func(*params)
+            return
+        if writerPool is None:
+            writerPool = WriterPool(args.writers)
+        writerPool.submit(path, func, *params)
+
+    def drainWriters():
+        if writerPool is not None:
+            writerPool.drain()
+
+    def countWrite(key):
+        with writeLock:
+            writeCounts[key] += 1
+
+    def fileMatches(path, size, chunks):
+        """
+        :param chunks: iterable of the new content
+        :return: True if the file at path already holds exactly the size bytes chunks yields
+        """
+        if not os.path.isfile(path) or os.path.getsize(path) != size:
+            return False
+        with open(path, 'rb') as f:
+            for chunk in chunks:
+                if f.read(len(chunk)) != chunk:
+                    return False
+        return True
+
+    class MappedFile(io.RawIOBase):
+        """
+        read only file over a memoryview, so ZipFile can read the directory of a memory mapped archive, or of a
+        stored zip nested in one, without copying it
+        """
+        def __init__(self, view):
+            self.view = view
+            self.pos = 0
+
+        def readable(self):
+            return True
+
+        def seekable(self):
+            return True
+
+        def readinto(self, buffer):
+            data = self.view[self.pos:self.pos + len(buffer)]
+            buffer[:len(data)] = data
+            self.pos += len(data)
+            return len(data)
+
+        def seek(self, offset, whence=io.SEEK_SET):
+            base = {io.SEEK_SET: 0, io.SEEK_CUR: self.pos, io.SEEK_END: len(self.view)}[whence]
+            self.pos = base + offset
+            return self.pos
+
+        def tell(self):
+            return self.pos
+
+    def openMappedZip(file):
+        """
+        memory map an open binary file and read it as a zip whose stored and deflated members extractMember()
+        streams straight out of the map.  The map stays valid after the file is closed
+
+        :return: the ZipFile or None if the file can not be mapped e.g. it is empty
+        """
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as ex:
+            debug(f"can not memory map {file.name}. {ex}")
+            return None
+        try:
+            zip = mappedZip(mapped, 0, len(mapped))
+        except BaseException:
+            mapped.close()
+            raise
+        # unmapped by closeZip.  A zip nested in place shares the map of its parent and leaves it alone
+        zip.ownsMap = True
+        return zip
+
+    def mappedZip(mapped, start, end):
+        """
+        :return: ZipFile over mapped[start:end]
+        """
+        view = memoryview(mapped)[start:end]
+        try:
+            zip = ZipFile(MappedFile(view))
+        except BaseException:
+            view.release()
+            raise
+        zip.view = view
+        zip.mapped = mapped
+        zip.base = start
+        return zip
+
+    def closeZip(zip):
+        """
+        close a zip along with the file object it reads, which ZipFile leaves open when it was handed one, and the
+        memory map it owns
+        """
+        fp = zip.fp
+        zip.close()
+        if fp is not None and not fp.closed:
+            fp.close()
+        if getattr(zip, "view", None) is not None:
+            zip.view.release()
+            zip.view = None
+        if getattr(zip, "ownsMap", False):
+            try:
+                zip.mapped.close()
+            except BufferError:
+                # a chunk sliced from the map is still referenced.  The map goes once that chunk is collected
+                debug("memory map still in use, left to be unmapped on collection")
+
+    def memberRange(zip, info):
+        """
+        :return: (start, end) of the still compressed bytes of a member in zip.view
+        """
+        start = info.header_offset
+        header = zip.view[start:start + 30]
+        if len(header) < 30 or bytes(header[:4]) != b"PK\x03\x04":
+            raise BadZipFile(f"Bad local file header for {info.filename}")
+        nameLength, extraLength = struct.unpack("<HH", header[26:30])
+        start += 30 + nameLength + extraLength
+        if start + info.compress_size > len(zip.view):
+            raise BadZipFile(f"Truncated data for {info.filename}")
+        return start, start + info.compress_size
+
+    def releasePages(zip, start, end):
+        """
+        drop the whole pages of zip.view[start:end] from the resident memory of this process once they have been
+        read.  They are paged back in from the file if read again, so peak memory does not grow with the archive
+        """
+        if not hasattr(mmap, "MADV_DONTNEED"):
+            return
+        first = -(-(zip.base + start) // mmap.PAGESIZE) * mmap.PAGESIZE
+        last = (zip.base + end) // mmap.PAGESIZE * mmap.PAGESIZE
+        if last > first:
+            zip.mapped.madvise(mmap.MADV_DONTNEED, first, last - first)
+
+    def isMapped(zip, info):
+        # encrypted and other compression types go through ZipFile
+        return getattr(zip, "view", None) is not None and not info.flag_bits & 0x1 \
+            and info.compress_type in (ZIP_STORED, ZIP_DEFLATED)
+
+    def memberChunks(zip, info):
+        """
+        yield the content of a member in chunks of at most ZIP_CHUNK_SIZE.  Members of a memory mapped zip are
+        inflated, or for stored members sliced, straight from the map and their CRC checked at the end
+        """
+        if not isMapped(zip, info):
+            with zip.open(info) as stream:
+                yield from iter(lambda: stream.read(ZIP_CHUNK_SIZE), b"")
+            return
+        start, end = memberRange(zip, info)
+        inflater = zlib.decompressobj(-zlib.MAX_WBITS) if info.compress_type == ZIP_DEFLATED else None
+        crc = 0
+        for offset in range(start, end, ZIP_CHUNK_SIZE):
+            chunk = zip.view[offset:min(end, offset + ZIP_CHUNK_SIZE)]
+            if inflater is None:
+                crc = zlib.crc32(chunk, crc)
+                yield chunk
+            else:
+                # bounded output so a highly compressed member can not balloon a single chunk
+                while chunk:
+                    out = inflater.decompress(chunk, ZIP_CHUNK_SIZE)
+                    chunk = inflater.unconsumed_tail
+                    crc = zlib.crc32(out, crc)
+                    yield out
+            releasePages(zip, start, min(end, offset + ZIP_CHUNK_SIZE))
+        if inflater is not None:
+            out = inflater.flush()
+            crc = zlib.crc32(out, crc)
+            yield out
+        if crc != info.CRC:
+            raise BadZipFile(f"Bad CRC-32 for file {info.filename}")
+
+    def memberPath(outputDir, info):
+        """
+        :return: the path ZipFile.extract() writes a member to, i.e. without empty, . and .. parts and on windows
+                 without a drive or characters windows does not allow
+        """
+        name = info.filename.replace('/', os.path.sep)
+        if os.path.altsep:
+            name = name.replace(os.path.altsep, os.path.sep)
+        parts = [p for p in os.path.splitdrive(name)[1].split(os.path.sep) if p not in ('', os.path.curdir, os.path.pardir)]
+        if os.path.sep == '\\':
+            parts = [p for p in (re.sub(r'[:<>|"?*]', '_', p).rstrip('.') for p in parts) if p]
+        return os.path.normpath(os.path.join(outputDir, *parts))
+
+    def extractMember(zip, info, outputDir):
+        path = memberPath(outputDir, info)
+        exportedFiles.add(path)
+        writeFile(path, writeMember, zip, info, outputDir, path)
+
+    @traced("io")
+    def writeMember(zip, info, outputDir, path):
+        """
+        extract one zip member into outputDir.  With --incremental, a file already holding the same bytes is left
+        alone so its mtime is kept
+        """
+        if args.incremental and fileMatches(path, info.file_size, memberChunks(zip, info)):
+            countWrite("unchanged")
+            return
+        # ZipFile.extract is not safe against another thread making the same directory
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if isMapped(zip, info):
+            with open(path, 'wb') as out:
+                for chunk in memberChunks(zip, info):
+                    out.write(chunk)
+        else:
+            zip.extract(info, outputDir)
+        countWrite("written")
+
+
     def extractFromZip(filename, zip):
         # there seems to be a bug in the creation of the zip by the export routine and some files are zero length
         # don't save these since they would produce an empty file which would overwrite the blob on import
-        if zip.getinfo(filename).file_size > 0:
-            zip.extract(filename, args.dir)
+        info = zip.getinfo(filename)
+        if info.file_size > 0:
+            extractMember(zip, info, args.dir)
         else:
             eprint("File " + filename + " in archive is zero length. Extraction skipped.")
 
 
+    @traced("io")
     def extractZip(filename, zip):
         path = filename.split('/')
         path[-1] = os.path.splitext(path[-1])[0]
         outputDir = os.path.join(args.dir, *path)
-        zfiledata = BytesIO(zip.read(filename))
-        with ZipFile(zfiledata) as zf:
-            zf.extractall(outputDir)
+        zf = openNestedZip(zip, zip.getinfo(filename))
+        try:
+            for info in zf.infolist():
+                if info.is_dir():
+                    os.makedirs(memberPath(outputDir, info), exist_ok=True)
+                else:
+                    extractMember(zf, info, outputDir)
+            # the writers may still hold chunks read from zf
+            drainWriters()
+        finally:
+            closeZip(zf)
+
+
+    def openNestedZip(zip, info):
+        """
+        a stored zip inside a memory mapped zip is read in place.  Otherwise the nested zip is inflated into a temp
+        file which is then memory mapped, so it is never held in memory as a whole.  Release it with closeZip()
+        """
+        if isMapped(zip, info) and info.compress_type == ZIP_STORED:
+            start, end = memberRange(zip, info)
+            return mappedZip(zip.mapped, zip.base + start, zip.base + end)
+        spill = tempfile.TemporaryFile()
+        try:
+            for chunk in memberChunks(zip, info):
+                spill.write(chunk)
+            spill.flush()
+            zf = openMappedZip(spill)
+            if zf is None:
+                # read through the temp file instead, closeZip closes it with the zip
+                spill.seek(0)
+                zf = ZipFile(spill)
+                spill = None
+            return zf
+        finally:
+            if spill is not None:
+                spill.close()
+
+
+    def deleteStaleFiles():
+        """
+        --deleteStale: remove the files under the object directories of --dir which this export did not produce, i.e.
+        those of objects no longer in the app.  Nothing is removed when the export may be incomplete
+        """
+        if exportIncomplete or resumedExports:
+            sprint("WARNING: failed or --resume skipped export param sets mean the export is incomplete.  No stale files were deleted.")
+            return
+        subDirs = set(OBJ_TYPES) | {"collectionFeatures", "configsets"}
+        for subDir in sorted(subDirs):
+            top = os.path.join(args.dir, subDir)
+            # bottom up so directories emptied of stale files can be removed too
+            for root, dirs, files in os.walk(top, topdown=False):
+                for f in files:
+                    path = os.path.normpath(os.path.join(root, f))
+                    if path not in exportedFiles:
+                        verbose("Deleting stale file " + path)
+                        os.remove(path)
+                        with writeLock:
+                            writeCounts["deleted"] += 1
+                if root != top and not os.listdir(root):
+                    os.rmdir(root)
 
 
     #
@@ -423,28 +1667,40 @@ try:
         else:
             subDir = altSubDir
 
-        if type and not os.path.isdir(os.path.join(args.dir,subDir)):
-            os.makedirs(os.path.join(args.dir,subDir))
-
-
-        with open(os.path.join(args.dir, subDir,filename2), 'w') as outfile:
-            # sorting keys makes the output source-control friendly.  Do we also want to strip out
-            if "updates" in jData:
-                jData.pop('updates', None)
-            if "modifiedTime" in jData:
-                jData.pop('modifiedTime', None)
-            if "version" in jData:
-                jData.pop('version', None)
-
-            if not args.noStageIdMunge and "stages" in jData:
-                stages = jData["stages"]
-                for i, stage in enumerate(stages):
-                    if "secretSourceStageId" in stage:
-                        stage.pop("secretSourceStageId",None)
-                    stage["id"] = mungeStageId(stage, str(i))
-
-            outfile.write(json.dumps(jData, indent=4, sort_keys=True,separators=(', ', ': ')))
-            outfile.close()
+        # sorting keys makes the output source-control friendly.  Do we also want to strip out
+        if "updates" in jData:
+            jData.pop('updates', None)
+        if "modifiedTime" in jData:
+            jData.pop('modifiedTime', None)
+        if "version" in jData:
+            jData.pop('version', None)
+
+        if not args.noStageIdMunge and "stages" in jData:
+            stages = jData["stages"]
+            for i, stage in enumerate(stages):
+                if "secretSourceStageId" in stage:
+                    stage.pop("secretSourceStageId",None)
+                stage["id"] = mungeStageId(stage, str(i))
+
+        content = json.dumps(jData, indent=4, sort_keys=True,separators=(', ', ': '))
+        path = os.path.normpath(os.path.join(args.dir, subDir,filename2))
+        exportedFiles.add(path)
+        writeFile(path, writeJsonFile, path, content)
+        countObject()
+
+    @traced("io")
+    def writeJsonFile(path, content):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        unchanged = False
+        if args.incremental and os.path.isfile(path):
+            with open(path, 'r') as infile:
+                unchanged = infile.read() == content
+        if unchanged:
+            countWrite("unchanged")
+        else:
+            with open(path, 'w') as outfile:
+                outfile.write(content)
+            countWrite("written")
 
     def mungeStageId(stage, idxStr):
         type = stage.get("type","")
@@ -535,16 +1791,19 @@ try:
             filename = applySuffix(col.replace(':', '_').replace('/', '_'), type)
             jsonToFile(features,type,filename,altSubDir="collectionFeatures")
 
+    def collectDefaultCollectionIds(elements):
+        # keep track of the default collections (global) we are exporting so that schema can be exported as well
+        # do not export schema for collections on non-default clusters.  Best to not mess with remote config
+        for e in elements:
+            if e['searchClusterId'] == 'default' and e['id'] not in collections:
+                collections.append(e['id'])
+
     def collectCollections(elements, type="collections"):
         keep = []
         for e in elements:
-            id = e['id']
             keep.append(e)
-            # make sure associated clusters are exported
-            # keep track of the default collections (global) we are exporting so that schema can be exported as well
-            # do not export schema for collections on non-default clusters.  Best to not mess with remote config
-            if e['searchClusterId'] == 'default':
-                collections.append(id)
+        # make sure associated clusters are exported
+        collectDefaultCollectionIds(elements)
 
         collectById(keep, type)
 
@@ -555,6 +1814,11 @@ try:
 
     def main():
         initArgs()
+        if args.metricsFile or args.prometheusFile:
+            atexit.register(writeMetrics)
+        if args.traceFile:
+            startTrace(args.traceFile)
+            atexit.register(stopTrace)
         # create if missing
         if not os.path.isdir(args.dir):
             os.makedirs(args.dir)
@@ -563,10 +1827,26 @@ try:
         zipfile = None
         if args.zip is not None:
             sprint("Getting export zip from file '" + args.zip + "'.")
-            zipfile = ZipFile(args.zip, 'r')
+            with open(args.zip, 'rb') as zipIn:
+                zipfile = openMappedZip(zipIn)
+            if zipfile is None:
+                zipfile = ZipFile(args.zip, 'r')
             extractAppFromZip(zipfile)
+        elif args.singleDownload:
+            if not args.noJournal:
+                openJournal()
+            doGetZipApp()
+            closeJournal()
         else:
+            if not args.noJournal:
+                openJournal()
             doGetJsonApp()
+            closeJournal()
+
+        if args.deleteStale:
+            deleteStaleFiles()
+        if args.incremental or args.deleteStale:
+            sprint(f"Wrote {writeCounts['written']} files, left {writeCounts['unchanged']} unchanged files alone and deleted {writeCounts['deleted']} stale files in {args.dir}")
 
 
     if __name__ == "__main__":
@@ -593,16 +1873,67 @@ try:
                         help="Fusion Password,  default: ${lw_PASSWORD}.")  # ,default="password123"
         parser.add_argument("--jwt",help="JWT token for access to Fusion.  If set, --user, --password will be ignored",default=None)
         parser.add_argument("--apiKey",help="API Key for access to Fusion.  If set, --user, --password and --jwt will be ignored",default=None)
+        parser.add_argument("--sessionAuth", help="Log in once via Fusion's session api and use the session cookie rather than sending\n--user, --password with every request.  Ignored if --jwt or --apiKey is set, default: False.",
+                            default=False, action="store_true")
         parser.add_argument("-v", "--verbose", help="Print details, default: False.", default=False,
                             action="store_true")  # default=False
         parser.add_argument("--debug", help="Print debug messages while running, default: False.", default=False,
                             action="store_true")  # default=False
         parser.add_argument("--noVerify", help="Do not verify SSL certificates if using https, default: False.",
                             default=False, action="store_true")  # default=False
+        parser.add_argument("--timeout", type=float, metavar="SECS",
+                            help="Seconds to wait for a response, or for the next bytes of one, from Fusion.  0 waits forever, \ndefault: 120.",
+                            default=120)
+        parser.add_argument("--connectTimeout", type=float, metavar="SECS",
+                            help="Seconds to wait for a connection to Fusion, default: 10.", default=10)
+        parser.add_argument("--retries", type=int, metavar="N",
+                            help="Number of times to retry a request answered with 429, 502, 503 or 504, that could not connect \nor that timed out, default: 3.",
+                            default=3)
+        parser.add_argument("--backoff", type=float, metavar="SECS",
+                            help="Base of the jittered exponential delay between retries.  A Retry-After header from the \nserver takes precedence, default: 0.5.",
+                            default=0.5)
+        parser.add_argument("--maxBackoff", type=float, metavar="SECS",
+                            help="Longest delay between retries, including one asked for by Retry-After, default: 30.",
+                            default=30)
+        parser.add_argument("--adaptive", help="Adapt the number of concurrent downloads (up to --parallel): halve it when Fusion answers \nwith an overload status or slows down, grow it back while responses are fast, default: False.",
+                            default=False, action="store_true")
+        parser.add_argument("--poolSize", type=int, metavar="N",
+                            help="Number of keep-alive connections to pool per host, default: 10.", default=10)
 
         parser.add_argument("-z", "--zip",
                             help="Path and name of the Zip file to read from rather than using an export from --server, \ndefault: None.",
                             default=None)
+        parser.add_argument("--zipDir",
+                            help="Directory in which to keep the export zips downloaded from --server.  If not set, downloads \nare streamed to temporary files and discarded after extraction, default: None.",
+                            default=None)
+        parser.add_argument("--paramSizeLimit", type=int, metavar="LEN",
+                            help="Maximum length of the export query string sent to --server.  Lowered automatically if the \nserver responds 414 or 431, default: " + str(PARAM_SIZE_LIMIT) + ".",
+                            default=PARAM_SIZE_LIMIT)
+        parser.add_argument("--singleDownload", help="Fetch the app only as zip exports using an id inventory from the /links api \nrather than a full JSON export followed by zips of the blobs and collections, default: False.",
+                            default=False, action="store_true")
+        parser.add_argument("--parallel", type=int, metavar="N",
+                            help="Number of export zips to download concurrently from --server, default: 1.",
+                            default=1)
+        parser.add_argument("--metricsFile", metavar="FILE",
+                            help="Write per endpoint HTTP latency (p50/p95/max), status, retry and byte counts plus objects \nper second to this JSON file at the end of the run, default: None.",
+                            default=None)
+        parser.add_argument("--prometheusFile", metavar="FILE",
+                            help="Also write the HTTP metrics to this file in the Prometheus textfile format, default: None.",
+                            default=None)
+        parser.add_argument("--traceFile", metavar="FILE",
+                            help="Write a span for each phase, HTTP request and file write to this file in the Chrome trace \nevent format.  Open it in chrome://tracing or ui.perfetto.dev, default: None.",
+                            default=None)
+        parser.add_argument("--writers", type=int, metavar="N",
+                            help="Number of threads writing exported files while extraction goes on.  Helps most on network \nfilesystems.  0 writes each file as it is extracted, default: 0.",
+                            default=0)
+        parser.add_argument("--incremental", help="Export into an existing --dir writing only the files whose content differs from what is \nalready there, so unchanged files keep their modification times, default: False.",
+                            default=False, action="store_true")
+        parser.add_argument("--deleteStale", help="Delete files in the object directories of --dir that the export did not produce, i.e. \nthose of objects no longer in the app.  Skipped if an export request failed or --resume skipped \npart of the export, default: False.",
+                            default=False, action="store_true")
+        parser.add_argument("--resume", help="Skip the export param sets recorded as completed in DIR/" + JOURNAL_FILE + " by an earlier \nrun exporting the same --app from the same --server into the same --dir, default: False.",
+                            default=False, action="store_true")
+        parser.add_argument("--noJournal", help="Do not record completed export param sets in DIR/" + JOURNAL_FILE + ".  The journal is \nremoved once an export completes without errors, default: False.",
+                            default=False, action="store_true")
         parser.add_argument( "--noStageIdMunge", help="Experimental: may become default.  If True, do not munge pipeline stage ids. default: False.", default=False,
                              action="store_true")
 
@@ -10,9 +10,11 @@ Update or modify as needed
 
 #  Requires a python 2.7.5+ interpreter
 try:
-    import json, sys, argparse, os, subprocess, sys, requests, datetime, re, urllib
+    import json, sys, argparse, os, subprocess, sys, requests, datetime, re, urllib, urllib.parse, threading, contextlib, itertools, time, tempfile, shutil, uuid, math, atexit, functools, random, email.utils, hashlib
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
     from argparse import RawTextHelpFormatter
     from pathlib import Path
+    from zipfile import ZipFile, ZIP_DEFLATED
 
     # get current dir of this script
     cwd = os.path.dirname(os.path.realpath(sys.argv[0]))
@@ -42,12 +44,95 @@ try:
 
     }
 
+    # types which must be completely uploaded before any object of the keyed type when running with --workers.
+    # The app always goes first, each collection goes before its own features and schema.
+    UPLOAD_DEPENDENCIES = {
+        "collections": []
+        ,"features": []
+        ,"blobs": []
+        ,"dataModels": ["collections"]
+        ,"parsers": ["blobs"]
+        ,"indexPipelines": ["blobs", "parsers", "dataModels", "collections"]
+        ,"queryPipelines": ["blobs", "dataModels", "collections"]
+        ,"indexProfiles": ["indexPipelines", "collections"]
+        ,"queryProfiles": ["queryPipelines", "collections"]
+        ,"tasks": ["blobs", "collections"]
+        ,"sparkJobs": ["blobs", "collections"]
+        ,"dataSources": ["blobs", "parsers", "indexPipelines", "collections"]
+        ,"jobs": ["tasks", "sparkJobs", "dataSources"]
+        ,"zones": ["queryProfiles", "queryPipelines"]
+        ,"templates": ["zones"]
+    }
+
     varReplacements = None
     replacePattern = r"^\$\{(.*)\}$"
     # array of ext =  [ OBJ_TYPES[k]['ext'] for k in OBJ_TYPES.keys() ] or [v['ext'] for v in OBJ_TYPES.values() if 'ext' in v]
     # rework above to be keyed by extension v[1]['ext'] contining value of {type, filelist}
     EXT_FILES_MAP = dict((v[1]['ext'],{'type':v[0],'filelist':v[1]['filelist']}) for v in [v for v in OBJ_TYPES.items() ])
     TAG_SUFFIX: str = "_mergeForm"
+    SESSION_REALM = "native"
+    # fields which differ between otherwise identical objects.  Ignored by the --skipUnchanged comparison
+    VOLATILE_FIELDS = ["updates", "modifiedTime", "version"]
+
+    # --traceFile support.  Spans are written as they end in the Chrome trace event format, a JSON array which
+    # chrome://tracing and ui.perfetto.dev load even when the closing ] is missing after a crash
+    traceOut = None
+    traceLock = threading.Lock()
+    traceStart = time.perf_counter()
+    traceThreads = set()
+
+    def startTrace(fileName):
+        global traceOut
+        traceOut = open(fileName, 'w')
+        traceOut.write("[\n")
+
+    def stopTrace():
+        global traceOut
+        with traceLock:
+            if traceOut is None:
+                return
+            traceOut.write(json.dumps({"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": "putApp"}}) + "\n]\n")
+            traceOut.close()
+            traceOut = None
+
+    def addTraceEvent(name, cat, start, end, spanArgs=None):
+        """
+        write one complete ("X") event.  start and end are time.perf_counter() values
+        """
+        if traceOut is None:
+            return
+        tid = threading.get_ident()
+        event = {"name": name, "cat": cat, "ph": "X", "pid": os.getpid(), "tid": tid,
+                 "ts": round((start - traceStart) * 1e6, 3), "dur": round((end - start) * 1e6, 3)}
+        if spanArgs:
+            event["args"] = spanArgs
+        with traceLock:
+            if traceOut is None:
+                return
+            if tid not in traceThreads:
+                traceThreads.add(tid)
+                traceOut.write(json.dumps({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+                                           "args": {"name": threading.current_thread().name}}) + ",\n")
+            traceOut.write(json.dumps(event, default=str) + ",\n")
+
+    def traced(cat="phase"):
+        """
+        decorator recording a trace span for each call.  The span is named after the function and its short string
+        and int arguments, e.g. putSchema(myCollection)
+        """
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*params, **kwargs):
+                if traceOut is None:
+                    return func(*params, **kwargs)
+                labels = [str(p) for p in params if (isinstance(p, str) and "://" not in p) or (isinstance(p, int) and not isinstance(p, bool))]
+                start = time.perf_counter()
+                try:
+                    return func(*params, **kwargs)
+                finally:
+                    addTraceEvent(f"{func.__name__}({', '.join(labels)})", cat, start, time.perf_counter())
+            return wrapper
+        return decorate
 
     def getSuffix(type):
         if type in OBJ_TYPES:
@@ -192,8 +277,6 @@ try:
         return value
 
     def doHttpPostPut(url,dataFile, isPut,headers=None, usr=None, pswd=None):
-        usr = getDefOrVal(usr,args.user)
-        pswd = getDefOrVal(pswd,args.password)
         extension = os.path.splitext(dataFile)[1]
         if headers is None:
             headers = {}
@@ -204,14 +287,11 @@ try:
             else:
                 headers['Content-Type'] = "text/plain"
 
-        auth = setAuthHeaders(usr,pswd,headers)
+        auth = overrideAuth(usr,pswd)
         try:
             if os.path.isfile(dataFile):
                 with open(dataFile,'rb') as payload:
-                    if isPut:
-                        response = requests.put(url, auth=auth,headers=headers, data=payload,verify=isVerify())
-                    else:
-                        response = requests.post(url, auth=auth,headers=headers, data=payload,verify=isVerify())
+                    response = httpRequest("PUT" if isPut else "POST", url, auth=auth,headers=headers, data=payload)
 
                     return response
             else:
@@ -220,25 +300,26 @@ try:
             eprint(e)
 
     #  POST the given payload to apiUrl.  If it already exists then tack on the id to the URL and try a PUT
-    def doPostByIdThenPut(apiUrl, payload, type, putParams='?_cookie=false', postParams='?_cookie=false',idField='id', usr=None, pswd=None, existsChecker=None):
+    #  when exists is known from a listing (see fetchExistingIds) go straight to the PUT or POST and skip the probe
+    def doPostByIdThenPut(apiUrl, payload, type, putParams='?_cookie=false', postParams='?_cookie=false',idField='id', usr=None, pswd=None, existsChecker=None, exists=None):
         if existsChecker == None:
             existsChecker = lambda response,payload: response.status_code == 409
 
         id = payload[idField]
 
-        if args.verbose:
-            sprint("\nAttempting POST of " + type + " definition for '" + id + "' to Fusion.")
-        usr = getDefOrVal(usr,args.user)
-        pswd = getDefOrVal(pswd,args.password)
         headers = {'Content-Type': "application/json"}
-        auth = setAuthHeaders(usr,pswd,headers)
+        auth = overrideAuth(usr,pswd)
 
+        response = None
+        if not exists:
+            if args.verbose:
+                sprint("\nAttempting POST of " + type + " definition for '" + id + "' to Fusion.")
+            url = apiUrl
+            if postParams is not None:
+                url += "?" + postParams
+            response = httpRequest("POST", url, auth=auth,headers=headers, data=json.dumps(payload))
         url = apiUrl
-        if postParams is not None:
-            url += "?" + postParams
-        response = requests.post(url, auth=auth,headers=headers, data=json.dumps(payload),verify=isVerify())
-        url = apiUrl
-        if existsChecker(response,payload):
+        if exists or existsChecker(response,payload):
             if args.verbose:
                 sprint("The " + type + " definition for '" + id + "' exists.  Attempting PUT.")
 
@@ -247,7 +328,7 @@ try:
                 url += "?" + putParams
 
             # if we got here then we tried posting but that didn't work so now we will try a PUT
-            response = requests.put(url, auth=auth,headers=headers, data=json.dumps(payload),verify=isVerify())
+            response = httpRequest("PUT", url, auth=auth,headers=headers, data=json.dumps(payload))
             # if the PUT says the object exists, then the the likely problem is that  the object isn't linked to the current app
             # check and see if the response complains of the "id not in app" and add a link if needed.
             if (f"{id} not in app" in response.text
@@ -255,7 +336,7 @@ try:
                 lresponse = makeLink(type,id)
                 if lresponse.status_code >= 200 and lresponse.status_code <= 250:
                     #try update again after link is in place
-                    response = requests.put(url, auth=auth,headers=headers, data=json.dumps(payload),verify=isVerify())
+                    response = httpRequest("PUT", url, auth=auth,headers=headers, data=json.dumps(payload))
 
         if response.status_code >= 200 and response.status_code <= 250:
             sprint( "Element " + type + " id: " + id + " PUT/POSTed successfully")
@@ -265,57 +346,205 @@ try:
         return response
 
 
+    # the journal of completed uploads kept in --dir, see journaled()
+    JOURNAL_FILE = ".putApp.journal"
+    journalFd = None
+    journalLock = threading.Lock()
+    journalState = threading.local()
+    # appended lines survive the process dying once written.  fsync only guards against the machine going down so it
+    # is batched to at most one per interval rather than one per upload
+    JOURNAL_SYNC_SECONDS = 1.0
+    journalSynced = 0.0
+    completedUploads = {}
+    resumedCount = 0
+    errorCount = 0
+    errorLock = threading.Lock()
+
+    def openJournal():
+        """
+        with --resume, load the uploads completed by earlier runs against the same server, otherwise start the journal
+        over.  Lines are only ever appended so a crash can at worst leave a torn last line, which is ignored
+        """
+        global journalFd
+        path = os.path.join(args.dir, JOURNAL_FILE)
+        endsClean = True
+        if args.resume and os.path.isfile(path):
+            with open(path, 'r') as journal:
+                for line in journal:
+                    endsClean = line.endswith("\n")
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(entry, dict) and entry.get("server") == args.server:
+                        completedUploads[entry["key"]] = entry["hash"]
+            sprint(f"Resuming with {len(completedUploads)} completed uploads recorded in {path}")
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND | (0 if args.resume else os.O_TRUNC)
+        try:
+            journalFd = os.open(path, flags, 0o644)
+        except OSError as ex:
+            sprint(f"WARNING: can not write the upload journal {path}, --resume will not be possible. {ex}")
+            return
+        if not endsClean:
+            os.write(journalFd, b"\n")
+
+    def appendJournal(key, digest):
+        global journalSynced
+        line = json.dumps({"key": key, "hash": digest, "server": args.server,
+                           "time": datetime.datetime.now().isoformat()}) + "\n"
+        with journalLock:
+            os.write(journalFd, line.encode())
+            if time.monotonic() - journalSynced >= JOURNAL_SYNC_SECONDS:
+                os.fsync(journalFd)
+                journalSynced = time.monotonic()
+
+    def closeJournal():
+        """
+        a journal is only needed to resume a run which did not finish.  Remove it after a run without errors so a
+        clean upload leaves nothing behind in --dir
+        """
+        global journalFd
+        if journalFd is None:
+            return
+        with journalLock:
+            os.fsync(journalFd)
+            os.close(journalFd)
+            journalFd = None
+        if errorCount == 0:
+            os.remove(os.path.join(args.dir, JOURNAL_FILE))
+
+    def contentHash(paths):
+        digest = hashlib.sha256()
+        for path in paths:
+            digest.update(os.path.relpath(path, args.dir).encode() + b"\0")
+            if os.path.isfile(path):
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                        digest.update(chunk)
+            digest.update(b"\0")
+        # substituted values are part of what gets uploaded
+        if varReplacements:
+            digest.update(json.dumps(varReplacements, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def journaled(keyFunc):
+        """
+        decorator for the per-file uploads.  A call that finishes without printing an error is appended to the
+        journal.  With --resume, a call whose key was completed before with the same content hash is skipped.
+
+        :param keyFunc: called with the upload's arguments, returns (journal key, [files the upload sends])
+        """
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*params, **kwargs):
+                global resumedCount
+                if journalFd is None:
+                    return func(*params, **kwargs)
+                key, paths = keyFunc(*params)
+                digest = contentHash(paths)
+                if completedUploads.get(key) == digest:
+                    if args.verbose:
+                        sprint(f"Skipping {key}, uploaded unchanged by an earlier run")
+                    with journalLock:
+                        resumedCount += 1
+                    return None
+                errorsBefore = errorCount
+                previous = getattr(journalState, "entry", None)
+                journalState.entry = (key, digest)
+                try:
+                    result = func(*params, **kwargs)
+                    entry = journalState.entry
+                finally:
+                    journalState.entry = previous
+                if entry is not None and errorCount == errorsBefore:
+                    appendJournal(*entry)
+                return result
+            return wrapper
+        return decorate
+
+    def deferJournalEntry(colName):
+        # the collection being uploaded on this thread is only complete once its deferred reload is done
+        entry = getattr(journalState, "entry", None)
+        if entry is not None:
+            with reloadLock:
+                pendingJournal.setdefault(colName, []).append(entry)
+            journalState.entry = None
+
+    def markReload(colName, state):
+        # "pending" once a configset upload starts, "done" once the collection is reloaded
+        if journalFd is not None:
+            appendJournal("reload:" + colName, state)
+
+    def isReloadPending(colName):
+        return completedUploads.get("reload:" + colName) == "pending"
+
+    def blobJournalKey(f):
+        with open(os.path.join(args.dir, f), 'r') as jfile:
+            path = json.load(jfile)["path"]
+        return "blobs:" + f, [os.path.join(args.dir, f), os.path.join(args.dir, "blobs") + path.replace('/', os.sep)]
+
+    def collectionJournalKey(f):
+        # the configset goes up with the collection so its files are part of the hash
+        with open(os.path.join(args.dir, f), 'r') as jfile:
+            colName = json.load(jfile)["id"]
+        configDir = os.path.join(args.dir, "configsets", colName)
+        return "collections:" + f, [os.path.join(args.dir, f)] + [os.path.join(configDir, c) for c in sorted(getFileListing(configDir))]
+
+    @traced()
     def putBlobs():
+        for f in getFileListForType("blobs"):
+            putBlobFile(f)
 
+    @traced()
+    @journaled(blobJournalKey)
+    def putBlobFile(f):
         blobdir = os.path.join(args.dir,"blobs")
-        for f in getFileListForType("blobs"):
+        resourceType = None
+        path = None
+        contentType = None
+        blobId = None
+
+        # read in json and figure out path and resourceType
+        with open(os.path.join(args.dir,f), 'r') as jfile:
+            blobj = json.load(jfile)
             resourceType = None
-            path = None
-            contentType = None
-            blobId = None
+            blobId = blobj['id']
+            meta = blobj["metadata"]
+            if meta:
+                if 'resourceType' in meta:
+                    resourceType = meta['resourceType']
+                elif 'type' in meta:
+                    resourceType = meta['type']
 
-            # read in json and figure out path and resourceType
-            with open(os.path.join(args.dir,f), 'r') as jfile:
-                blobj = json.load(jfile)
-                resourceType = None
-                blobId = blobj['id']
-                meta = blobj["metadata"]
-                if meta:
-                    if 'resourceType' in meta:
-                        resourceType = meta['resourceType']
-                    elif 'type' in meta:
-                        resourceType = meta['type']
-
-                contentType = blobj["contentType"]
-                path = blobj["path"]
-
-            url = makeBaseUri(True) + "/blobs" + path
-            if resourceType:
-                url += "?resourceType=" + resourceType
+            contentType = blobj["contentType"]
+            path = blobj["path"]
 
-            headers = {}
-            if contentType:
-                headers['Content-Type'] = contentType
+        url = makeBaseUri(True) + "/blobs" + path
+        if resourceType:
+            url += "?resourceType=" + resourceType
 
-            # convert unix path from json to os path which may be windows
-            fullpath = blobdir + path.replace('/',os.sep)
-            # now PUT blob
-            if args.verbose:
-                sprint("Uploading blob " + f)
+        headers = {}
+        if contentType:
+            headers['Content-Type'] = contentType
 
-            response = doHttpPostPut(url,fullpath, True,headers )
-            if response is not None and response.status_code >= 200 and response.status_code <= 250:
-                if args.verbose:
-                    sprint("Uploaded " + path + " payload successfully")
-                # makeBaseUri(True) is used for Fusion 4.0.1 compatibility but this requires us to make the link
-                makeLink("blobs",blobId)
+        # convert unix path from json to os path which may be windows
+        fullpath = blobdir + path.replace('/',os.sep)
+        # now PUT blob
+        if args.verbose:
+            sprint("Uploading blob " + f)
 
-            elif response is not None and response.status_code:
-                eprint("Non OK response: " + str(response.status_code) + " when processing " + f)
+        response = doHttpPostPut(url,fullpath, True,headers )
+        if response is not None and response.status_code >= 200 and response.status_code <= 250:
+            if args.verbose:
+                sprint("Uploaded " + path + " payload successfully")
+            # makeBaseUri(True) is used for Fusion 4.0.1 compatibility but this requires us to make the link
+            makeLink("blobs",blobId)
+
+        elif response is not None and response.status_code:
+            eprint("Non OK response: " + str(response.status_code) + " when processing " + f)
 
     def makeLink(resourcetype, id):
         headers = {"Content-Type": "application/json"}
-        auth = setAuthHeaders(args.user,args.password,headers)
 
         if resourcetype in OBJ_TYPES and 'linkType' in OBJ_TYPES[resourcetype]:
           type = OBJ_TYPES[resourcetype]['linkType']
@@ -327,13 +556,14 @@ try:
         payload = {"subject":"","object":"","linkType":"inContextOf"}
         payload['subject'] = f"{type}:{id}"
         payload['object'] = f'app:{appName}'
-        lresponse = requests.put(lurl, auth=auth,headers=headers, data=json.dumps(payload),verify=isVerify())
+        lresponse = httpRequest("PUT", lurl, headers=headers, data=json.dumps(payload))
         if lresponse and lresponse.status_code < 200 or lresponse.status_code > 250:
             eprint("Non OK response: {}   when linking object {} to App {}".format(str(lresponse.status_code),payload['subject'],appName))
 
         return lresponse
 
 
+    @traced()
     def putApps():
         global appName
         appFiles = getFileListForType("fusionApps")
@@ -419,13 +649,11 @@ try:
 
     # GET the feature from the target and see if it's identical to what's queued for upload
     def isDuplicateFeature(url, feature,usr=None,pswd=None):
-        usr = getDefOrVal(usr,args.user)
-        pswd = getDefOrVal(pswd,args.password)
         headers = {"Content-Type": "application/json"}
-        auth = setAuthHeaders(usr,pswd,headers)
+        auth = overrideAuth(usr,pswd)
 
         try:
-            response = requests.get(url, auth=auth, headers=headers, verify=isVerify())
+            response = httpRequest("GET", url, auth=auth, headers=headers)
             response.raise_for_status()
             currentFeature = json.loads(response.content)
             if args.debug:
@@ -437,82 +665,106 @@ try:
 
         return False
 
+    @traced()
     def putFeatures():
-        apiUrl = makeBaseUri() + "/collections"
+        for f, colFile in getFeatureFiles():
+            putFeatureFile(f)
+
+    def getFeatureFiles():
+        """
+        only process features that have a matching collection upload in the file list
+
+        :return: list of (feature file, matching collection file) pairs
+        """
         files = getFileListing(os.path.join(args.dir,"collectionFeatures"),[])
-        colfiles_o = getFileListForType("collections")
-        colfiles = []
-        for c in colfiles_o:
+        colfiles = {}
+        for c_o in getFileListForType("collections"):
+            c = c_o
             if c.startswith("collections"):
                 #remove an extra char for the path delim
                 c = c.split("collections")[1][1:]
-            colfiles.append(os.path.join(args.dir,"collectionFeatures",c.split('_COL.json')[0]))
+            colfiles[os.path.join(args.dir,"collectionFeatures",c.split('_COL.json')[0])] = c_o
 
-        params = "_cookie=false"
+        featureFiles = []
         for f in files:
-            # only process features that have a matching collection upload in the file list
             if f.endswith(f'{getSuffix("features")}') and f.split(getSuffix("features"))[0] in colfiles:
+                featureFiles.append((f, colfiles[f.split(getSuffix("features"))[0]]))
+        return featureFiles
 
-                with open(f, 'r') as jfile:
-                    payload = json.load(jfile)
-                    for feature in payload:
-                        name = feature["name"]
-                        col = feature["collectionId"]
-                        url = f'{apiUrl}/{col}/features/{name}'
-                        if isDuplicateFeature(url,feature):
-                            if args.verbose:
-                                sprint(f'Skipping "{name}" feature for collection "{col}" because it is unchanged.')
-                            continue
-                        try:
-                            response = doHttpJsonPut(url, feature)
-                            response.raise_for_status()
-                            sprint(f'Successfully uploaded "{name}" feature for collection "{col}"')
-
-                        except Exception as ex:
-                            # some exceptions are ok because Fusion sends a 500 error if it can't delete non-existing collections
-                            ex_text = ""
-                            if hasattr(ex,'text'):
-                                ex_text = ex["text"]
-                            elif hasattr(ex,'response') and hasattr(ex.response,"text"):
-                                ex_text = ex.response.text
-
-                            search = re.search("Unable to (create|delete) (.*) collection",ex_text)
-
-                            if search:
-                              sprint(f'WARNING: dependent collection not deleted/created when feature "{name}" uploaded for collection "{col}"')
-                            else:
-                              eprint(f'Error putting "{name}" feature for collection "{col}". msg:\n\t{ex_text}')
+    @traced()
+    @journaled(lambda f: ("features:" + os.path.relpath(f, args.dir), [f]))
+    def putFeatureFile(f):
+        apiUrl = makeBaseUri() + "/collections"
+        with open(f, 'r') as jfile:
+            payload = json.load(jfile)
+            for feature in payload:
+                name = feature["name"]
+                col = feature["collectionId"]
+                url = f'{apiUrl}/{col}/features/{name}'
+                if isDuplicateFeature(url,feature):
+                    if args.verbose:
+                        sprint(f'Skipping "{name}" feature for collection "{col}" because it is unchanged.')
+                    if args.deferReloads and isReloadPending(col):
+                        # an earlier run uploaded it but stopped before the collection was reloaded
+                        deferFeatureReload(col)
+                    continue
+                try:
+                    response = doHttpJsonPut(url, feature)
+                    response.raise_for_status()
+                    sprint(f'Successfully uploaded "{name}" feature for collection "{col}"')
+                    if args.deferReloads:
+                        deferFeatureReload(col)
+
+                except Exception as ex:
+                    # some exceptions are ok because Fusion sends a 500 error if it can't delete non-existing collections
+                    ex_text = ""
+                    if hasattr(ex,'text'):
+                        ex_text = ex["text"]
+                    elif hasattr(ex,'response') and hasattr(ex.response,"text"):
+                        ex_text = ex.response.text
+
+                    search = re.search("Unable to (create|delete) (.*) collection",ex_text)
+
+                    if search:
+                      sprint(f'WARNING: dependent collection not deleted/created when feature "{name}" uploaded for collection "{col}"')
+                    else:
+                      eprint(f'Error putting "{name}" feature for collection "{col}". msg:\n\t{ex_text}')
 
+    @traced()
     def putCollections():
+        for f in sorted(getFileListForType("collections"),key=sortCollection):
+            putCollectionFile(f)
 
+    @traced()
+    @journaled(collectionJournalKey)
+    def putCollectionFile(f):
         apiUrl = makeBaseUri() + "/collections"
-        sortedFiles = sorted(getFileListForType("collections"),key=sortCollection)
+        existingIds = getExistingObjects("collections", apiUrl)
         params = "_cookie=false"
-        for f in sortedFiles:
-            with open(os.path.join(args.dir,f), 'r') as jfile:
-                payload = json.load(jfile)
-                # pop off name for collections pointing at "default".  That way the local collections get created in Solr.
-                # keep the name for external (non-default) collections since those only need the Fusion reference created.
-
-                doPop = payload["solrParams"] and payload["searchClusterId"] == "default"
-
-                # also keep if solrParams.name != the fusion name "id" and args.
-                if payload["solrParams"] and payload['id'] != payload['solrParams']['name']:
-                    doPop = False
-                    debug("Not creating Solr collection named " + payload['solrParams']['name'] )
-                if payload["type"] is not None and payload["type"] == "DATA":
-                    params += "&defaultFeatures=false"
-
-                if doPop:
-                    payload["solrParams"].pop('name', None)
-                if payload["searchClusterId"] == "default":
-                    # to skip sub collections add defaultFeatures=false
-                    response = doPostByIdThenPut(apiUrl, payload, 'Collection', putParams=params,postParams=params)
-                    if response.status_code == 200:
-                        if args.verbose:
-                            sprint(f'Successfully uploaded collection definition for {payload["id"]}')
+        with open(os.path.join(args.dir,f), 'r') as jfile:
+            payload = json.load(jfile)
+            # pop off name for collections pointing at "default".  That way the local collections get created in Solr.
+            # keep the name for external (non-default) collections since those only need the Fusion reference created.
+
+            doPop = payload["solrParams"] and payload["searchClusterId"] == "default"
+
+            # also keep if solrParams.name != the fusion name "id" and args.
+            if payload["solrParams"] and payload['id'] != payload['solrParams']['name']:
+                doPop = False
+                debug("Not creating Solr collection named " + payload['solrParams']['name'] )
+            if payload["type"] is not None and payload["type"] == "DATA":
+                params += "&defaultFeatures=false"
+
+            if doPop:
+                payload["solrParams"].pop('name', None)
+            if payload["searchClusterId"] == "default":
+                # to skip sub collections add defaultFeatures=false
+                response = doPostByIdThenPut(apiUrl, payload, 'Collection', putParams=params,postParams=params,exists=isExisting(existingIds,payload,'id'))
+                if response.status_code == 200:
+                    if args.verbose:
+                        sprint(f'Successfully uploaded collection definition for {payload["id"]}')
 
-                        putSchema(payload['id'])
+                    putSchema(payload['id'])
 
     #
     # invert the args.noVerify for readability
@@ -521,14 +773,11 @@ try:
       return not args.noVerify
 
     def doHttp(url,usr=None, pswd=None):
-        usr = getDefOrVal(usr,args.user)
-        pswd = getDefOrVal(pswd,args.password)
-        headers = {}
-        auth = setAuthHeaders(usr,pswd,headers)
+        auth = overrideAuth(usr,pswd)
 
         response = None
         try:
-            response = requests.get(url, auth=auth,headers=headers,verify=isVerify())
+            response = httpRequest("GET", url, auth=auth)
             return response
         except requests.ConnectionError as e:
             eprint(e)
@@ -573,6 +822,21 @@ try:
                 fileList.append(fstr)
         return fileList
 
+    def isSchemaFileChanged(schemaUrl, file, pathFile, currentZkFiles):
+        """
+        compare a local configset file with the copy Fusion's solr-config api returns from ZooKeeper
+
+        :return: True if the file is new, differs, or can not be compared
+        """
+        if file not in currentZkFiles or not os.path.isfile(pathFile):
+            return True
+        response = doHttp(schemaUrl + '/' + file.replace(os.sep,'/'))
+        if response is None or response.status_code != 200:
+            return True
+        with open(pathFile,'rb') as local:
+            return local.read() != response.content
+
+    @traced()
     def putSchema(colName):
         schemaUrl = args.server + "/api"
         schemaUrl += "/collections/" + colName + "/solr-config"
@@ -592,51 +856,134 @@ try:
 
         dir = os.path.join(args.dir, "configsets", colName )
         files = sorted(getFileListing(dir),key=sortSchemafiles)
-
-        counter = 0
-
+        allFiles = files
+        if not args.uploadAllSchemaFiles:
+            # only send what differs from ZooKeeper so that an unchanged configset is not reloaded
+            allCount = len(files)
+            with ThreadPoolExecutor(max_workers=args.schemaWorkers) as pool:
+                changed = list(pool.map(lambda file: isSchemaFileChanged(schemaUrl, file, os.path.join(dir, file), currentZkFiles), files))
+            files = [file for file, isChanged in zip(files, changed) if isChanged]
+            if args.verbose and allCount > 0:
+                sprint(f"{len(files)} of {allCount} configset files changed for collection: {colName}")
+
+        if not files and allFiles and isReloadPending(colName):
+            # an earlier run uploaded this configset but stopped before the collection was reloaded
+            files = allFiles[-1:]
         if len(files) > 0:
             sprint("\nUploading Solr config for collection: " + colName)
-        for file in files:
-            counter += 1
-            #if the file is part of the current configset and is available for upload, upload it.
-            pathFile = os.path.join(args.dir,"configsets",colName,file)
-            if os.path.isfile(pathFile):
-                isLast = len(files) == counter
-                # see if the file exists and PUT or POST accordingly
-                url = schemaUrl + '/' + file.replace(os.sep,'/')
-                if isLast:
-                    url += '?reload=true'
-                #PUT to update, POST to add
-                try:
-                    response = doHttpPostPut(url, pathFile, (file in currentZkFiles))
-                    response.raise_for_status()
-                    if args.verbose:
-                        sprint("\tUploaded " + file + " successfully")
-                        if isLast:
-                            sprint("\tSent reload=true to collection " + colName)
-                except Exception as e:
-
-                    if hasattr(e,"response") and e.response.status_code:
-                        eprint("Non OK response: " + str(e.response.status_code) + " when uploading " + file)
-                    elif hasattr(e,"response"):
-                        r = e.response
-                        msg = None
-                        if hasattr(r,"msg"):
-                            msg = r.msg
-                        elif hasattr(e,'text'):
-                            msg = r["text"]
-                        else:
-                            msg = str(e)
-                            eprint(f"Error uploading {colName} configset file {file}. Msg: {msg}")
+            markReload(colName, "pending")
+
+        # files within a tier (see sortSchemafiles) go up concurrently but a tier must finish before the next starts.
+        # The very last file is held back and sent alone with reload=true once everything else is in place.
+        # With --deferReloads reloadCollections() sends it at the end of the run instead.
+        lastFile = files[-1] if files else None
+        if args.deferReloads and lastFile is not None:
+            with reloadLock:
+                pendingReloads[colName] = (schemaUrl, lastFile, lastFile in currentZkFiles)
+            deferJournalEntry(colName)
+        with ThreadPoolExecutor(max_workers=args.schemaWorkers) as pool:
+            for tier, tierFiles in itertools.groupby(files, key=getSchemaTier):
+                batch = [file for file in tierFiles if file != lastFile]
+                list(pool.map(lambda file: putSchemaFile(colName, schemaUrl, file, currentZkFiles, False), batch))
+        if lastFile is not None and not args.deferReloads:
+            errorsBefore = errorCount
+            putSchemaFile(colName, schemaUrl, lastFile, currentZkFiles, True)
+            if errorCount == errorsBefore:
+                markReload(colName, "done")
+
+    # collection name to (solr-config url, file to send with reload=true, whether that file is already in ZooKeeper)
+    pendingReloads = {}
+    # journal entries of the uploads of each collection waiting on a deferred reload
+    pendingJournal = {}
+    reloadLock = threading.Lock()
+
+    def deferFeatureReload(colName):
+        """
+        with --deferReloads, fold a feature change into the deferred reload of its collection.  A collection whose
+        configset is uploaded keeps the reload putSchema recorded, otherwise its last local configset file is re-sent.
+        """
+        dir = os.path.join(args.dir, "configsets", colName)
+        files = sorted(getFileListing(dir), key=sortSchemafiles) if os.path.isdir(dir) else []
+        if not files:
+            return
+        with reloadLock:
+            added = colName not in pendingReloads
+            if added:
+                pendingReloads[colName] = (args.server + "/api/collections/" + colName + "/solr-config", files[-1], True)
+        if added:
+            markReload(colName, "pending")
+        deferJournalEntry(colName)
+
+    @traced()
+    def reloadCollections():
+        """
+        issue the reloads deferred by --deferReloads, one per collection, on a pool of --reloadWorkers.  The reload
+        sends the last configset file of the collection with reload=true, the same call putSchema would have made.
+        """
+        if not pendingReloads:
+            return
+        sprint(f"\nReloading {len(pendingReloads)} collection(s)")
+
+        def reload(colName):
+            schemaUrl, file, exists = pendingReloads[colName]
+            start = time.time()
+            errorsBefore = errorCount
+            putSchemaFile(colName, schemaUrl, file, [file] if exists else [], True)
+            sprint(f"\tReloaded collection {colName} in {time.time() - start:.2f}s")
+            if errorCount == errorsBefore:
+                markReload(colName, "done")
+                for entry in pendingJournal.pop(colName, []):
+                    appendJournal(*entry)
+
+        with ThreadPoolExecutor(max_workers=args.reloadWorkers) as pool:
+            list(pool.map(reload, sorted(pendingReloads)))
+
+    def getSchemaTier(file):
+        return sortSchemafiles(file).split('_')[0]
+
+    @traced()
+    def putSchemaFile(colName, schemaUrl, file, currentZkFiles, isLast):
+        dir = os.path.join(args.dir, "configsets", colName )
+        #if the file is part of the current configset and is available for upload, upload it.
+        pathFile = os.path.join(args.dir,"configsets",colName,file)
+        if os.path.isfile(pathFile):
+            # see if the file exists and PUT or POST accordingly
+            url = schemaUrl + '/' + file.replace(os.sep,'/')
+            if isLast:
+                url += '?reload=true'
+            #PUT to update, POST to add
+            try:
+                response = doHttpPostPut(url, pathFile, (file in currentZkFiles))
+                response.raise_for_status()
+                if args.verbose:
+                    sprint("\tUploaded " + file + " successfully")
+                    if isLast:
+                        sprint("\tSent reload=true to collection " + colName)
+            except Exception as e:
+
+                if hasattr(e,"response") and e.response.status_code:
+                    eprint("Non OK response: " + str(e.response.status_code) + " when uploading " + file)
+                elif hasattr(e,"response"):
+                    r = e.response
+                    msg = None
+                    if hasattr(r,"msg"):
+                        msg = r.msg
+                    elif hasattr(e,'text'):
+                        msg = r["text"]
                     else:
                         msg = str(e)
                         eprint(f"Error uploading {colName} configset file {file}. Msg: {msg}")
-            else:
-                sprint(f"WARN: scan of {dir} for files found non-file {file}")
+                else:
+                    msg = str(e)
+                    eprint(f"Error uploading {colName} configset file {file}. Msg: {msg}")
+        else:
+            sprint(f"WARN: scan of {dir} for files found non-file {file}")
 
 
     def eprint(*params, **kwargs):
+        global errorCount
+        with errorLock:
+            errorCount += 1
         print(*params, file=sys.stderr, **kwargs)
         if args.failOnStdError:
             sys.exit("Startup argument --failOnStdErr set, exiting putApp")
@@ -674,20 +1021,26 @@ try:
 
 
 
+    @traced()
     def putJobSchedules():
+        for f in getFileListForType("jobs"):
+            putJobScheduleFile(f)
+
+    @traced()
+    @journaled(lambda f: ("jobs:" + f, [os.path.join(args.dir, f)]))
+    def putJobScheduleFile(f):
         type = "jobs"
         apiUrl = makeBaseUri() + "/" + getApiForType(type) + "/"
-        for f in getFileListForType(type):
-            with open(os.path.join(args.dir,f), 'r') as jfile:
-                payload = json.load(jfile)
-                url = apiUrl + payload['resource'] + '/schedule'
-                response = doHttpPostPut(url, os.path.join(args.dir,f), True)
-                if response.status_code == 200:
-                    if args.verbose:
-                        sprint( "Created/updated Job schedule from " + f)
-                # allow a 404 since we are using the /apollo/apps/{collection} endpoint but the export gives us global jobs as well
-                elif response.status_code != 200 and response.status_code != 404:
-                    eprint("Non OK response of " + str(response.status_code) + " when PUTing: " + url)
+        with open(os.path.join(args.dir,f), 'r') as jfile:
+            payload = json.load(jfile)
+            url = apiUrl + payload['resource'] + '/schedule'
+            response = doHttpPostPut(url, os.path.join(args.dir,f), True)
+            if response.status_code == 200:
+                if args.verbose:
+                    sprint( "Created/updated Job schedule from " + f)
+            # allow a 404 since we are using the /apollo/apps/{collection} endpoint but the export gives us global jobs as well
+            elif response.status_code != 200 and response.status_code != 404:
+                eprint("Non OK response of " + str(response.status_code) + " when PUTing: " + url)
     def mergeReadableScript(element,rawTag):
         mergetag = rawTag + TAG_SUFFIX
         if mergetag in element:
@@ -721,39 +1074,467 @@ try:
                 if tag in data:
                     mergeReadableScript(data,tag.split("_")[0])
 
+    def fetchExistingObjects(apiUrl, idField='id'):
+        """
+        list the current objects of one type in a single GET so that each upload can go straight to a POST or PUT
+        and unchanged objects can be skipped
+
+        :return: dict of id to the object as it exists on the target or None if the listing is not available
+        """
+        response = doHttp(apiUrl)
+        if response is not None and response.status_code == 200:
+            try:
+                listing = json.loads(response.content)
+            except ValueError:
+                listing = None
+            if isinstance(listing, list):
+                return dict((o[idField], o) for o in listing if isinstance(o, dict) and idField in o)
+        debug("Unable to list existing objects at " + apiUrl + ".  Falling back to POST then PUT.")
+        return None
+
+    existingObjects = {}
+    existingLocks = {}
+    existingLock = threading.Lock()
+
+    def getExistingObjects(type, apiUrl, idField='id'):
+        """
+        fetch the listing for a type once per run.  Concurrent uploads of the same type wait for the first fetch.
+        """
+        with existingLock:
+            lock = existingLocks.setdefault(type, threading.Lock())
+        with lock:
+            if type not in existingObjects:
+                existingObjects[type] = fetchExistingObjects(apiUrl, idField)
+            return existingObjects[type]
+
+    def isExisting(existing, payload, idField):
+        # None means unknown i.e. probe with a POST first
+        if existing is None:
+            return None
+        return payload.get(idField) in existing
+
+    def normalizeForCompare(obj):
+        # drop the fields Fusion changes on every save and getApp strips on export so only real edits count
+        norm = dict((k, v) for k, v in obj.items() if k not in VOLATILE_FIELDS)
+        if isinstance(norm.get("stages"), list):
+            norm["stages"] = [dict((k, v) for k, v in stage.items() if k != "secretSourceStageId")
+                              if isinstance(stage, dict) else stage for stage in norm["stages"]]
+        return norm
+
+    def isUnchanged(existing, payload, idField):
+        """
+        :return: True if args.skipUnchanged and the target already holds an identical copy of the prepared payload
+        """
+        if not args.skipUnchanged or not existing or payload.get(idField) not in existing:
+            return False
+        current = existing[payload[idField]]
+        return isinstance(current, dict) and normalizeForCompare(current) == normalizeForCompare(payload)
+
+    @traced()
     def putFileForType(type,forceLegacy=False, idField=None, existsChecker=None ):
+        for f in getFileListForType(type):
+            putObjectFile(type, f, forceLegacy, idField, existsChecker)
+
+    @traced()
+    @journaled(lambda type, f, *rest: (type + ":" + f, [os.path.join(args.dir, f)]))
+    def putObjectFile(type, f, forceLegacy=False, idField=None, existsChecker=None):
         if not idField:
             idField = 'id'
         apiUrl = makeBaseUri(forceLegacy) + "/" + getApiForType(type)
-        for f in getFileListForType(type):
-            with open(os.path.join(args.dir,f), 'r') as jfile:
-                payload = json.load(jfile)
-                if isSubstitutionType(type):
-                    if args.verbose and isinstance(varReplacements, dict):
-                        sprint("Doing substitution for file " + f)
-                    payload = traverseAndReplace(payload,f, varReplacements)
+        putPayloadFile(type, f, apiUrl, idField, existsChecker)
+
+    def loadPayload(type, f):
+        """
+        read an object file and prepare it for upload i.e. varFile substitution and _mergeForm scripts merged back
+        """
+        with open(os.path.join(args.dir,f), 'r') as jfile:
+            payload = json.load(jfile)
+            if isSubstitutionType(type):
+                if args.verbose and isinstance(varReplacements, dict):
+                    sprint("Doing substitution for file " + f)
+                payload = traverseAndReplace(payload,f, varReplacements)
 
-                migrateReadableScript(payload,type)
-                #doPostByIdThenPut(apiUrl, payload, type,None, idField)
-                doPostByIdThenPut(apiUrl, payload, type,None,None,idField,None,None,existsChecker)
+            migrateReadableScript(payload,type)
+            return payload
 
+    def putPayloadFile(type, f, apiUrl, idField, existsChecker, globalListing=False):
+        """
+        :param globalListing: True when apiUrl lists the objects of every app e.g. templating/zones.  An unchanged
+            object there may still be missing its link to this app so the link is made in place of the skipped PUT
+        """
+        existing = getExistingObjects(type, apiUrl, idField)
+        payload = loadPayload(type, f)
+        if isUnchanged(existing, payload, idField):
+            if args.verbose:
+                sprint(f"Skipping {type} '{payload[idField]}' because it is unchanged.")
+            if globalListing:
+                makeLink(type, payload[idField])
+            return
+        #doPostByIdThenPut(apiUrl, payload, type,None, idField)
+        doPostByIdThenPut(apiUrl, payload, type,None,None,idField,None,None,existsChecker,isExisting(existing,payload,idField))
+
+    @traced()
     def putTemplateFileForType(type, idField=None, existsChecker=None ):
+        for f in getFileListForType(type):
+            putTemplateFile(type, f, idField, existsChecker)
+
+    @traced()
+    @journaled(lambda type, f, *rest: (type + ":" + f, [os.path.join(args.dir, f)]))
+    def putTemplateFile(type, f, idField=None, existsChecker=None):
         if not idField:
             idField = 'id'
         base = args.server + "/"
         apiUrl = base + getApiForType(type)
-        for f in getFileListForType(type):
-            with open(os.path.join(args.dir,f), 'r') as jfile:
-                payload = json.load(jfile)
-                if isSubstitutionType(type):
-                    if args.verbose is not None and isinstance(varReplacements, dict):
-                        sprint("Doing substitution for file " + f)
-                    payload = traverseAndReplace(payload,f, varReplacements)
+        putPayloadFile(type, f, apiUrl, idField, existsChecker, True)
 
-                migrateReadableScript(payload,type)
-                #doPostByIdThenPut(apiUrl, payload, type,None, idField)
-                doPostByIdThenPut(apiUrl, payload, type,None,None,idField,None,None,existsChecker)
 
+    httpSession = None
+
+    def getSession():
+        """
+        One pooled, keep-alive requests.Session is shared by every call so connections and TLS handshakes are reused.
+        Auth headers and certificate verification are applied to the session once here.
+        """
+        global httpSession
+        if httpSession is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=args.poolSize, pool_maxsize=args.poolSize)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.verify = isVerify()
+            if isCookieAuth():
+                startFusionSession(session)
+            else:
+                session.auth = setAuthHeaders(args.user,args.password,session.headers)
+            httpSession = session
+        return httpSession
+
+    sessionLock = threading.Lock()
+
+    def isCookieAuth():
+        # the api key and JWT take precedence over a session login
+        return args.sessionAuth and args.apiKey is None and args.jwt is None
+
+    def startFusionSession(session):
+        """
+        log in once through Fusion's session api.  The returned cookie authenticates every following request so
+        Fusion does not have to verify the password hash on each call.
+        """
+        url = args.server + "/api/session?realmName=" + SESSION_REALM
+        payload = {"username": args.user, "password": args.password}
+        with sessionLock:
+            response = timedRequest(session, "POST", url, headers={"Content-Type": "application/json"}, data=json.dumps(payload), timeout=requestTimeout())
+        if response.status_code < 200 or response.status_code > 250:
+            sys.exit(f"Non OK response of {response.status_code} when starting a session for user {args.user} at {url}. Aborting...")
+        debug("Started Fusion session for user " + args.user)
+
+    # per (method, endpoint) http metrics, kept for the --metricsFile and --prometheusFile summaries
+    httpMetrics = {}
+    metricsLock = threading.Lock()
+    metricsStart = time.time()
+    objectCount = 0
+    # apis whose endpoint is named by two path segments e.g. connectors/datasources
+    METRIC_API_PREFIXES = ["templating", "connectors", "spark", "objects"]
+    METRIC_PREFIX = "fusion_getput_"
+
+    def endpointOf(url):
+        """
+        :return: the Fusion api called by url, used to group metrics e.g. index-pipelines, solr-config, export
+        """
+        parts = [p for p in urllib.parse.urlsplit(url).path.split('/') if p]
+        if parts and parts[0] == "api":
+            parts = parts[1:]
+        if len(parts) > 2 and parts[0] == "apps":
+            parts = parts[2:]
+        if not parts:
+            return "other"
+        if parts[0] == "collections" and len(parts) > 2:
+            return parts[2]
+        if parts[0] in METRIC_API_PREFIXES and len(parts) > 1:
+            return "/".join(parts[:2])
+        return parts[0]
+
+    def recordHttpMetric(method, url, response, seconds, retry=False, stream=False):
+        """
+        :param response: the response or None if the request raised
+        :param seconds: wall time of the call.  For streamed responses this ends when the headers arrive
+        :param retry: True if this call repeats an earlier one
+        """
+        if response is None:
+            status, sent, received, toHeaders = "error", 0, 0, seconds
+        else:
+            status = response.status_code
+            sent = int(response.request.headers.get("Content-Length") or 0)
+            received = 0 if stream else len(response.content)
+            toHeaders = response.elapsed.total_seconds()
+        with metricsLock:
+            m = httpMetrics.setdefault((method, endpointOf(url)), {"latencies": [], "toHeaders": [], "statuses": {},
+                                                                   "retries": 0, "bytesSent": 0, "bytesReceived": 0})
+            m["latencies"].append(seconds)
+            m["toHeaders"].append(toHeaders)
+            m["statuses"][str(status)] = m["statuses"].get(str(status), 0) + 1
+            m["retries"] += 1 if retry else 0
+            m["bytesSent"] += sent
+            m["bytesReceived"] += received
+
+    def addReceivedBytes(method, url, count):
+        # body bytes of a streamed response, counted as they are read
+        with metricsLock:
+            httpMetrics[(method, endpointOf(url))]["bytesReceived"] += count
+
+    def timedRequest(session, method, url, retry=False, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+        except requests.RequestException as ex:
+            end = time.perf_counter()
+            recordHttpMetric(method, url, None, end - start, retry)
+            addTraceEvent(f"{method} {endpointOf(url)}", "http", start, end, {"url": url, "error": repr(ex)})
+            raise
+        end = time.perf_counter()
+        recordHttpMetric(method, url, response, end - start, retry, kwargs.get("stream", False))
+        addTraceEvent(f"{method} {endpointOf(url)}", "http", start, end,
+                      {"url": response.url, "status": response.status_code, "retry": retry})
+        return response
+
+    def countObject():
+        global objectCount
+        with metricsLock:
+            objectCount += 1
+
+    def percentile(values, p):
+        ordered = sorted(values)
+        return ordered[max(0, math.ceil(p * len(ordered)) - 1)] if ordered else 0
+
+    def metricsSummary():
+        wall = time.time() - metricsStart
+        endpoints = []
+        with metricsLock:
+            for (method, endpoint), m in sorted(httpMetrics.items()):
+                latencies = m["latencies"]
+                endpoints.append({"method": method, "endpoint": endpoint, "count": len(latencies),
+                                  "statuses": dict(m["statuses"]), "retries": m["retries"],
+                                  "bytesSent": m["bytesSent"], "bytesReceived": m["bytesReceived"],
+                                  "totalSeconds": round(sum(latencies), 6),
+                                  "latency": {"p50": percentile(latencies, 0.5), "p95": percentile(latencies, 0.95),
+                                              "max": max(latencies)},
+                                  "timeToHeaders": {"p50": percentile(m["toHeaders"], 0.5),
+                                                    "p95": percentile(m["toHeaders"], 0.95)},
+                                  "callsPerSecond": len(latencies) / wall if wall else 0})
+            objects = objectCount
+        return {"script": "putApp", "server": args.server, "app": appName,
+                "startTime": datetime.datetime.fromtimestamp(metricsStart).isoformat(),
+                "wallSeconds": wall, "requests": sum(e["count"] for e in endpoints),
+                "objects": objects, "objectsPerSecond": objects / wall if wall else 0, "endpoints": endpoints}
+
+    def writePrometheus(summary, fileName):
+        """
+        write the summary in the Prometheus textfile collector format.  The file is replaced atomically so a
+        collector never reads a partial file
+        """
+        lines = []
+        def family(name, type, help, samples):
+            lines.append(f"# HELP {METRIC_PREFIX}{name} {help}")
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} {type}")
+            for suffix, labels, value in samples:
+                labelText = ",".join(f'{k}="{v}"' for k, v in dict(script=summary["script"], **labels).items())
+                lines.append(f"{METRIC_PREFIX}{name}{suffix}{{{labelText}}} {value}")
+
+        endpoints = summary["endpoints"]
+        key = lambda e: {"method": e["method"], "endpoint": e["endpoint"]}
+        family("http_requests_total", "counter", "HTTP requests by method, endpoint and status.",
+               [("", dict(key(e), status=s), n) for e in endpoints for s, n in sorted(e["statuses"].items())])
+        family("http_request_duration_seconds", "summary", "HTTP request latency by method and endpoint.",
+               [("", dict(key(e), quantile=q), e["latency"][p]) for e in endpoints for q, p in [("0.5", "p50"), ("0.95", "p95"), ("1", "max")]]
+               + [("_sum", key(e), e["totalSeconds"]) for e in endpoints]
+               + [("_count", key(e), e["count"]) for e in endpoints])
+        family("http_retries_total", "counter", "HTTP requests repeated after a failed attempt.",
+               [("", key(e), e["retries"]) for e in endpoints])
+        family("http_sent_bytes_total", "counter", "HTTP request body bytes.",
+               [("", key(e), e["bytesSent"]) for e in endpoints])
+        family("http_received_bytes_total", "counter", "HTTP response body bytes.",
+               [("", key(e), e["bytesReceived"]) for e in endpoints])
+        family("objects_total", "counter", "Objects and files uploaded.", [("", {}, summary["objects"])])
+        family("objects_per_second", "gauge", "Objects per second of run time.", [("", {}, summary["objectsPerSecond"])])
+        family("run_seconds", "gauge", "Wall time of the run.", [("", {}, summary["wallSeconds"])])
+
+        with open(fileName + ".tmp", 'w') as out:
+            out.write("\n".join(lines) + "\n")
+        os.replace(fileName + ".tmp", fileName)
+
+    def writeMetrics():
+        """
+        registered with atexit so the summaries are also written when the run fails part way
+        """
+        summary = metricsSummary()
+        if args.metricsFile:
+            with open(args.metricsFile, 'w') as out:
+                json.dump(summary, out, indent=2)
+            sprint(f"Wrote HTTP metrics for {summary['requests']} requests to {args.metricsFile}")
+        if args.prometheusFile:
+            writePrometheus(summary, args.prometheusFile)
+
+    hostSemaphores = {}
+    hostLock = threading.Lock()
+    # ceiling of the --adaptive limit when --maxPerHost is not set
+    ADAPTIVE_MAX_LIMIT = 64
+
+    def hostSlot(url):
+        """
+        :return: a context which holds one of the request slots for the host of url.  That is an AdaptiveLimit capped
+                 at --maxPerHost with --adaptive, otherwise one of --maxPerHost semaphore slots
+        """
+        if not args.maxPerHost and not args.adaptive:
+            return contextlib.nullcontext()
+        host = urllib.parse.urlsplit(url).netloc
+        with hostLock:
+            if host not in hostSemaphores:
+                if args.adaptive:
+                    hostSemaphores[host] = AdaptiveLimit(args.maxPerHost or ADAPTIVE_MAX_LIMIT)
+                else:
+                    hostSemaphores[host] = threading.BoundedSemaphore(args.maxPerHost)
+            return hostSemaphores[host]
+
+    # statuses meaning Fusion, or a gateway in front of it, is overloaded or restarting.  Such requests are retried
+    RETRY_STATUSES = (429, 502, 503, 504)
+    # statuses with which Fusion itself turned a request away unprocessed.  Only these are safe to repeat for a POST,
+    # a 502 or 504 from a gateway may come after Fusion already applied it
+    REJECTED_STATUSES = (429, 503)
+    IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE")
+    # with --adaptive a response only signals load when it is this many times slower than the fastest seen for its
+    # endpoint and also slower than ADAPTIVE_LATENCY_FLOOR seconds
+    ADAPTIVE_LATENCY_FACTOR = 3.0
+    ADAPTIVE_LATENCY_FLOOR = 0.25
+
+    class AdaptiveLimit:
+        """
+        AIMD limit on the requests in flight to one host.  Each response that is fast and not an overload status adds
+        1/limit to the limit, so it grows by about one per round trip while the limit is in use.  A retryable status,
+        a failed connection or a latency spike halves it, at most once per round trip.
+        """
+        def __init__(self, ceiling):
+            self.ceiling = ceiling
+            self.limit = float(ceiling)
+            self.inFlight = 0
+            self.lastDecrease = 0.0
+            self.fastest = {}
+            self.condition = threading.Condition()
+
+        def __enter__(self):
+            with self.condition:
+                while self.inFlight >= max(1, int(self.limit)):
+                    self.condition.wait()
+                self.inFlight += 1
+            return self
+
+        def __exit__(self, *exc):
+            with self.condition:
+                self.inFlight -= 1
+                self.condition.notify()
+
+        def observe(self, endpoint, seconds, overloaded):
+            # called while the request still holds its slot
+            with self.condition:
+                fastest = min(self.fastest.get(endpoint, seconds), seconds)
+                self.fastest[endpoint] = fastest
+                slow = seconds > max(fastest * ADAPTIVE_LATENCY_FACTOR, ADAPTIVE_LATENCY_FLOOR)
+                now = time.monotonic()
+                if overloaded or slow:
+                    if now - self.lastDecrease > seconds:
+                        self.limit = max(1.0, min(self.limit, self.inFlight) / 2)
+                        self.lastDecrease = now
+                        debug(f"Lowered the request limit to {int(self.limit)} after a {'slow' if slow else 'failed'} {endpoint} call")
+                elif self.inFlight >= int(self.limit):
+                    self.limit = min(float(self.ceiling), self.limit + 1 / self.limit)
+                self.condition.notify_all()
+
+    def requestTimeout():
+        # --timeout 0 waits forever for a response
+        return (args.connectTimeout, args.timeout or None)
+
+    def isRetryableError(method, ex):
+        # a failed connect never reached Fusion.  Any later failure may have been applied so only idempotent calls repeat
+        return isinstance(ex, requests.ConnectTimeout) or method in IDEMPOTENT_METHODS
+
+    def isRetryableStatus(method, status):
+        return status in REJECTED_STATUSES or (status in RETRY_STATUSES and method in IDEMPOTENT_METHODS)
+
+    def retryDelay(attempt, response):
+        """
+        :return: seconds to wait before retrying.  A Retry-After from the server is honoured (up to --maxBackoff),
+                 otherwise full jitter exponential backoff from --backoff
+        """
+        retryAfter = response.headers.get("Retry-After") if response is not None else None
+        if retryAfter:
+            try:
+                delay = float(retryAfter)
+            except ValueError:
+                try:
+                    delay = (email.utils.parsedate_to_datetime(retryAfter) - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return min(max(0.0, delay), args.maxBackoff)
+        return random.uniform(0, min(args.maxBackoff, args.backoff * 2 ** attempt))
+
+    def rewindPayload(kwargs):
+        data = kwargs.get("data")
+        if hasattr(data, "seek"):
+            data.seek(0)
+
+    def requestWithRetry(session, method, url, **kwargs):
+        """
+        send a request through the request slot of its host.  Responses with one of RETRY_STATUSES (only
+        REJECTED_STATUSES for a POST) and failed connections are retried up to --retries times after a backoff.
+        An expired session is renewed once.
+        """
+        kwargs.setdefault("timeout", requestTimeout())
+        attempt = 0
+        renewed = False
+        while True:
+            slot = hostSlot(url)
+            with slot:
+                start = time.perf_counter()
+                try:
+                    response, error = timedRequest(session, method, url, retry=attempt > 0 or renewed, **kwargs), None
+                except (requests.ConnectionError, requests.Timeout) as ex:
+                    response, error = None, ex
+                if isinstance(slot, AdaptiveLimit):
+                    slot.observe(endpointOf(url), time.perf_counter() - start, error is not None or response.status_code in RETRY_STATUSES)
+            if error is not None:
+                if attempt >= args.retries or not isRetryableError(method, error):
+                    raise error
+            elif response.status_code == 401 and isCookieAuth() and kwargs.get("auth") is None and not renewed:
+                # session cookies expire.  Log in again and retry once
+                debug("Fusion session expired, logging in again")
+                response.close()
+                startFusionSession(session)
+                renewed = True
+                rewindPayload(kwargs)
+                continue
+            elif not isRetryableStatus(method, response.status_code) or attempt >= args.retries:
+                return response
+            delay = retryDelay(attempt, response)
+            debug(f"Retrying {method} {url} in {delay:.2f}s after {error if error is not None else response.status_code}")
+            if response is not None:
+                response.close()
+            time.sleep(delay)
+            rewindPayload(kwargs)
+            attempt += 1
+
+    def httpRequest(method, url, **kwargs):
+        response = requestWithRetry(getSession(), method, url, **kwargs)
+        if method in ("POST", "PUT") and 200 <= response.status_code < 300 and endpointOf(url) != "links":
+            countObject()
+        return response
+
+    def overrideAuth(usr=None,pswd=None):
+        """
+        :return: basic auth for a call made as someone other than args.user else None so the session auth is used
+        """
+        if usr is None and pswd is None:
+            return None
+        return setAuthHeaders(getDefOrVal(usr,args.user),getDefOrVal(pswd,args.password),{})
 
     def setAuthHeaders(usr=None,pswd=None,headers={}):
         """
@@ -774,12 +1555,10 @@ try:
 
 
     def doHttpJsonPut(url,payload, usr=None, pswd=None):
-        usr = getDefOrVal(usr,args.user)
-        pswd = getDefOrVal(pswd,args.password)
         headers = {'Content-Type': "application/json"}
-        auth = setAuthHeaders(usr,pswd,headers)
+        auth = overrideAuth(usr,pswd)
         try:
-            response = requests.put(url, auth=auth,headers=headers, data=json.dumps(payload))
+            response = httpRequest("PUT", url, auth=auth,headers=headers, data=json.dumps(payload))
             return response
         except requests.ConnectionError as e:
             eprint(e)
@@ -794,6 +1573,11 @@ try:
 
     def main():
         initArgs()
+        if args.metricsFile or args.prometheusFile:
+            atexit.register(writeMetrics)
+        if args.traceFile:
+            startTrace(args.traceFile)
+            atexit.register(stopTrace)
         fetchFusionVersion()
 
         # fetch collections first
@@ -801,27 +1585,248 @@ try:
         sprint(f'Upload target API: {makeBaseUri()}')
 
         findFiles()
+        if args.bulk:
+            putBulk()
+            return
+
+        if not args.noJournal:
+            openJournal()
+
         # putApps must be the first export, clusters next.  blobs and collections in either order then pipelines
         putApps()
 
+        if args.workers > 1:
+            runUploadGraph(planUploads(), args.workers)
+        else:
+            putCollections()
+            putFeatures()
+            putBlobs()
+            putFileForType('dataModels')
+            putFileForType('parsers')
+            putFileForType('indexPipelines')
+            putFileForType('queryPipelines')
+            putFileForType('indexProfiles')
+            putFileForType('queryProfiles')
+            putFileForType('tasks')
+            putFileForType('sparkJobs',None,None,lambda r,p: sparkChecker(r,p))
+
+            putFileForType("dataSources",None,None,lambda r,p: datasourceChecker(r,p))
+            putJobSchedules()
+
+            putTemplateFileForType('zones')
+            putTemplateFileForType('templates')
+
+        reloadCollections()
+        closeJournal()
+        if args.resume:
+            sprint(f"Skipped {resumedCount} uploads completed unchanged by an earlier run")
+
+    def planUploads():
+        """
+        Build the upload graph used with --workers.  Each object file is one task and a task named for each type
+        completes once every object of that type is uploaded so that UPLOAD_DEPENDENCIES can refer to whole types.
+
+        :return: dict of task name to (callable or None, [names of tasks which must finish first]) in serial order
+        """
+        tasks = {}
+        typeTasks = dict((type, []) for type in UPLOAD_DEPENDENCIES)
+
+        def addTask(type, name, fn, after=[]):
+            tasks[name] = (fn, ["type:" + t for t in UPLOAD_DEPENDENCIES[type]] + after)
+            typeTasks[type].append(name)
+
+        # signals and the main app collection (see sortCollection) are created before the other collections
+        firstCollections = []
+        for f in sorted(getFileListForType("collections"),key=sortCollection):
+            name = "collections:" + f
+            addTask("collections", name, lambda f=f: putCollectionFile(f), [] if sortCollection(f) != f else list(firstCollections))
+            if sortCollection(f) != f:
+                firstCollections.append(name)
+        for f, colFile in getFeatureFiles():
+            addTask("features", "features:" + f, lambda f=f: putFeatureFile(f), ["collections:" + colFile])
+        for f in getFileListForType("blobs"):
+            addTask("blobs", "blobs:" + f, lambda f=f: putBlobFile(f))
+
+        checkers = {"sparkJobs": lambda r,p: sparkChecker(r,p), "dataSources": lambda r,p: datasourceChecker(r,p)}
+        for type in ['dataModels', 'parsers', 'indexPipelines', 'queryPipelines', 'indexProfiles', 'queryProfiles',
+                     'tasks', 'sparkJobs', 'dataSources']:
+            for f in getFileListForType(type):
+                addTask(type, type + ":" + f, lambda type=type, f=f: putObjectFile(type, f, None, None, checkers.get(type)))
+        for f in getFileListForType("jobs"):
+            addTask("jobs", "jobs:" + f, lambda f=f: putJobScheduleFile(f))
+        for type in ['zones', 'templates']:
+            for f in getFileListForType(type):
+                addTask(type, type + ":" + f, lambda type=type, f=f: putTemplateFile(type, f))
+
+        for type, names in typeTasks.items():
+            tasks["type:" + type] = (None, names)
+        return tasks
+
+    @traced()
+    def runUploadGraph(tasks, workers):
+        """
+        Run each task on a pool of workers as soon as every task it depends on has finished.  Ready tasks are
+        started in the order they were added.  The first failure (including --failOnStdError exits) cancels the
+        tasks not yet started and is re-raised.
+
+        :param tasks: dict of task name to (callable or None, [names of tasks which must finish first])
+        :param workers: maximum number of concurrent uploads
+        """
+        order = dict((name, i) for i, name in enumerate(tasks))
+        waitingOn = dict((name, set(d for d in after if d in tasks)) for name, (fn, after) in tasks.items())
+        dependents = dict((name, []) for name in tasks)
+        for name, after in waitingOn.items():
+            for d in after:
+                dependents[d].append(name)
+
+        ready = [name for name in tasks if not waitingOn[name]]
+        running = {}
+        finished = set()
+
+        def complete(name):
+            finished.add(name)
+            for dependent in dependents[name]:
+                waitingOn[dependent].discard(name)
+                if not waitingOn[dependent]:
+                    ready.append(dependent)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while ready or running:
+                ready.sort(key=lambda n: order[n])
+                while ready:
+                    name = ready.pop(0)
+                    fn = tasks[name][0]
+                    if fn is None:
+                        # grouping task, nothing to upload
+                        complete(name)
+                    else:
+                        running[pool.submit(fn)] = name
+                    ready.sort(key=lambda n: order[n])
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        future.result()
+                    except BaseException:
+                        for other in running:
+                            other.cancel()
+                        raise
+                    complete(name)
+
+        if len(finished) < len(tasks):
+            eprint("Upload dependencies could not be resolved for: " + ", ".join(n for n in tasks if n not in finished))
+
+    @traced("io")
+    def buildImportZip(zipfile):
+        """
+        repack the exploded directory into the layout getApp's extractAppFromZip takes apart i.e. objects.json plus
+        blobs/ and configsets/<collection>/ entries.
+
+        :return: dict of "type:id" to the source file of each object in objects.json
+        """
+        global appName
+        objects = {}
+        sources = {}
+        for type in OBJ_TYPES:
+            idField = "resource" if type == "jobs" else "id"
+            for f in getFileListForType(type):
+                payload = loadPayload(type, f)
+                objects.setdefault(type, []).append(payload)
+                sources[f"{type}:{payload.get(idField)}"] = f
+                if type == "fusionApps":
+                    appName = payload['id']
+                elif type == "blobs":
+                    blobFile = os.path.join(args.dir, "blobs") + payload["path"].replace('/',os.sep)
+                    if os.path.isfile(blobFile):
+                        zipfile.write(blobFile, "blobs" + payload["path"])
+                elif type == "collections":
+                    configDir = os.path.join(args.dir, "configsets", payload["id"])
+                    for file in sorted(getFileListing(configDir)):
+                        zipfile.write(os.path.join(configDir, file), "configsets/" + payload["id"] + "/" + file.replace(os.sep,'/'))
+
+        for f, colFile in getFeatureFiles():
+            with open(f, 'r') as jfile:
+                features = json.load(jfile)
+            for feature in features:
+                objects.setdefault("features", {}).setdefault(feature["collectionId"], []).append(feature)
+                sources[f"features:{feature['collectionId']}"] = os.path.relpath(f, args.dir)
+
+        zipfile.writestr("objects.json", json.dumps({"objects": objects, "metadata": {"fusionVersion": fusionVersion}}, indent=4))
+        return sources
+
+    @traced()
+    def putBulk():
+        """
+        upload the whole directory as one zip to the /objects/import endpoint rather than one or more calls per object.
+        The multipart body is written to a temp file first so it can be streamed with a Content-Length.
+        """
+        if len(getFileListForType("fusionApps")) != 1:
+            sys.exit("Exactly one file with name ending in " + getSuffix("fusionApps") + " in directory " + args.dir + " is required! Exiting.")
 
-        putCollections()
-        putFeatures()
-        putBlobs()
-        putFileForType('dataModels')
-        putFileForType('parsers')
-        putFileForType('indexPipelines')
-        putFileForType('queryPipelines')
-        putFileForType('indexProfiles')
-        putFileForType('queryProfiles')
-        putFileForType('tasks')
-        putFileForType('sparkJobs',None,None,lambda r,p: sparkChecker(r,p))
+        boundary = "----putApp" + uuid.uuid4().hex
+        with tempfile.TemporaryFile() as zipData, tempfile.TemporaryFile() as body:
+            with ZipFile(zipData, 'w', ZIP_DEFLATED) as zipfile:
+                sources = buildImportZip(zipfile)
+            sprint(f"Importing {len(sources)} objects from '{args.dir}' as App {appName} in one request")
 
-        putFileForType("dataSources",None,None,lambda r,p: datasourceChecker(r,p))
-        putJobSchedules()
+            body.write((f'--{boundary}\r\nContent-Disposition: form-data; name="importData"; filename="{appName}.zip"\r\n'
+                        'Content-Type: application/zip\r\n\r\n').encode())
+            zipData.seek(0)
+            shutil.copyfileobj(zipData, body)
+            body.write(f'\r\n--{boundary}--\r\n'.encode())
+            body.seek(0)
 
-        putTemplateFileForType('zones')
-        putTemplateFileForType('templates')
+            url = args.server + "/api/objects/import?importPolicy=" + args.importPolicy
+            headers = {"Content-Type": "multipart/form-data; boundary=" + boundary}
+            response = httpRequest("POST", url, headers=headers, data=body)
+
+        try:
+            report = response.json()
+        except ValueError:
+            report = None
+        # one line per object the import report lists, pointing at the local file it came from
+        results = "".join(f"\n\t{outcome} {key} from {sources.get(key, 'no local file')}"
+                          for outcome, key in importReportObjects(report))
+        if response.status_code >= 200 and response.status_code <= 250:
+            sprint(f"Imported App {appName} successfully" + results)
+            if args.verbose:
+                sprint(response.text)
+        else:
+            eprint("Non OK response of " + str(response.status_code) + " when importing to: " + url + ' response.text: ' + response.text
+                   + results)
+
+    def importReportObjects(report, outcome="imported"):
+        """
+        walk the JSON report of /objects/import.  Lists of ids are keyed by object type and sit under the outcome
+        they share e.g. {"skipped": {"collections": ["c1"]}}.  An entry may also carry its own "type" and "id".
+
+        :return: generator of (outcome, "type:id")
+        """
+        if isinstance(report, dict):
+            type = report.get("type")
+            id = report.get("id", report.get("resource"))
+            if type in OBJ_TYPES and isinstance(id, str):
+                yield outcome, f"{type}:{id}"
+                return
+            for key, value in report.items():
+                if key in OBJ_TYPES:
+                    for id in reportIds(value):
+                        yield outcome, f"{key}:{id}"
+                else:
+                    yield from importReportObjects(value, key)
+        elif isinstance(report, list):
+            for item in report:
+                yield from importReportObjects(item, outcome)
+
+    def reportIds(value):
+        # the ids of one type in an import report: a list of ids or of objects, or a dict keyed by id
+        if isinstance(value, dict):
+            return list(value)
+        if isinstance(value, list):
+            return [item.get("id", item.get("resource")) if isinstance(item, dict) else item for item in value]
+        return [value]
 
     def sparkChecker(response,payload):
         exists = False
@@ -862,9 +1867,31 @@ try:
         parser.add_argument("--password", help="Fusion password,  default: ${lw_PASSWORD} or 'password123'.") #,default="password123"
         parser.add_argument("--jwt",help="JWT token for access to Fusion.  If set, --user, --password will be ignored",default=None)
         parser.add_argument("--apiKey",help="API Key for access to Fusion.  If set, --user, --password and --jwt will be ignored",default=None)
+        parser.add_argument("--sessionAuth",help="Log in once via Fusion's session api and use the session cookie rather than sending\n--user, --password with every request.  Ignored if --jwt or --apiKey is set, default: False.",default=False,action="store_true")
         parser.add_argument("--debug",help="Print debug messages while running, default: False.",default=False,action="store_true")# default=False
         parser.add_argument("--noVerify",help="Do not verify SSL certificates if using https, default: False.",default=False,action="store_true")# default=False
         parser.add_argument("-v","--verbose",help="Print details, default: False.",default=False,action="store_true")# default=False
+        parser.add_argument("--timeout",type=float,metavar="SECS",help="Seconds to wait for a response, or for the next bytes of one, from Fusion.  0 waits forever,\ndefault: 120.",default=120)
+        parser.add_argument("--connectTimeout",type=float,metavar="SECS",help="Seconds to wait for a connection to Fusion, default: 10.",default=10)
+        parser.add_argument("--retries",type=int,metavar="N",help="Number of times to retry a request answered with 429, 502, 503 or 504 or that could not\nconnect.  A POST is only retried on 429 or 503.  Idempotent requests are also retried after a\ndropped connection or read timeout, default: 3.",default=3)
+        parser.add_argument("--backoff",type=float,metavar="SECS",help="Base of the jittered exponential delay between retries.  A Retry-After header from the\nserver takes precedence, default: 0.5.",default=0.5)
+        parser.add_argument("--maxBackoff",type=float,metavar="SECS",help="Longest delay between retries, including one asked for by Retry-After, default: 30.",default=30)
+        parser.add_argument("--adaptive",help="Adapt the number of concurrent requests to each host (up to --maxPerHost, or 64): halve it\nwhen Fusion answers with an overload status or slows down, grow it back by one per round trip\nwhile responses are fast, default: False.",default=False,action="store_true")
+        parser.add_argument("--poolSize",type=int,metavar="N",help="Number of keep-alive connections to pool per host, default: 10.",default=10)
+        parser.add_argument("--skipUnchanged",help="Fetch the current objects of each type and do not upload those identical to the local\nfile after variable substitution, default: False.",default=False,action="store_true")
+        parser.add_argument("--workers",type=int,metavar="N",help="Number of objects to upload concurrently on a pool of threads.  Uploads are ordered by their\ndependencies e.g. collections before their features and schema, parsers and blobs before pipelines.\nThe first failure stops the uploads not yet started.  Use with --maxPerHost or --adaptive to\nbound the requests Fusion sees, default: 1.",default=1)
+        parser.add_argument("--maxPerHost",type=int,metavar="N",help="Maximum number of concurrent requests to one Fusion host, default: 0 (no limit).",default=0)
+        parser.add_argument("--uploadAllSchemaFiles",help="Upload every configset file and reload each collection even when ZooKeeper already has\nidentical copies, default: False.",default=False,action="store_true")
+        parser.add_argument("--schemaWorkers",type=int,metavar="N",help="Number of configset files of the same ordering tier to upload concurrently, default: 1.",default=1)
+        parser.add_argument("--deferReloads",help="Do not reload each collection as soon as its configset is uploaded.  Reload every collection\nwhose configset or features changed once at the end of the run instead, default: False.",default=False,action="store_true")
+        parser.add_argument("--reloadWorkers",type=int,metavar="N",help="Number of deferred collection reloads to run concurrently, default: 2.",default=2)
+        parser.add_argument("--bulk",help="Repack the directory into an export zip and send it to Fusion's /objects/import endpoint\nin a single request rather than one or more requests per object, default: False.",default=False,action="store_true")
+        parser.add_argument("--importPolicy",help="Import policy used with --bulk, one of abort, merge or overwrite, default: overwrite.",default="overwrite",choices=["abort","merge","overwrite"])
+        parser.add_argument("--metricsFile",metavar="FILE",help="Write per endpoint HTTP latency (p50/p95/max), status, retry and byte counts plus objects\nper second to this JSON file at the end of the run, default: None.",default=None)
+        parser.add_argument("--prometheusFile",metavar="FILE",help="Also write the HTTP metrics to this file in the Prometheus textfile format, default: None.",default=None)
+        parser.add_argument("--traceFile",metavar="FILE",help="Write a span for each phase, HTTP request and file write to this file in the Chrome trace\nevent format.  Open it in chrome://tracing or ui.perfetto.dev, default: None.",default=None)
+        parser.add_argument("--resume",help="Skip uploads recorded as completed in DIR/" + JOURNAL_FILE + " by an earlier run against the\nsame --server, as long as their files have not changed since, default: False.",default=False,action="store_true")
+        parser.add_argument("--noJournal",help="Do not record completed uploads in DIR/" + JOURNAL_FILE + ".  The journal is removed\nonce a run completes without errors, default: False.",default=False,action="store_true")
         parser.add_argument("--varFile",help="Protected variables file used for password replacement (if needed) default: None.",default=None)
 
         args = parser.parse_args()
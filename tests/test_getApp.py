@@ -0,0 +1,374 @@
+"""
+Unit tests for getApp.py helpers which need no Fusion server.  Standard library only, run with
+    python3 -m unittest discover tests
+or python3 -m pytest tests
+"""
+import codecs, contextlib, io, json, os, sys, unittest, zipfile
+from unittest import mock
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bench"))
+from scriptLoader import loadScript
+
+getApp = loadScript("getApp")
+
+
+class PackExportParamsTest(unittest.TestCase):
+    def setUp(self):
+        self.baseSize = getApp.encodedParamSize(getApp.newExportParams())
+
+    def cost(self, key, id):
+        return 1 + getApp.encodedParamSize({key: id})
+
+    def packedIds(self, allParams):
+        return sorted((k, id) for params in allParams for k, v in params.items() if k.endswith(".ids") for id in v)
+
+    def testPacksUpToTheLimit(self):
+        ids = ["pipeline%d" % i for i in range(5)]
+        limit = self.baseSize + sum(self.cost("index-pipeline.ids", id) for id in ids)
+        allParams = getApp.packExportParams({"index-pipeline.ids": ids}, limit)
+        self.assertEqual(1, len(allParams))
+        self.assertEqual(limit, getApp.encodedParamSize(allParams[0]))
+        self.assertEqual(ids, allParams[0]["index-pipeline.ids"])
+
+    def testOneByteOverTheLimitStartsAnotherSet(self):
+        ids = ["pipeline%d" % i for i in range(5)]
+        limit = self.baseSize + sum(self.cost("index-pipeline.ids", id) for id in ids) - 1
+        allParams = getApp.packExportParams({"index-pipeline.ids": ids}, limit)
+        self.assertEqual(2, len(allParams))
+        self.assertEqual(ids[:4], allParams[0]["index-pipeline.ids"])
+        self.assertEqual(ids[4:], allParams[1]["index-pipeline.ids"])
+
+    def testNoSetExceedsTheLimit(self):
+        idsByKey = {"blob.ids": ["lib/blob %d.bin" % i for i in range(40)],
+                    "collection.ids": ["col_%d" % i for i in range(25)],
+                    "job.ids": ["datasource:ds%d" % i for i in range(10)]}
+        limit = 300
+        allParams = getApp.packExportParams(idsByKey, limit)
+        self.assertGreater(len(allParams), 1)
+        for params in allParams:
+            self.assertLessEqual(getApp.encodedParamSize(params), limit)
+            self.assertEqual("system", params["filterPolicy"])
+        self.assertEqual(sorted((k, id) for k, v in idsByKey.items() for id in v), self.packedIds(allParams))
+
+    def testIdAloneOverTheLimitGetsItsOwnSet(self):
+        big = "x" * 200
+        limit = self.baseSize + 100
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            allParams = getApp.packExportParams({"blob.ids": ["a", big, "b"]}, limit)
+        self.assertIn("alone exceeds the param size limit", stderr.getvalue())
+        self.assertEqual([["a", "b"], [big]], [params["blob.ids"] for params in allParams])
+
+    def testSplitExportParams(self):
+        params = getApp.packExportParams({"blob.ids": ["blob%d" % i for i in range(20)],
+                                          "parser.ids": ["parser%d" % i for i in range(20)]}, 10000)[0]
+        limit = getApp.encodedParamSize(params) // 2
+        pieces = getApp.splitExportParams(params, limit)
+        self.assertGreater(len(pieces), 1)
+        for piece in pieces:
+            self.assertLessEqual(getApp.encodedParamSize(piece), limit)
+            self.assertEqual("false", piece["deep"])
+        self.assertEqual(self.packedIds([params]), self.packedIds(pieces))
+
+    def testSplitSingleIdCanNotGoSmaller(self):
+        params = dict(getApp.newExportParams(), **{"blob.ids": ["only"]})
+        with contextlib.redirect_stderr(io.StringIO()):
+            pieces = getApp.splitExportParams(params, getApp.encodedParamSize(params) // 2)
+        self.assertEqual(1, len(pieces))
+
+
+class ExportParamsFromLinksTest(unittest.TestCase):
+    def link(self, subject, app="demo"):
+        return {"subject": subject, "object": "app:" + app, "linkType": "inContextOf"}
+
+    def testDuplicateLinksAreExportedOnce(self):
+        links = [self.link("datasource:web"), self.link("collection:demo"), self.link("datasource:web"),
+                 self.link("task:cleanup"), self.link("collection:demo"), self.link("datasource:files"),
+                 self.link("task:cleanup")]
+        allParams = getApp.makeExportParamsFromLinks(links, "demo", 10000)
+        self.assertEqual(1, len(allParams))
+        self.assertEqual(["web", "files"], allParams[0]["datasource.ids"])
+        self.assertEqual(["demo"], allParams[0]["collection.ids"])
+        self.assertEqual(["datasource:web", "task:cleanup", "datasource:files"], allParams[0]["job.ids"])
+
+    def testLinksOfOtherAppsAndPrefsBlobsAreSkipped(self):
+        links = [self.link("collection:demo"), self.link("collection:other", "other"), self.link("blob:prefs-demo"),
+                 self.link("unknown:x"), "not a link"]
+        params = getApp.makeExportParamsFromLinks(links, "demo", 10000)[0]
+        self.assertEqual(["demo"], params["app.ids"])
+        self.assertEqual(["demo"], params["collection.ids"])
+        self.assertNotIn("blob.ids", params)
+
+
+class FakeResponse:
+    """
+    streamed response whose body stops after cutAt bytes, with a dropped connection if drop is set
+    """
+    def __init__(self, status, body, headers=None, cutAt=None, drop=False):
+        self.status_code = status
+        self.body = body
+        self.headers = dict(headers or {})
+        self.cutAt = len(body) if cutAt is None else cutAt
+        self.drop = drop
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.closed = True
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, self.cutAt, chunk_size):
+            yield self.body[start:min(self.cutAt, start + chunk_size)]
+        if self.drop:
+            raise requests.exceptions.ChunkedEncodingError("Connection broken: IncompleteRead")
+
+
+class DownloadBodyTest(unittest.TestCase):
+    BODY = bytes(range(256)) * 40
+    URL = "http://fusion:8764/api/objects/export"
+
+    def setUp(self):
+        getApp.args.retries = 2
+        getApp.args.backoff = 0
+        getApp.args.maxBackoff = 0
+
+    def headers(self, **extra):
+        return dict({"Content-Length": str(len(self.BODY)), "Accept-Ranges": "bytes", "ETag": '"v1"'}, **extra)
+
+    def download(self, first, *responses):
+        """
+        :return: (result of downloadBody, bytes written, headers of each follow up request)
+        """
+        requested = []
+        queue = list(responses)
+
+        def doHttp(url, usr=None, pswd=None, headers={}, params={}, stream=False):
+            requested.append(headers)
+            return queue.pop(0)
+
+        out = io.BytesIO()
+        # the metrics entry addReceivedBytes adds to is made by the real request, which the fakes skip
+        with mock.patch.object(getApp, "doHttp", doHttp), mock.patch.object(getApp, "addReceivedBytes"), \
+                contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            ok = getApp.downloadBody(first, out, self.URL, headers={"accept": "application/zip"})
+        return ok, out.getvalue(), requested
+
+    def testCompleteBody(self):
+        ok, data, requested = self.download(FakeResponse(200, self.BODY, self.headers()))
+        self.assertTrue(ok)
+        self.assertEqual(self.BODY, data)
+        self.assertEqual([], requested)
+
+    def testResumesWithRangeOn206(self):
+        cut = 3000
+        ok, data, requested = self.download(
+            FakeResponse(200, self.BODY, self.headers(), cutAt=cut, drop=True),
+            FakeResponse(206, self.BODY[cut:], self.headers(**{"Content-Length": str(len(self.BODY) - cut),
+                                                               "Content-Range": f"bytes {cut}-{len(self.BODY) - 1}/{len(self.BODY)}"})))
+        self.assertTrue(ok)
+        self.assertEqual(self.BODY, data)
+        self.assertEqual(f"bytes={cut}-", requested[0]["Range"])
+        self.assertEqual('"v1"', requested[0]["If-Range"])
+        self.assertEqual("application/zip", requested[0]["accept"])
+
+    def testStartsOverOn200ToARangeRequest(self):
+        # e.g. the export changed so If-Range made the server send the whole body
+        changed = self.BODY[:2000][::-1]
+        ok, data, requested = self.download(
+            FakeResponse(200, self.BODY, self.headers(), cutAt=6000, drop=True),
+            FakeResponse(200, changed, self.headers(ETag='"v2"', **{"Content-Length": str(len(changed))})))
+        self.assertTrue(ok)
+        self.assertEqual(changed, data)
+        self.assertIn("Range", requested[0])
+
+    def testStartsOverOnAMismatched206(self):
+        ok, data, requested = self.download(
+            FakeResponse(200, self.BODY, self.headers(), cutAt=3000, drop=True),
+            FakeResponse(206, self.BODY[100:], self.headers(**{"Content-Range": f"bytes 100-{len(self.BODY) - 1}/{len(self.BODY)}"})),
+            FakeResponse(200, self.BODY, self.headers()))
+        self.assertTrue(ok)
+        self.assertEqual(self.BODY, data)
+        self.assertNotIn("Range", requested[1])
+
+    def testStartsOverOnA206OfAnotherLength(self):
+        ok, data, requested = self.download(
+            FakeResponse(200, self.BODY, self.headers(), cutAt=3000, drop=True),
+            FakeResponse(206, self.BODY[3000:], self.headers(**{"Content-Range": f"bytes 3000-{len(self.BODY) + 99}/{len(self.BODY) + 100}"})),
+            FakeResponse(200, self.BODY, self.headers()))
+        self.assertTrue(ok)
+        self.assertEqual(self.BODY, data)
+        self.assertNotIn("Range", requested[1])
+
+    def testTruncatedBodyIsRetried(self):
+        # the connection closed cleanly but short of Content-Length
+        ok, data, requested = self.download(
+            FakeResponse(200, self.BODY, self.headers(), cutAt=5000),
+            FakeResponse(206, self.BODY[5000:], self.headers(**{"Content-Range": f"bytes 5000-{len(self.BODY) - 1}/{len(self.BODY)}"})))
+        self.assertTrue(ok)
+        self.assertEqual(self.BODY, data)
+        self.assertEqual("bytes=5000-", requested[0]["Range"])
+
+    def testTruncatedBodyFailsOnceRetriesAreUsedUp(self):
+        getApp.args.retries = 0
+        ok, data, requested = self.download(FakeResponse(200, self.BODY, self.headers(), cutAt=5000))
+        self.assertFalse(ok)
+        self.assertEqual([], requested)
+
+    def testNoRangesStartsOver(self):
+        headers = self.headers()
+        del headers["Accept-Ranges"]
+        ok, data, requested = self.download(
+            FakeResponse(200, self.BODY, headers, cutAt=3000, drop=True),
+            FakeResponse(200, self.BODY, headers))
+        self.assertTrue(ok)
+        self.assertEqual(self.BODY, data)
+        self.assertNotIn("Range", requested[0])
+
+
+class DoHttpZipGetTest(unittest.TestCase):
+    URL = "http://fusion:8764/api/objects/export"
+
+    def setUp(self):
+        getApp.args.retries = 0
+        getApp.args.zipDir = None
+
+    def zipBytes(self, members):
+        data = io.BytesIO()
+        with zipfile.ZipFile(data, "w", zipfile.ZIP_DEFLATED) as zip:
+            for name, content in members.items():
+                zip.writestr(name, content)
+        return data.getvalue()
+
+    def fetch(self, body, spoolSize):
+        response = FakeResponse(200, body, {"Content-Type": "application/zip", "Content-Length": str(len(body))})
+        with mock.patch.object(getApp, "doHttp", lambda *params, **kwargs: response), \
+                mock.patch.object(getApp, "addReceivedBytes"), mock.patch.object(getApp, "ZIP_SPOOL_SIZE", spoolSize), \
+                contextlib.redirect_stderr(io.StringIO()):
+            return getApp.doHttpZipGet(self.URL, params={"app.ids": "app"})
+
+    def testSpooledDownloadIsReadable(self):
+        members = {"objects.json": json.dumps({"objects": {}}), "blobs/lib/a.bin": os.urandom(5000)}
+        body = self.zipBytes(members)
+        # in memory and rolled over to disk
+        for spoolSize in (len(body) * 2, 100):
+            with self.subTest(spoolSize=spoolSize):
+                zip = self.fetch(body, spoolSize)
+                self.assertIsNotNone(zip)
+                with zip:
+                    for name, content in members.items():
+                        with zip.open(name) as member:
+                            self.assertEqual(content if isinstance(content, bytes) else content.encode(), member.read())
+
+    def testNotAZip(self):
+        self.assertIsNone(self.fetch(b"PK not really a zip", 1000))
+
+
+class RequestSlotTest(unittest.TestCase):
+    URL = "http://fusion:8764/api/objects/export"
+
+    def setUp(self):
+        getApp.args.retries = 0
+        getApp.args.adaptive = True
+        getApp.args.parallel = 1
+        getApp.hostSemaphores.clear()
+
+    def tearDown(self):
+        getApp.args.adaptive = None
+        getApp.hostSemaphores.clear()
+
+    def testSlotReleasedWhenTheRequestRaises(self):
+        for error in (requests.exceptions.InvalidURL("bad"), requests.exceptions.TooManyRedirects("loop"),
+                      requests.exceptions.ChunkedEncodingError("broken"), requests.ConnectionError("refused")):
+            with self.subTest(error=type(error).__name__):
+                getApp.hostSemaphores.clear()
+                with mock.patch.object(getApp, "timedRequest", side_effect=error):
+                    with self.assertRaises(type(error)):
+                        getApp.requestWithRetry(None, "GET", self.URL)
+                # with --parallel 1 a leaked slot would block every later request to the host
+                self.assertEqual(0, getApp.hostSlot(self.URL).inFlight)
+
+
+class TrickleStream:
+    """
+    binary stream returning at most step bytes per read, like a socket, so tokens are split across reads
+    """
+    def __init__(self, data, step):
+        self.data = data
+        self.step = step
+        self.pos = 0
+
+    def read(self, size=-1):
+        count = self.step if size < 0 else min(size, self.step)
+        chunk = self.data[self.pos:self.pos + count]
+        self.pos += len(chunk)
+        return chunk
+
+
+class JsonStreamTest(unittest.TestCase):
+    OBJECTS = {
+        "metadata": {"fusionVersion": "5.9.0", "nested": [{"a": [1, 2, {"b": None}]}]},
+        "objects": {
+            "fusionApps": [{"id": "app", "name": "braces { and } in a name"}],
+            "queryPipelines": [
+                {"id": "qp1", "stages": [{"type": "javascript-query",
+                                          "script": "function(r) { if (x == \"}\") { return '{'; } }"}]},
+                {"id": "qp2", "quote": "say \"hi\" \\\" then {\"key\": [1]}", "unicode": "caf\u00e9 \u2603 \U0001f600"},
+            ],
+            "indexProfiles": [],
+            "parsers": [{"id": "p", "numbers": [0, -1, 1.5e3, -0.25, 12345678901234567890, 1E-7], "flags": [True, False, None]}],
+            "features": {"col1": [{"name": "signals", "params": {}}], "col{2}": []},
+        },
+        "trailing": "}]",
+    }
+
+    def expected(self):
+        for type, value in self.OBJECTS["objects"].items():
+            if isinstance(value, list):
+                for element in value:
+                    yield type, None, element
+            else:
+                for key, element in value.items():
+                    yield type, key, element
+
+    def parse(self, data, step):
+        return list(getApp.iterObjectsJson(TrickleStream(data, step)))
+
+    def testTokensSplitAcrossReads(self):
+        # multi byte characters, or with ensure_ascii their \u escapes, are split as well
+        for indent, ascii in ((None, False), (2, True)):
+            data = json.dumps(self.OBJECTS, indent=indent, ensure_ascii=ascii).encode()
+            for step in (1, 2, 3, 5, 7, 64):
+                with self.subTest(indent=indent, ascii=ascii, step=step):
+                    self.assertEqual(list(self.expected()), self.parse(data, step))
+
+    def testNumberAtTheEndOfARead(self):
+        # 1.5 is a complete number but 1.5e3 was meant
+        for step in range(1, 8):
+            with self.subTest(step=step):
+                reader = getApp.JsonStream(TrickleStream(b"[1.5e3, -20, 7]", step))
+                reader.expect("[")
+                self.assertEqual([1500.0, -20, 7], list(reader.elements()))
+
+    def testByteOrderMark(self):
+        data = codecs.BOM_UTF8 + json.dumps(self.OBJECTS).encode()
+        self.assertEqual(list(self.expected()), self.parse(data, 3))
+
+    def testTruncatedDocument(self):
+        data = json.dumps(self.OBJECTS).encode()
+        with self.assertRaises(json.JSONDecodeError):
+            self.parse(data[:len(data) // 2], 7)
+
+    def testStrayCharacter(self):
+        with self.assertRaises(json.JSONDecodeError):
+            self.parse(b'{"objects": {"parsers": [{"id": "p"} {"id": "q"}]}}', 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
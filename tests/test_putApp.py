@@ -0,0 +1,485 @@
+"""
+Unit tests for putApp.py helpers which need no Fusion server.  Standard library only, run with
+    python3 -m unittest discover tests
+or python3 -m pytest tests
+"""
+import contextlib, io, json, os, sys, tempfile, threading, time, unittest, zipfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bench"))
+from scriptLoader import loadScript
+
+putApp = loadScript("putApp")
+
+
+class FakeResponse:
+    def __init__(self, status, body=None):
+        self.status_code = status
+        self.content = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.text = self.content.decode("utf-8")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise putApp.requests.HTTPError(response=self)
+
+
+class UnchangedTest(unittest.TestCase):
+    def setUp(self):
+        self.pipeline = {"id": "main", "stages": [{"id": "s1", "type": "solr-query", "secretSourceStageId": "x"}]}
+
+    def testVolatileFieldsAreIgnored(self):
+        current = dict(self.pipeline, updates=[{"userId": "admin"}], modifiedTime="2024-01-01", version=3)
+        self.assertEqual(putApp.normalizeForCompare(self.pipeline), putApp.normalizeForCompare(current))
+
+    def testSecretSourceStageIdIsIgnored(self):
+        current = {"id": "main", "stages": [{"id": "s1", "type": "solr-query", "secretSourceStageId": "y"}]}
+        self.assertEqual(putApp.normalizeForCompare(self.pipeline), putApp.normalizeForCompare(current))
+
+    def testIsUnchanged(self):
+        existing = {"main": dict(self.pipeline, version=7)}
+        with mock.patch.object(putApp.args, "skipUnchanged", True):
+            self.assertTrue(putApp.isUnchanged(existing, self.pipeline, "id"))
+            self.assertFalse(putApp.isUnchanged(existing, dict(self.pipeline, stages=[]), "id"))
+            self.assertFalse(putApp.isUnchanged(existing, dict(self.pipeline, id="other"), "id"))
+            self.assertFalse(putApp.isUnchanged(None, self.pipeline, "id"))
+        with mock.patch.object(putApp.args, "skipUnchanged", False):
+            self.assertFalse(putApp.isUnchanged(existing, self.pipeline, "id"))
+
+
+class PutPayloadFileTest(unittest.TestCase):
+    """
+    putPayloadFile against a canned listing.  Every other request is recorded and answered from statuses, 200 once
+    they run out
+    """
+    URL = "http://fusion/api/apps/demo/query-pipelines"
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        putApp.existingObjects.clear()
+        self.requests = []
+        self.listings = 0
+
+    def put(self, type, payloads, listing, apiUrl=URL, globalListing=False, skipUnchanged=True, statuses=()):
+        statuses = list(statuses)
+
+        def doHttp(url, *params, **kwargs):
+            self.listings += 1
+            return FakeResponse(200, listing) if listing is not None else FakeResponse(404)
+
+        def httpRequest(method, url, **kwargs):
+            self.requests.append((method, url, json.loads(kwargs["data"])))
+            return FakeResponse(statuses.pop(0) if statuses else 200)
+        with mock.patch.object(putApp, "args", mock.Mock(dir=self.dir, server="http://fusion", debug=False,
+                                                         skipUnchanged=skipUnchanged, verbose=False)), \
+                mock.patch.object(putApp, "appName", "demo"), mock.patch.object(putApp, "doHttp", doHttp), \
+                mock.patch.object(putApp, "httpRequest", httpRequest), contextlib.redirect_stdout(io.StringIO()):
+            for payload in payloads:
+                fileName = payload["id"] + ".json"
+                with open(os.path.join(self.dir, fileName), "w") as f:
+                    json.dump(payload, f)
+                putApp.putPayloadFile(type, fileName, apiUrl, "id", None, globalListing)
+
+    def testNewObjectIsPosted(self):
+        payload = {"id": "new", "stages": []}
+        self.put("queryPipelines", [payload], [{"id": "main"}])
+        self.assertEqual([("POST", self.URL, payload)], self.requests)
+
+    def testListedObjectIsPutWithoutAPost(self):
+        payload = {"id": "main", "stages": []}
+        self.put("queryPipelines", [payload], [payload], skipUnchanged=False)
+        self.assertEqual([("PUT", self.URL + "/main", payload)], self.requests)
+
+    def testTypeIsListedOnce(self):
+        self.put("queryPipelines", [{"id": "main"}, {"id": "other"}, {"id": "new"}], [{"id": "main"}, {"id": "other"}],
+                 skipUnchanged=False)
+        self.assertEqual(1, self.listings)
+        self.assertEqual(["PUT", "PUT", "POST"], [method for method, url, body in self.requests])
+
+    def testConcurrentUploadsShareOneListing(self):
+        def doHttp(url, *params, **kwargs):
+            self.listings += 1
+            time.sleep(0.01)
+            return FakeResponse(200, [{"id": "main"}])
+        with mock.patch.object(putApp, "args", mock.Mock(debug=False)), mock.patch.object(putApp, "doHttp", doHttp), \
+                ThreadPoolExecutor(max_workers=8) as pool:
+            listings = list(pool.map(lambda i: putApp.getExistingObjects("queryPipelines", self.URL), range(8)))
+        self.assertEqual(1, self.listings)
+        self.assertEqual([{"main": {"id": "main"}}] * 8, listings)
+
+    def testUnlistedTypeFallsBackToPostThenPut(self):
+        payload = {"id": "main", "stages": []}
+        self.put("queryPipelines", [payload], None, statuses=[409])
+        self.assertEqual([("POST", self.URL, payload), ("PUT", self.URL + "/main", payload)], self.requests)
+
+    def testUnchangedAppObjectIsSkipped(self):
+        payload = {"id": "main", "stages": []}
+        self.put("queryPipelines", [payload], [dict(payload, version=2)])
+        self.assertEqual([], self.requests)
+
+    def testChangedObjectIsPut(self):
+        payload = {"id": "main", "stages": []}
+        self.put("queryPipelines", [payload], [dict(payload, stages=[{"id": "s1"}])])
+        self.assertEqual([("PUT", self.URL + "/main", payload)], self.requests)
+
+    def testUnchangedZoneIsLinkedToTheApp(self):
+        # templating/zones lists the zones of every app so the zone may not be linked to this one yet
+        payload = {"id": "home", "name": "Home"}
+        self.put("zones", [payload], [payload], "http://fusion/templating/zones", True)
+        self.assertEqual([("PUT", "http://fusion/api/links", {"subject": "zone:home", "object": "app:demo",
+                                                               "linkType": "inContextOf"})], self.requests)
+
+
+class UploadGraphTest(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.lock = threading.Lock()
+
+    def record(self, name):
+        with self.lock:
+            self.events.append(("start", name))
+        time.sleep(0.002)
+        with self.lock:
+            self.events.append(("end", name))
+
+    def task(self, name):
+        return lambda: self.record(name)
+
+    def assertRanAfter(self, name, before):
+        self.assertLess(self.events.index(("end", before)), self.events.index(("start", name)),
+                        f"{name} started before {before} finished")
+
+    def testTasksWaitForTheirDependencies(self):
+        tasks = {"a": (self.task("a"), []), "b": (self.task("b"), []), "c": (self.task("c"), ["a"]),
+                 "group": (None, ["b", "c"]), "d": (self.task("d"), ["group"]), "e": (self.task("e"), ["unknown"])}
+        putApp.runUploadGraph(tasks, 4)
+        self.assertEqual({"a", "b", "c", "d", "e"}, set(name for event, name in self.events))
+        self.assertRanAfter("c", "a")
+        self.assertRanAfter("d", "b")
+        self.assertRanAfter("d", "c")
+
+    def testFailureCancelsTheTasksNotStarted(self):
+        def fail():
+            raise RuntimeError("upload failed")
+        tasks = {"a": (fail, []), "b": (self.task("b"), ["a"])}
+        with self.assertRaises(RuntimeError):
+            putApp.runUploadGraph(tasks, 2)
+        self.assertEqual([], self.events)
+
+    def testPlanFollowsUploadDependencies(self):
+        files = {"collections": ["demo.json", "demo_signals_COL.json", "demo_COL.json"], "blobs": ["lib.zip"],
+                 "dataModels": ["model_DM.json"], "parsers": ["p_PS.json"], "indexPipelines": ["ip_IPL.json"],
+                 "queryPipelines": ["qp_QPL.json"], "indexProfiles": ["ipr_IPF.json"],
+                 "queryProfiles": ["qpr_QPF.json"], "tasks": ["t_TSK.json"], "sparkJobs": ["s_SJ.json"],
+                 "dataSources": ["ds_DS.json"], "jobs": ["j_JOB.json"], "zones": ["z_ZN.json"],
+                 "templates": ["t_TPL.json"]}
+        fileTypes = dict((f, type) for type, names in files.items() for f in names)
+        fileTypes["demo_CF.json"] = "features"
+        with mock.patch.object(putApp, "appName", "demo"), \
+                mock.patch.object(putApp, "getFileListForType", lambda type: files.get(type, [])), \
+                mock.patch.object(putApp, "getFeatureFiles", lambda: [("demo_CF.json", "demo_COL.json")]), \
+                mock.patch.object(putApp, "putCollectionFile", self.record), \
+                mock.patch.object(putApp, "putFeatureFile", self.record), \
+                mock.patch.object(putApp, "putBlobFile", self.record), \
+                mock.patch.object(putApp, "putObjectFile", lambda type, f, *rest: self.record(f)), \
+                mock.patch.object(putApp, "putJobScheduleFile", self.record), \
+                mock.patch.object(putApp, "putTemplateFile", lambda type, f, *rest: self.record(f)):
+            putApp.runUploadGraph(putApp.planUploads(), 8)
+
+        self.assertEqual(set(fileTypes), set(name for event, name in self.events))
+        for name, type in fileTypes.items():
+            for dependencyType in putApp.UPLOAD_DEPENDENCIES[type]:
+                for before in files[dependencyType]:
+                    self.assertRanAfter(name, before)
+        self.assertRanAfter("demo_CF.json", "demo_COL.json")
+        # signals and the main app collection first, then the rest
+        self.assertRanAfter("demo.json", "demo_signals_COL.json")
+        self.assertRanAfter("demo.json", "demo_COL.json")
+
+
+class JournalTest(unittest.TestCase):
+    SERVER = "http://fusion"
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.path = os.path.join(self.dir, putApp.JOURNAL_FILE)
+        self.objectFile = os.path.join(self.dir, "main_QPL.json")
+        with open(self.objectFile, "w") as f:
+            f.write('{"id": "main"}')
+        patches = contextlib.ExitStack()
+        self.addCleanup(patches.close)
+        patches.enter_context(mock.patch.object(putApp, "args", mock.Mock(dir=self.dir, server=self.SERVER, resume=True,
+                                                                         verbose=False, failOnStdError=False)))
+        for name, value in [("completedUploads", {}), ("journalFd", None), ("resumedCount", 0), ("errorCount", 0),
+                            ("varReplacements", None)]:
+            patches.enter_context(mock.patch.object(putApp, name, value))
+        patches.enter_context(contextlib.redirect_stdout(io.StringIO()))
+        patches.callback(self.closeFd)
+        self.calls = []
+
+    def closeFd(self):
+        if putApp.journalFd is not None:
+            os.close(putApp.journalFd)
+
+    def writeJournal(self, text):
+        with open(self.path, "w") as f:
+            f.write(text)
+
+    def entry(self, key, digest, server=SERVER):
+        return json.dumps({"key": key, "hash": digest, "server": server, "time": "2024-01-01T00:00:00"}) + "\n"
+
+    def upload(self, fail=False):
+        @putApp.journaled(lambda f: ("queryPipelines:" + os.path.basename(f), [f]))
+        def putFile(f):
+            self.calls.append(f)
+            if fail:
+                with contextlib.redirect_stderr(io.StringIO()):
+                    putApp.eprint("Non OK response")
+        putFile(self.objectFile)
+
+    def journalLines(self):
+        with open(self.path) as f:
+            return f.read().split("\n")
+
+    def testResumeIgnoresATornLastLine(self):
+        self.writeJournal(self.entry("blobs:lib_BLOB.json", "1") + self.entry("collections:c_COL.json", "2")
+                          + self.entry("tasks:t_TSK.json", "3", "http://other") + '{"key": "parsers:p_PS.json", "ha')
+        putApp.openJournal()
+        self.assertEqual({"blobs:lib_BLOB.json": "1", "collections:c_COL.json": "2"}, putApp.completedUploads)
+
+        # the next entry starts on a line of its own and is read back by the following resume
+        self.upload()
+        lines = self.journalLines()
+        self.assertEqual('{"key": "parsers:p_PS.json", "ha', lines[3])
+        self.assertEqual("queryPipelines:main_QPL.json", json.loads(lines[4])["key"])
+        self.assertEqual("", lines[5])
+
+    def testCompletedUploadIsSkipped(self):
+        self.writeJournal(self.entry("queryPipelines:main_QPL.json", putApp.contentHash([self.objectFile])))
+        putApp.openJournal()
+        self.upload()
+        self.assertEqual([], self.calls)
+        self.assertEqual(1, putApp.resumedCount)
+
+    def testChangedFileIsUploadedAgain(self):
+        self.writeJournal(self.entry("queryPipelines:main_QPL.json", putApp.contentHash([self.objectFile])))
+        with open(self.objectFile, "w") as f:
+            f.write('{"id": "main", "stages": []}')
+        putApp.openJournal()
+        self.upload()
+        self.assertEqual([self.objectFile], self.calls)
+        self.assertEqual(putApp.contentHash([self.objectFile]), json.loads(self.journalLines()[1])["hash"])
+
+    def testFailedUploadIsNotJournaled(self):
+        putApp.openJournal()
+        self.upload(fail=True)
+        self.assertEqual([self.objectFile], self.calls)
+        self.assertEqual([""], self.journalLines())
+
+    def testJournalRemovedOnlyAfterACleanRun(self):
+        putApp.openJournal()
+        self.upload()
+        putApp.closeJournal()
+        self.assertFalse(os.path.exists(self.path))
+
+        putApp.openJournal()
+        self.upload(fail=True)
+        putApp.closeJournal()
+        self.assertTrue(os.path.exists(self.path))
+
+
+class SchemaTest(unittest.TestCase):
+    """
+    putSchema against a canned ZooKeeper copy of the configset.  Uploads are recorded as (method, file, reload)
+    """
+    FILES = {"managed-schema": b"<schema/>", "solrconfig.xml": b"<config/>", os.path.join("lang", "stopwords.txt"): b"a\n"}
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.zk = dict(self.FILES)
+        self.uploads = []
+        self.write(self.FILES)
+        patches = contextlib.ExitStack()
+        self.addCleanup(patches.close)
+        patches.enter_context(mock.patch.object(putApp, "args", mock.Mock(
+            dir=self.dir, server="http://fusion", uploadAllSchemaFiles=False, schemaWorkers=4, reloadWorkers=2,
+            deferReloads=False, verbose=False, debug=False, failOnStdError=False)))
+        for name, value in [("pendingReloads", {}), ("pendingJournal", {}), ("journalFd", None), ("errorCount", 0)]:
+            patches.enter_context(mock.patch.object(putApp, name, value))
+        patches.enter_context(mock.patch.object(putApp, "doHttpJsonGet", self.listZk))
+        patches.enter_context(mock.patch.object(putApp, "doHttp", self.getZk))
+        patches.enter_context(mock.patch.object(putApp, "doHttpPostPut", self.upload))
+        patches.enter_context(contextlib.redirect_stdout(io.StringIO()))
+
+    def write(self, files, colName="demo"):
+        for name, data in files.items():
+            path = os.path.join(self.dir, "configsets", colName, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+
+    def listZk(self, url):
+        children = [{"name": "stopwords.txt", "isDir": False}] if os.path.join("lang", "stopwords.txt") in self.zk else []
+        return [{"name": name, "isDir": False} for name in self.zk if os.sep not in name] + \
+               [{"name": "lang", "isDir": True, "children": children}]
+
+    def getZk(self, url):
+        name = url.split("/solr-config/")[1].replace("/", os.sep)
+        return mock.Mock(status_code=200, content=self.zk[name]) if name in self.zk else FakeResponse(404)
+
+    def upload(self, url, pathFile, isPut):
+        name, _, query = url.split("/solr-config/")[1].partition("?")
+        self.uploads.append(("PUT" if isPut else "POST", name, query == "reload=true"))
+        return FakeResponse(200)
+
+    def testUnchangedConfigsetIsNotUploaded(self):
+        putApp.putSchema("demo")
+        self.assertEqual([], self.uploads)
+
+    def testOnlyChangedFilesAreUploaded(self):
+        self.write({os.path.join("lang", "stopwords.txt"): b"a\nthe\n"})
+        putApp.putSchema("demo")
+        self.assertEqual([("PUT", "lang/stopwords.txt", True)], self.uploads)
+
+    def testNewFileIsPosted(self):
+        self.write({"synonyms.txt": b"tv,television\n"})
+        putApp.putSchema("demo")
+        self.assertEqual([("POST", "synonyms.txt", True)], self.uploads)
+
+    def testReloadIsSentWithTheLastChangedFile(self):
+        self.write({os.path.join("lang", "stopwords.txt"): b"the\n", "managed-schema": b"<schema version='2'/>"})
+        putApp.putSchema("demo")
+        self.assertEqual([("PUT", "lang/stopwords.txt", False), ("PUT", "managed-schema", True)], self.uploads)
+
+    def testDeferredReloadIsSentOncePerCollection(self):
+        self.write({"managed-schema": b"<schema version='2'/>", "synonyms.txt": b"tv,television\n"})
+        self.write(self.FILES, "other")
+        self.write({"solrconfig.xml": b"<config version='2'/>"}, "other")
+        with mock.patch.object(putApp.args, "deferReloads", True):
+            putApp.putSchema("demo")
+            putApp.putSchema("other")
+            # a feature change of a collection whose configset is already waiting adds no second reload
+            putApp.deferFeatureReload("demo")
+            self.assertEqual([("POST", "synonyms.txt", False)], self.uploads)
+            putApp.reloadCollections()
+        # the two reloads run concurrently on --reloadWorkers
+        self.assertCountEqual([("PUT", "managed-schema", True), ("PUT", "solrconfig.xml", True)], self.uploads[1:])
+
+    def testFeatureChangeReloadsWithTheLastConfigsetFile(self):
+        with mock.patch.object(putApp.args, "deferReloads", True):
+            putApp.putSchema("demo")
+            putApp.deferFeatureReload("demo")
+            putApp.reloadCollections()
+        self.assertEqual([("PUT", "solrconfig.xml", True)], self.uploads)
+
+    def testJournalEntryWaitsForTheDeferredReload(self):
+        self.write({"managed-schema": b"<schema version='2'/>"})
+        journal = []
+        with mock.patch.object(putApp.args, "deferReloads", True), \
+                mock.patch.object(putApp, "appendJournal", lambda *entry: journal.append(entry)):
+            putApp.journalState.entry = ("collections:demo_COL.json", "digest")
+            try:
+                putApp.putSchema("demo")
+                self.assertIsNone(putApp.journalState.entry)
+            finally:
+                putApp.journalState.entry = None
+            self.assertEqual([], journal)
+            putApp.reloadCollections()
+        self.assertEqual([("collections:demo_COL.json", "digest")], journal)
+
+    def testUploadAllSchemaFiles(self):
+        with mock.patch.object(putApp.args, "uploadAllSchemaFiles", True):
+            putApp.putSchema("demo")
+        self.assertEqual(3, len(self.uploads))
+        self.assertEqual(("PUT", "solrconfig.xml", True), self.uploads[-1])
+
+
+class BulkImportTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.files = {"fusionApps": ["demo_APP.json"], "collections": ["demo_COL.json"], "blobs": ["lib_BLOB.json"],
+                      "jobs": ["j_JOB.json"], "dataSources": ["web_DS.json"]}
+        self.write("demo_APP.json", {"id": "demo", "name": "Demo"})
+        self.write("demo_COL.json", {"id": "demo", "solrParams": {"name": "demo"}})
+        self.write("lib_BLOB.json", {"id": "lib/x.jar", "path": "/lib/x.jar"})
+        self.write("j_JOB.json", {"resource": "datasource:web", "enabled": True})
+        self.write("web_DS.json", {"id": "web", "properties": {"startLinks": "${startLink}"}})
+        self.write(os.path.join("collectionFeatures", "demo_CF.json"), [{"name": "signals", "collectionId": "demo"}])
+        self.write(os.path.join("configsets", "demo", "managed-schema"), "<schema/>")
+        self.write(os.path.join("configsets", "demo", "lang", "stopwords.txt"), "the\n")
+        self.write(os.path.join("blobs", "lib", "x.jar"), "jar")
+        patches = contextlib.ExitStack()
+        self.addCleanup(patches.close)
+        patches.enter_context(mock.patch.object(putApp, "args", mock.Mock(
+            dir=self.dir, server="http://fusion", importPolicy="overwrite", verbose=False, debug=False,
+            failOnStdError=False)))
+        patches.enter_context(mock.patch.object(putApp, "getFileListForType", lambda type: self.files.get(type, [])))
+        patches.enter_context(mock.patch.object(putApp, "varReplacements", {"startLink": "https://example.com"}))
+        patches.enter_context(mock.patch.object(putApp, "appName", None))
+        patches.enter_context(mock.patch.object(putApp, "errorCount", 0))
+
+    def write(self, name, content):
+        path = os.path.join(self.dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content if isinstance(content, str) else json.dumps(content))
+
+    def testImportZipLayout(self):
+        data = io.BytesIO()
+        with zipfile.ZipFile(data, "w") as zip:
+            sources = putApp.buildImportZip(zip)
+        with zipfile.ZipFile(data) as zip:
+            self.assertEqual({"objects.json", "blobs/lib/x.jar", "configsets/demo/managed-schema",
+                              "configsets/demo/lang/stopwords.txt"}, set(zip.namelist()))
+            objects = json.loads(zip.read("objects.json"))["objects"]
+        self.assertEqual("demo", putApp.appName)
+        self.assertEqual([{"id": "demo", "name": "Demo"}], objects["fusionApps"])
+        self.assertEqual("https://example.com", objects["dataSources"][0]["properties"]["startLinks"])
+        self.assertEqual({"demo": [{"name": "signals", "collectionId": "demo"}]}, objects["features"])
+        self.assertEqual({"fusionApps:demo": "demo_APP.json", "collections:demo": "demo_COL.json",
+                          "blobs:lib/x.jar": "lib_BLOB.json", "jobs:datasource:web": "j_JOB.json",
+                          "dataSources:web": "web_DS.json",
+                          "features:demo": os.path.join("collectionFeatures", "demo_CF.json")}, sources)
+
+    def testImportReportObjects(self):
+        report = {"imported": {"collections": ["demo"], "blobs": [{"id": "lib/x.jar"}]},
+                  "skipped": {"jobs": {"datasource:web": {}}},
+                  "errors": [{"type": "dataSources", "id": "web", "message": "bad"}]}
+        self.assertEqual([("imported", "collections:demo"), ("imported", "blobs:lib/x.jar"),
+                          ("skipped", "jobs:datasource:web"), ("errors", "dataSources:web")],
+                         list(putApp.importReportObjects(report)))
+        self.assertEqual([], list(putApp.importReportObjects(None)))
+
+    def testPutBulkReportsEachObjectsFile(self):
+        requests = []
+
+        def httpRequest(method, url, headers=None, data=None):
+            body = data.read()
+            boundary = headers["Content-Type"].split("boundary=")[1].encode()
+            part = body.split(b"--" + boundary)[1]
+            requests.append((method, url, part.split(b"\r\n\r\n", 1)[1][:-2]))
+            response = FakeResponse(400, {"errors": [{"type": "dataSources", "id": "web", "message": "bad"}]})
+            response.json = lambda: json.loads(response.content)
+            return response
+        stderr = io.StringIO()
+        with mock.patch.object(putApp, "httpRequest", httpRequest), contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(stderr):
+            putApp.putBulk()
+        method, url, zipData = requests[0]
+        self.assertEqual(("POST", "http://fusion/api/objects/import?importPolicy=overwrite"), (method, url))
+        with zipfile.ZipFile(io.BytesIO(zipData)) as zip:
+            self.assertIn("objects.json", zip.namelist())
+        self.assertIn("errors dataSources:web from web_DS.json", stderr.getvalue())
+        self.assertEqual(1, putApp.errorCount)
+
+
+if __name__ == "__main__":
+    unittest.main()